@@ -28,6 +28,7 @@
 # Revision Dates
 #     5-Sep-2014 (CT) Creation (factored from FFW)
 #     5-Sep-2014 (MB) Added garbage collect command
+#    18-Oct-2026 (AG) Add `import_spider` command
 #    ««revision-date»»···
 #--
 
@@ -43,6 +44,7 @@ from   _TFL                     import TFL
 
 import _CNDB._Base_Command_
 import _CNDB._OMP.import_CNDB
+import _CNDB._OMP.Spider_Import
 
 import _GTW._OMP._Auth.import_Auth
 import _GTW._OMP._PAP.import_PAP
@@ -72,6 +74,8 @@ from   _TFL._Meta.Property      import Class_Property
 
 import _TFL.CAO
 
+import sys
+
 from   _CNDB._GTW               import RST_addons
 
 class _CNDB_Sub_Command_ (TFL.Command.Sub_Command) :
@@ -103,6 +107,37 @@ class CNDB_Command (CNDB._Base_Command_, GTW.Werkzeug.Command) :
             ipn.collect_garbage ()
     # end def _handle_collect_garbage
 
+    class _CNDB_Import_Spider_ (_Sub_Command_) :
+        """Import results of the network spider (archives or pickle dumps)"""
+
+        _args               = \
+            ( "file:P?Archive or pickle dump written by the spider"
+            ,
+            )
+        _opts               = \
+            ( "-chunk_size:I=500?Number of nodes imported per transaction"
+            , "-manager:I?Pid of the manager of nodes created by the import "
+                "(required)"
+            , "-verbose:B?Report progress after each transaction"
+            )
+
+    _Import_Spider_ = _CNDB_Import_Spider_ # end class
+
+    def _handle_import_spider (self, cmd) :
+        if not cmd.manager :
+            print ("Option -manager is required", file = sys.stderr)
+            raise SystemExit (1)
+        scope   = self._handle_load (cmd)
+        manager = scope.pid_query (cmd.manager)
+        imp     = CNDB.OMP.Spider_Import \
+            (scope, manager, cmd.chunk_size, verbose = cmd.verbose)
+        for fn in cmd.argv :
+            imp.add_all (CNDB.OMP.read_results (fn))
+        imp.commit ()
+        print (imp.report ())
+        scope.destroy ()
+    # end def _handle_import_spider
+
 Command = CNDB_Command # end class
 
 if __name__ != "__main__" :
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+# #*** <License> ************************************************************#
+# This module is part of the package CNDB.OMP.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+#
+#++
+# Name
+#    CNDB.OMP.Spider_Import
+#
+# Purpose
+#    Bulk import of results of the OLSR network spider
+#
+# Revision Dates
+#    18-Oct-2026 (AG) Creation
+#    ««revision-date»»···
+#--
+
+from   __future__  import absolute_import, division, print_function, unicode_literals
+
+from   _CNDB                    import CNDB
+from   _MOM                     import MOM
+from   _TFL                     import TFL
+import _CNDB._OMP
+import _CNDB._OMP.Error
+
+import _MOM.Error
+
+from   collections              import defaultdict
+
+import re
+import sys
+import time
+
+_dns_invalid = re.compile (r"[^a-z0-9-]+")
+
+def dns_label (name) :
+    """Convert `name` of spider (e.g., interface `eth0.1`) to a DNS label."""
+    return _dns_invalid.sub ("-", name.lower ()).strip ("-") [:63]
+# end def dns_label
+
+def read_results (filename) :
+    """Yield `(ip, result)` of spider archive or pickle dump `filename`
+       sorted by IP.
+
+       The `spider` package is only needed for reading the files.
+    """
+    from spider.archive import Archive, magic
+    from spider.parser  import read_pickle, sorted_results
+    if not filename.endswith (".gz") and filename != "-" :
+        with open (filename, "rb") as f :
+            is_archive = f.read (len (magic)) == magic
+        if is_archive :
+            archive = Archive (filename)
+            try :
+                for ip, result in archive :
+                    yield ip, result
+            finally :
+                archive.close ()
+            return
+    for ip, result in sorted_results (read_pickle (filename)) :
+        yield ip, result
+# end def read_results
+
+def mask_len (netmask) :
+    """Mask length of `netmask` given as length or in dotted notation."""
+    if netmask is None :
+        return 32
+    netmask = str (netmask).lstrip ("/")
+    if "." in netmask :
+        return sum (bin (int (o)).count ("1") for o in netmask.split ("."))
+    return int (netmask)
+# end def mask_len
+
+class Spider_Import (TFL.Meta.Object) :
+    """Import results of the spider (`Guess` instances by IP address)
+       into `scope`.
+
+       All lookups of existing entities use indexes built once before
+       the import: nodes by name, interfaces by MAC address and by
+       device and name, IP addresses by address. Changes are committed
+       every `chunk_size` nodes.
+
+       A node is identified via the MAC addresses of its interfaces or
+       via its IP addresses, a node not found is created with a name
+       derived from its IP address (see `name_template`) and `manager`.
+       New addresses are reserved for the manager of the node from the
+       smallest pool containing them, addresses outside of all pools
+       are only counted. Results of nodes that couldn't be spidered are
+       skipped, errors are written to `err`.
+
+       MAC addresses are compared in lower case.
+    """
+
+    name_template = "spider-%s"
+
+    def __init__ \
+            ( self, scope, manager
+            , chunk_size = 500
+            , verbose    = False
+            , err        = sys.stderr
+            ) :
+        self.scope      = scope
+        self.manager    = manager
+        self.chunk_size = chunk_size
+        self.verbose    = verbose
+        self.err        = err
+        self.counts     = defaultdict (int)
+        self.pending    = 0
+        self.start      = time.time ()
+        self._setup_indexes ()
+    # end def __init__
+
+    def add (self, ip, result) :
+        """Import spider `result` for `ip`."""
+        if isinstance (result, tuple) :
+            self.counts ["skipped"] += 1
+            return
+        try :
+            ifaces = sorted \
+                ( (result.interfaces or {}).itervalues ()
+                , key = lambda i : i.name
+                )
+            device = self._device (ip, result, ifaces)
+            for iface in ifaces :
+                self._add_interface (device, iface)
+        except MOM.Error.Error as exc :
+            self.counts ["failed"] += 1
+            print ("%s: %s" % (ip, exc), file = self.err)
+            return
+        self.counts ["nodes"] += 1
+        self.pending += 1
+        if self.pending >= self.chunk_size :
+            self.commit ()
+    # end def add
+
+    def add_all (self, results) :
+        """Import all `(ip, result)` pairs of `results`."""
+        for ip, result in results :
+            self.add (ip, result)
+    # end def add_all
+
+    def commit (self) :
+        if self.pending :
+            self.scope.commit ()
+            self.pending = 0
+            if self.verbose :
+                print (self.report ())
+    # end def commit
+
+    def report (self) :
+        counts  = self.counts
+        elapsed = max (time.time () - self.start, 1e-6)
+        return "; ".join \
+            ( ( "%d nodes in %.1f s (%.1f nodes/s)"
+              % (counts ["nodes"], elapsed, counts ["nodes"] / elapsed)
+              ,
+              )
+            + tuple
+                ( "%s: %d" % (k, counts [k])
+                for k in sorted (counts) if k != "nodes"
+                )
+            )
+    # end def report
+
+    def _add_interface (self, device, iface) :
+        CNDB = self.scope.CNDB
+        mac  = self._mac (iface)
+        name = dns_label (iface.name)
+        wi   = iface.wlan_info
+        ni   = None
+        if mac :
+            ni = self.by_mac.get (mac)
+        if ni is None :
+            ni = self.by_name.get ((device.pid, name))
+        created = ni is None
+        if created :
+            ETM  = CNDB.Wireless_Interface if wi else CNDB.Wired_Interface
+            kw   = dict (left = device, name = name, raw = True)
+            if mac :
+                kw ["mac_address"] = mac
+            ni   = ETM (** kw)
+            self.counts ["interfaces created"] += 1
+            if mac :
+                self.by_mac [mac] = ni
+            self.by_name [(device.pid, name)] = ni
+        if wi and ni.type_name == "CNDB.Wireless_Interface" :
+            if self._set_wireless (ni, wi) and not created :
+                self.counts ["interfaces updated"] += 1
+        for inet in iface.inet4 :
+            self._add_ip (ni, inet)
+    # end def _add_interface
+
+    def _add_ip (self, ni, inet) :
+        CNDB = self.scope.CNDB
+        adr  = str (inet.ip)
+        net  = self.ips.get (adr)
+        if net is None :
+            pool = self._pool (adr)
+            if pool is None :
+                self.counts ["IPs outside pools"] += 1
+                return
+            net = self.ips [adr] = pool.reserve \
+                ("%s/32" % (adr, ), owner = ni.left.node.manager)
+            self.counts ["IPs reserved"] += 1
+        if net.pid not in self.links :
+            self.links [net.pid] = CNDB.Net_Interface_in_IP4_Network \
+                (ni, net, mask_len = mask_len (inet.netmask))
+            self.counts ["IPs assigned"] += 1
+    # end def _add_ip
+
+    def _device (self, ip, result, ifaces) :
+        """Return existing net device for `result` or create one."""
+        CNDB = self.scope.CNDB
+        for iface in ifaces :
+            mac = self._mac (iface)
+            if mac in self.by_mac :
+                return self.by_mac [mac].left
+        for inet in (result.ips or {}) :
+            net = self.ips.get (str (inet.ip))
+            if net is not None and net.pid in self.links :
+                return self.links [net.pid].left.left
+        name = dns_label (self.name_template % (ip, ))
+        node = self.nodes.get (name)
+        if node is None :
+            node = self.nodes [name] = CNDB.Node \
+                (name = name, manager = self.manager, raw = True)
+            self.counts ["nodes created"] += 1
+        device = self.devices.get (node.pid)
+        if device is None :
+            device = self.devices [node.pid] = CNDB.Net_Device \
+                (left = self.dev_type, node = node, name = name, raw = True)
+            self.counts ["devices created"] += 1
+        return device
+    # end def _device
+
+    def _mac (self, iface) :
+        """MAC address of spider `iface` in lower case, if any."""
+        if iface.link and iface.link.mac :
+            return str (iface.link.mac).lower ()
+    # end def _mac
+
+    def _pool (self, adr) :
+        """Return the smallest pool containing `adr`."""
+        adr = self.Adr (adr)
+        for pool in self.pools :
+            if adr in pool.net_address :
+                return pool
+    # end def _pool
+
+    def _set_wireless (self, ni, wi) :
+        """Set wireless parameters of `ni`, return number of changes."""
+        CNDB    = self.scope.CNDB
+        changed = 0
+        std     = self.standards.get (wi.standard)
+        if std is not None and std is not ni.standard :
+            changed += ni.set (standard = std)
+        raw = dict \
+            ( (k, v) for k, v in
+                ( ("essid", wi.ssid)
+                , ("bssid", wi.bssid)
+                , ("mode",  wi.mode)
+                )
+              if v
+            )
+        if raw.get ("mode") not in CNDB.OMP.Wireless_Mode.Table :
+            raw.pop ("mode", None)
+        return changed + ni.set_raw (** raw)
+    # end def _set_wireless
+
+    def _setup_indexes (self) :
+        CNDB           = self.scope.CNDB
+        self.Adr       = CNDB.IP4_Network.net_address.P_Type
+        self.dev_type  = CNDB.Net_Device_Type.instance_or_new \
+            (name = "Generic", raw = True)
+        self.standards = dict \
+            ((s.name, s) for s in CNDB.Wireless_Standard.query ())
+        self.nodes     = dict ((n.name, n) for n in CNDB.Node.query ())
+        self.devices   = {}
+        for d in CNDB.Net_Device.query () :
+            self.devices.setdefault (d.node.pid, d)
+        self.by_mac    = {}
+        self.by_name   = {}
+        for i in CNDB.Net_Interface.query () :
+            if i.mac_address :
+                self.by_mac [str (i.mac_address).lower ()] = i
+            self.by_name [(i.left.pid, i.name)] = i
+        self.ips       = {}
+        pools          = []
+        for n in CNDB.IP4_Network.query () :
+            if n.net_address.mask_len == 32 :
+                self.ips [str (n.net_address)] = n
+            elif not n.electric :
+                pools.append (n)
+        ### reserve doesn't look into sub-pools: smallest pools first
+        self.pools     = sorted \
+            (pools, key = lambda n : - n.net_address.mask_len)
+        self.links     = dict \
+            ( (l.right.pid, l)
+              for l in CNDB.Net_Interface_in_IP4_Network.query ()
+            )
+    # end def _setup_indexes
+
+# end class Spider_Import
+
+if __name__ != "__main__" :
+    CNDB.OMP._Export ("*")
+### __END__ CNDB.OMP.Spider_Import
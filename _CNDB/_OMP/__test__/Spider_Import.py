@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# #*** <License> ************************************************************#
+# This module is part of the package CNDB.OMP.__test__.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+#
+#++
+# Name
+#    CNDB.OMP.__test__.Spider_Import
+#
+# Purpose
+#    Test import of results of the network spider
+#
+# Revision Dates
+#    18-Oct-2026 (AG) Creation
+#    ««revision-date»»···
+#--
+
+from   __future__ import absolute_import, division, print_function, unicode_literals
+
+from   _CNDB._OMP.__test__.model      import *
+from   _CNDB._OMP.__test__.fixtures   import net_fixtures
+from   _CNDB._OMP.Spider_Import       import Spider_Import
+
+from   spider.common                  import Interface, Net_Link, Inet4
+from   spider.common                  import WLAN_Config
+
+class Result (object) :
+    """Stand-in for the `Guess` of a spidered node"""
+
+    def __init__ (self, * interfaces) :
+        self.interfaces = dict ((i.name, i) for i in interfaces)
+        self.ips        = dict \
+            ((a, True) for i in interfaces for a in i.inet4)
+    # end def __init__
+
+# end class Result
+
+def interface (number, name, mac, ip, ** wlan) :
+    """Spider `Interface` with one IPv4 address `ip` (with mask length)."""
+    iface      = Interface (number, name)
+    iface.link = Net_Link ("ether", mac, "ff:ff:ff:ff:ff:ff")
+    adr, mask  = ip.split ("/")
+    iface.append_inet4 (Inet4 (adr, mask, None, iface = name))
+    if wlan :
+        iface.is_wlan   = True
+        iface.wlan_info = WLAN_Config (** wlan)
+    return iface
+# end def interface
+
+_test_import = """
+    >>> scope = Scaffold.scope (%(p1)s, %(n1)s) # doctest:+ELLIPSIS
+    Creating new scope MOMT__...
+
+    >>> CNDB = scope.CNDB
+    >>> PAP  = scope.PAP
+    >>> net_fixtures (scope)
+    >>> cta  = PAP.Person.query (first_name = 'christian').one ()
+    >>> rsc  = PAP.Person.query (first_name = 'ralf').one ()
+    >>> ff_pool  = CNDB.IP4_Network.instance \\
+    ...     (net_address = '10.10.0.0/16', raw = True)
+    >>> cta_pool = ff_pool.reserve ('10.10.5.0/24', owner = cta)
+
+    >>> wlan0 = interface \\
+    ...     ( 2, "wlan0", "00:11:22:33:44:AA", "10.10.7.1/16"
+    ...     , ssid = "www.funkfeuer.at", mode = "Ad-Hoc", channel = "3"
+    ...     )
+    >>> results = \\
+    ...     [ ("10.10.5.17", Result
+    ...         (interface (1, "eth0", "00:11:22:33:44:55", "10.10.5.17/24")))
+    ...     , ("10.10.7.1", Result (wlan0))
+    ...     , ("192.168.23.1", Result
+    ...         (interface (1, "eth0", "00:11:22:33:44:77", "192.168.23.1/24")))
+    ...     , ("172.16.0.1", Result
+    ...         (interface (1, "eth0", "00:11:22:33:44:88", "172.16.0.1/24")))
+    ...     , ("10.10.9.9", ("Timeout_Error", "timed out"))
+    ...     ]
+
+    >>> imp = Spider_Import (scope, rsc)
+    >>> imp.add_all (results)
+    >>> for k, v in sorted (imp.counts.items ()) :
+    ...     print ("%%-20s: %%s" %% (k, v))
+    IPs assigned        : 2
+    IPs outside pools   : 1
+    IPs reserved        : 2
+    devices created     : 3
+    interfaces created  : 4
+    nodes               : 4
+    nodes created       : 3
+    skipped             : 1
+
+    Addresses are reserved from the smallest pool containing them
+
+    >>> for adr in "10.10.5.17", "10.10.7.1" :
+    ...     net = imp.ips [adr]
+    ...     print (net.FO.net_address, net.pool.FO.net_address, net.FO.owner)
+    10.10.5.17 10.10.5.0/24 Schlatterbeck Ralf
+    10.10.7.1 10.10.0.0/16 Schlatterbeck Ralf
+
+    The node with the known address 192.168.23.1 is found via that address
+
+    >>> for i in CNDB.Net_Interface.query ().order_by (Q.pid) :
+    ...     print ("%%-20s %%s" %% (i.type_base_name, i.ui_display))
+    Wired_Interface      Generic, node2, dev, wr
+    Wireless_Interface   Generic, node2, dev, wl
+    Wired_Interface      Generic, spider-10-10-5-17, spider-10-10-5-17, eth0
+    Wireless_Interface   Generic, spider-10-10-7-1, spider-10-10-7-1, wlan0
+    Wired_Interface      Generic, node2, dev, eth0
+    Wired_Interface      Generic, spider-172-16-0-1, spider-172-16-0-1, eth0
+
+    MAC addresses are indexed in lower case
+
+    >>> wl = imp.by_mac ["00:11:22:33:44:aa"]
+    >>> print (wl.essid, wl.mode)
+    www.funkfeuer.at Ad_Hoc
+
+    A second import of the same results finds everything, even the
+    interface with the MAC address reported in upper case
+
+    >>> imp = Spider_Import (scope, rsc)
+    >>> imp.add_all (results)
+    >>> for k, v in sorted (imp.counts.items ()) :
+    ...     print ("%%-20s: %%s" %% (k, v))
+    IPs outside pools   : 1
+    nodes               : 4
+    skipped             : 1
+
+"""
+
+__test__ = Scaffold.create_test_dict \
+  ( dict
+      ( main       = _test_import
+      )
+  )
+
+### __END__ CNDB.OMP.__test__.Spider_Import
@@ -0,0 +1,128 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   olsr.parser        import Topology
+from   olsr.analysis      import Routing, inf
+
+def topology (* links) :
+    """ Topology with links in both directions between 10.0.0.a and
+        10.0.0.b with cost c for the given (a, b, c).
+    """
+    topo = Topology ()
+    for a, b, c in links :
+        for d, h in (a, b), (b, a) :
+            topo.add_row ('10.0.0.%s' % d, '10.0.0.%s' % h, 1.0, 1.0, c)
+    return topo
+# end def topology
+
+def brute_betweenness (r) :
+    """ Betweenness from the number of shortest paths between all pairs
+        (Floyd-Warshall), for comparison with Routing.betweenness.
+    """
+    n     = r.n
+    dist  = [[inf] * n for i in xrange (n)]
+    count = [[0]   * n for i in xrange (n)]
+    for v in xrange (n) :
+        dist [v][v]  = 0.0
+        count [v][v] = 1
+        for k in xrange (r.offsets [v], r.offsets [v + 1]) :
+            dist  [v][r.neighbours [k]] = r.weights [k]
+            count [v][r.neighbours [k]] = 1
+    for m in xrange (n) :
+        for s in xrange (n) :
+            for t in xrange (n) :
+                d = dist [s][m] + dist [m][t]
+                if m in (s, t) or d > dist [s][t] :
+                    continue
+                if d < dist [s][t] :
+                    dist  [s][t] = d
+                    count [s][t] = 0
+                count [s][t] += count [s][m] * count [m][t]
+    result = []
+    for v in xrange (n) :
+        b = 0.0
+        for s in xrange (n) :
+            for t in xrange (n) :
+                if  (   len (set ((s, t, v))) == 3
+                    and dist [s][t] < inf
+                    and dist [s][v] + dist [v][t] == dist [s][t]
+                    ) :
+                    b += float (count [s][v] * count [v][t]) / count [s][t]
+        result.append (b / ((n - 1) * (n - 2)))
+    return result
+# end def brute_betweenness
+
+def show (values) :
+    print ' '.join ('%.4f' % v for v in values)
+# end def show
+
+_test_routing = """
+    A square 1-2-3-4 with an expensive diagonal 1-3 and a tail 4-5-6
+
+    >>> topo = topology \\
+    ...     ( (1, 2, 1.0), (2, 3, 1.0), (3, 4, 1.0), (4, 1, 1.0)
+    ...     , (1, 3, 3.0), (4, 5, 1.5), (5, 6, 1.0)
+    ...     )
+    >>> r = Routing (topo)
+    >>> dist, pred = r.shortest_paths ('10.0.0.1')
+    >>> dist.tolist ()
+    [0.0, 1.0, 2.0, 1.0, 2.5, 3.5]
+    >>> [str (r.address (p)) if p >= 0 else None for p in pred]
+    [None, '10.0.0.1', '10.0.0.2', '10.0.0.1', '10.0.0.4', '10.0.0.5']
+    >>> r.path ('10.0.0.2', '10.0.0.6')
+    ([10.0.0.2, 10.0.0.1, 10.0.0.4, 10.0.0.5, 10.0.0.6], 4.5)
+    >>> r.path ('10.0.0.1', '10.0.0.1')
+    ([10.0.0.1], 0.0)
+
+    Articulation points and bridges of the undirected graph
+
+    >>> points, bridges = r.articulation_points_and_bridges ()
+    >>> sorted (str (r.address (p)) for p in points)
+    ['10.0.0.4', '10.0.0.5']
+    >>> sorted ((str (r.address (a)), str (r.address (b))) for a, b in bridges)
+    [('10.0.0.4', '10.0.0.5'), ('10.0.0.5', '10.0.0.6')]
+
+    Exact betweenness
+
+    >>> show (r.betweenness ())
+    0.1500 0.0500 0.1500 0.6500 0.4000 0.0000
+    >>> show (brute_betweenness (r))
+    0.1500 0.0500 0.1500 0.6500 0.4000 0.0000
+
+    With samples only the shortest paths from the given number of
+    random sources are used, the estimate is reproducible with a seed
+
+    >>> show (r.betweenness (3, seed = 42))
+    0.2000 0.0500 0.2000 0.4500 0.3000 0.0000
+    >>> r.betweenness (3, seed = 42) == r.betweenness (3, seed = 42)
+    True
+    >>> r.betweenness (r.n, seed = 42) == r.betweenness ()
+    True
+
+    Links with infinite cost are ignored
+
+    >>> r = Routing (topology ((1, 2, 1.0), (2, 3, inf)))
+    >>> r.path ('10.0.0.1', '10.0.0.3')
+    ([], inf)
+    >>> points, bridges = r.articulation_points_and_bridges ()
+    >>> points, [(str (r.address (a)), str (r.address (b))) for a, b in bridges]
+    (set([]), [('10.0.0.1', '10.0.0.2')])
+"""
+
+__test__ = dict \
+    ( routing = _test_routing
+    )
@@ -0,0 +1,122 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   olsr.parser        import OLSR_State, Txtinfo_Parser
+
+def snapshot (links, hna = (), mid = ()) :
+    """ Parsed txtinfo output with topology entries links (dst, hop,
+        cost) and HNA entries (dest, gw) and MID entries (ip, aliases),
+        addresses are given by the last octet of 193.238.156.x.
+    """
+    ip    = lambda x : '193.238.156.%s' % x
+    lines = ["Table: Topology", "Dest. IP\tLast hop IP\tLQ\tNLQ\tCost"]
+    lines.extend \
+        ( "%s\t%s\t1.000\t1.000\t%s" % (ip (d), ip (h), c)
+          for d, h, c in links
+        )
+    lines.extend (["", "Table: HNA", "Destination\tGateway"])
+    lines.extend ("%s\t%s" % (d, ip (g)) for d, g in hna)
+    lines.extend (["", "Table: MID", "IP address\tAliases"])
+    lines.extend \
+        ("%s\t%s" % (ip (i), ';'.join (ip (a) for a in al)) for i, al in mid)
+    olsr = Txtinfo_Parser ()
+    olsr.parse (l + '\n' for l in lines)
+    return olsr
+# end def snapshot
+
+def entries (topo) :
+    """ Sorted (dst_ip, last_hop, cost) of all entries of topo """
+    return sorted \
+        ( (str (e.dst_ip), str (e.last_hop), e.cost)
+          for e in (topo.entry (r) for r in xrange (len (topo.dst_ids)))
+        )
+# end def entries
+
+def show (state, d) :
+    """ Subscriber printing the delta """
+    for name in 'topo', 'hna', 'mid' :
+        delta = getattr (d, name)
+        for k in delta._fields :
+            v = getattr (delta, k)
+            if v :
+                print name, k, sorted (v, key = str)
+# end def show
+
+_test_state = """
+    >>> state = OLSR_State ()
+    >>> state.subscribe (show)
+    >>> s1 = snapshot \\
+    ...     ( [(1, 2, 1.0), (2, 1, 1.0), (2, 3, 1.5), (3, 2, 1.5)]
+    ...     , [('0.0.0.0/0', 1)]
+    ...     , [(1, [11])]
+    ...     )
+    >>> d = state.update (s1)
+    topo added [Topo_Entry (193.238.156.1, 193.238.156.2), Topo_Entry (193.238.156.2, 193.238.156.1), Topo_Entry (193.238.156.2, 193.238.156.3), Topo_Entry (193.238.156.3, 193.238.156.2)]
+    hna added [HNA_Entry (0.0.0.0/0, 193.238.156.1)]
+    mid added [(193.238.156.1, [193.238.156.11])]
+    >>> entries (state.topo) == entries (s1.topo)
+    True
+
+    Remove a link, change the cost of another, add a node; change the
+    gateway of the default route, add and remove MID entries
+
+    >>> s2 = snapshot \\
+    ...     ( [(1, 2, 1.0), (2, 1, 2.0), (3, 4, 1.0), (4, 3, 1.0), (2, 3, 1.5)]
+    ...     , [('0.0.0.0/0', 3)]
+    ...     , [(4, [14])]
+    ...     )
+    >>> d = state.update (s2)
+    topo added [Topo_Entry (193.238.156.3, 193.238.156.4), Topo_Entry (193.238.156.4, 193.238.156.3)]
+    topo removed [Topo_Entry (193.238.156.3, 193.238.156.2)]
+    topo changed [(Topo_Entry (193.238.156.2, 193.238.156.1), Topo_Entry (193.238.156.2, 193.238.156.1))]
+    hna changed [(HNA_Entry (0.0.0.0/0, 193.238.156.1), HNA_Entry (0.0.0.0/0, 193.238.156.3))]
+    mid added [(193.238.156.4, [193.238.156.14])]
+    mid removed [(193.238.156.1, [193.238.156.11])]
+    >>> [(o.cost, n.cost) for o, n in d.topo.changed]
+    [(1.0, 2.0)]
+    >>> entries (state.topo) == entries (s2.topo)
+    True
+    >>> str (state.hna.by_dest.values () [0].gw), state.mid.by_ip.keys ()
+    ('193.238.156.3', [193.238.156.4])
+
+    The node without entries keeps its id, removing several rows keeps
+    the index of rows consistent
+
+    >>> ids = dict (state.topo.ids)
+    >>> s3 = snapshot ([(4, 3, 1.0), (1, 2, 1.0)])
+    >>> state.unsubscribe (show)
+    >>> d = state.update (s3)
+    >>> len (d.topo.removed), len (d.topo.added), len (d.hna.removed)
+    (3, 0, 1)
+    >>> entries (state.topo) == entries (s3.topo)
+    True
+    >>> state.topo.ids == ids, len (state.topo.addresses)
+    (True, 4)
+    >>> sorted (state.rows) == sorted \\
+    ...     ( (state.topo.dst_ids [r], state.topo.hop_ids [r])
+    ...       for r in xrange (len (state.topo.cost))
+    ...     )
+    True
+    >>> sorted (state.rows.values ())
+    [0, 1]
+    >>> state.update (s3)
+    State_Delta(topo=Delta(added=[], removed=[], changed=[]), mid=Delta(added=[], removed=[], changed=[]), hna=Delta(added=[], removed=[], changed=[]))
+"""
+
+__test__ = dict \
+    ( state = _test_state
+    )
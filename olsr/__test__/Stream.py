@@ -0,0 +1,129 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import threading
+from   BaseHTTPServer     import HTTPServer, BaseHTTPRequestHandler
+from   StringIO           import StringIO
+from   gzip               import GzipFile
+from   olsr.parser        import read_lines, get_olsr_container
+from   olsr.__test__.Txtinfo import tables, txtinfo
+
+class Reader (object) :
+    """ File-like object returning the given blocks, records the
+        number of reads.
+    """
+
+    def __init__ (self, * blocks) :
+        self.blocks = list (blocks)
+        self.reads  = 0
+    # end def __init__
+
+    def read (self, size) :
+        self.reads += 1
+        if self.blocks :
+            return self.blocks.pop (0)
+        return ''
+    # end def read
+
+# end class Reader
+
+def gzipped (text) :
+    """ text as a gzip member """
+    f = StringIO ()
+    z = GzipFile (fileobj = f, mode = 'wb')
+    z.write (text)
+    z.close ()
+    return f.getvalue ()
+# end def gzipped
+
+class Txtinfo_Handler (BaseHTTPRequestHandler) :
+    """ Serve the files in txtinfo, /encoded/name serves the
+        compressed file name.gz with Content-Encoding gzip.
+    """
+
+    def do_GET (self) :
+        name     = self.path.lstrip ('/')
+        encoding = None
+        if name.startswith ('encoded/') :
+            name     = name [len ('encoded/'):] + '.gz'
+            encoding = 'gzip'
+        body = open (os.path.join (txtinfo, name), 'rb').read ()
+        self.send_response (200)
+        self.send_header ('Content-Type',   'text/plain')
+        self.send_header ('Content-Length', str (len (body)))
+        if encoding :
+            self.send_header ('Content-Encoding', encoding)
+        self.end_headers ()
+        self.wfile.write (body)
+    # end def do_GET
+
+    def log_message (self, * args) :
+        pass
+    # end def log_message
+
+# end class Txtinfo_Handler
+
+def txtinfo_server () :
+    """ Start HTTP server for txtinfo in a thread, return server and URL """
+    server   = HTTPServer (('127.0.0.1', 0), Txtinfo_Handler)
+    t        = threading.Thread (target = server.serve_forever)
+    t.daemon = True
+    t.start ()
+    return server, 'http://127.0.0.1:%s/' % server.server_address [1]
+# end def txtinfo_server
+
+_test_read_lines = """
+    Lines are yielded as soon as their block has been read
+
+    >>> r = Reader ('a\\nb', 'c\\n\\nd')
+    >>> lines = read_lines (r)
+    >>> lines.next (), r.reads
+    ('a\\n', 1)
+    >>> lines.next (), r.reads
+    ('bc\\n', 2)
+    >>> list (lines), r.reads
+    (['\\n', 'd'], 3)
+
+    Compressed input may be split anywhere and may consist of several
+    gzip members
+
+    >>> data = gzipped ('first\\nsec') + gzipped ('ond\\nthird\\n')
+    >>> list (read_lines (StringIO (data), compressed = True, blocksize = 7))
+    ['first\\n', 'second\\n', 'third\\n']
+    >>> text = open (os.path.join (txtinfo, 'olsr.txt')).read ()
+    >>> gz   = open (os.path.join (txtinfo, 'olsr.txt.gz')).read ()
+    >>> ''.join (read_lines (StringIO (gz), True, blocksize = 100)) == text
+    True
+"""
+
+_test_url = """
+    >>> server, url = txtinfo_server ()
+    >>> expected = tables (get_olsr_container (os.path.join (txtinfo, 'olsr.txt')))
+    >>> tables (get_olsr_container (url + 'olsr.txt')) == expected
+    True
+    >>> tables (get_olsr_container (url + 'olsr.txt.gz')) == expected
+    True
+    >>> tables (get_olsr_container (url + 'encoded/olsr.txt')) == expected
+    True
+    >>> server.shutdown ()
+"""
+
+__test__ = dict \
+    ( read_lines = _test_read_lines
+    , url        = _test_url
+    )
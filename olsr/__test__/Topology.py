@@ -0,0 +1,104 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   olsr.parser        import Topology
+
+def topology (* links) :
+    """ Topology with entries (dst_ip, last_hop) for the given links
+        given as pairs of the last octet of 193.238.156.x, the cost is
+        the row number of the entry.
+    """
+    topo = Topology ()
+    for r, (d, h) in enumerate (links) :
+        topo.add_row \
+            ('193.238.156.%s' % d, '193.238.156.%s' % h, 1.0, 1.0, float (r))
+    return topo
+# end def topology
+
+def ints (a) :
+    """ List of int of the array a """
+    return [int (x) for x in a]
+# end def ints
+
+def naive (topo, reverse = False) :
+    """ Rows by node id computed directly from the columns """
+    keys = topo.hop_ids if reverse else topo.dst_ids
+    return dict \
+        ( (i, [r for r, k in enumerate (keys) if k == i])
+          for i in xrange (len (topo.addresses))
+        )
+# end def naive
+
+def csr (topo, reverse = False) :
+    """ Rows by node id from the compressed sparse row adjacency """
+    offsets, neighbours, rows = topo.adjacency (reverse)
+    return dict \
+        ( (i, ints (rows [offsets [i]:offsets [i + 1]]))
+          for i in xrange (len (topo.addresses))
+        )
+# end def csr
+
+_test_adjacency = """
+    >>> topo = topology ((1, 2), (2, 1), (2, 3), (3, 2), (1, 3), (4, 1))
+    >>> topo.addresses
+    [193.238.156.1, 193.238.156.2, 193.238.156.3, 193.238.156.4]
+    >>> offsets, neighbours, rows = topo.adjacency ()
+    >>> ints (offsets), ints (neighbours), ints (rows)
+    ([0, 2, 4, 5, 6], [1, 2, 0, 2, 1, 0], [0, 4, 1, 2, 3, 5])
+    >>> offsets, neighbours, rows = topo.adjacency (reverse = True)
+    >>> ints (offsets), ints (neighbours), ints (rows)
+    ([0, 2, 4, 6, 6], [1, 3, 0, 2, 1, 0], [1, 5, 0, 3, 2, 4])
+    >>> csr (topo) == naive (topo), csr (topo, True) == naive (topo, True)
+    (True, True)
+
+    The neighbours are the other end of the entry in the same row
+
+    >>> all \\
+    ...     ( neighbours [k] == topo.dst_ids [r]
+    ...       for k, r in enumerate (rows)
+    ...     )
+    True
+
+    The adjacency is recomputed after changes
+
+    >>> row = topo.add_row ('193.238.156.5', '193.238.156.4', 1.0, 1.0, 6.0)
+    >>> moved = topo.remove_row (1)
+    >>> row, moved, topo.cost.tolist ()
+    (6, 6, [0.0, 6.0, 2.0, 3.0, 4.0, 5.0])
+    >>> csr (topo) == naive (topo), csr (topo, True) == naive (topo, True)
+    (True, True)
+    >>> csr (topo, True) [3]
+    [1]
+
+    The views by dst_ip and last_hop use the adjacency
+
+    >>> for ip, entries in sorted (topo.forward.iteritems ()) :
+    ...     print ip, [(str (e.last_hop), e.cost) for e in entries]
+    193.238.156.1 [('193.238.156.2', 0.0), ('193.238.156.3', 4.0)]
+    193.238.156.2 [('193.238.156.3', 2.0)]
+    193.238.156.3 [('193.238.156.2', 3.0)]
+    193.238.156.4 [('193.238.156.1', 5.0)]
+    193.238.156.5 [('193.238.156.4', 6.0)]
+    >>> len (topo.reverse), '193.238.156.5' in topo.reverse
+    (4, False)
+    >>> topo.reverse ['193.238.156.4']
+    [Topo_Entry (193.238.156.5, 193.238.156.4)]
+"""
+
+__test__ = dict \
+    ( adjacency = _test_adjacency
+    )
@@ -0,0 +1,109 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+from   gzip               import GzipFile
+from   olsr.parser        import OLSR_Parser, Txtinfo_Parser
+from   olsr.parser        import get_olsr_container
+
+txtinfo = os.path.join \
+    (os.path.dirname (os.path.abspath (__file__)), 'txtinfo')
+
+def old_parser (name) :
+    """ OLSR_Parser (the state machine parser) of file name in txtinfo """
+    fn = os.path.join (txtinfo, name)
+    if fn.endswith ('.gz') :
+        f = GzipFile (fn, 'r')
+    else :
+        f = open (fn, 'r')
+    olsr = OLSR_Parser ()
+    try :
+        olsr.parse (f)
+    finally :
+        f.close ()
+    return olsr
+# end def old_parser
+
+def tables (olsr) :
+    """ Topology, MID and HNA entries of olsr as sorted lists of plain
+        values for comparison.
+    """
+    topo = sorted \
+        ( (str (e.dst_ip), str (e.last_hop), e.lq, e.nlq, e.cost)
+          for entries in olsr.topo.forward.itervalues ()
+          for e in entries
+        )
+    mid  = sorted \
+        ( (str (k), [str (a) for a in v])
+          for k, v in olsr.mid.by_ip.iteritems ()
+        )
+    hna  = sorted \
+        ((str (h.dest), str (h.gw)) for h in olsr.hna.by_dest.itervalues ())
+    return topo, mid, hna
+# end def tables
+
+_test_txtinfo = """
+    >>> old = tables (old_parser ('olsr.txt'))
+    >>> topo, mid, hna = old
+    >>> len (topo), len (mid), len (hna)
+    (10, 2, 3)
+    >>> for t in topo [:5] :
+    ...     print t
+    ('193.238.156.1', '193.238.156.2', 1.0, 1.0, 1.0)
+    ('193.238.156.1', '193.238.156.5', 0.5, 0.5, 4.0)
+    ('193.238.156.2', '193.238.156.1', 1.0, 0.992, 1.008)
+    ('193.238.156.2', '193.238.156.3', 0.85, 0.9, 1.307)
+    ('193.238.156.3', '193.238.156.2', 0.9, 0.85, 1.307)
+    >>> topo [5]
+    ('193.238.156.3', '193.238.156.4', 0.0, 0.0, inf)
+    >>> mid
+    [('193.238.156.1', ['193.238.157.1', '193.238.158.1']), ('193.238.156.4', ['193.238.157.4'])]
+    >>> hna
+    [('0.0.0.0/0', '193.238.156.1'), ('10.10.1.0/24', '193.238.156.3'), ('10.10.2.0/28', '193.238.156.5')]
+
+    The fast parser gives the same tables, also for compressed input
+
+    >>> fast = Txtinfo_Parser ()
+    >>> fast.parse (open (os.path.join (txtinfo, 'olsr.txt')))
+    >>> tables (fast) == old
+    True
+    >>> tables (get_olsr_container (os.path.join (txtinfo, 'olsr.txt'))) == old
+    True
+    >>> gz = os.path.join (txtinfo, 'olsr.txt.gz')
+    >>> tables (get_olsr_container (gz)) == tables (old_parser ('olsr.txt.gz'))
+    True
+    >>> tables (get_olsr_container (gz)) == old
+    True
+
+    A table ends with the first line that isn't an entry
+
+    >>> fast = Txtinfo_Parser ()
+    >>> fast.parse \\
+    ...     ( [ "Table: Topology\\n"
+    ...       , "Dest. IP\\tLast hop IP\\tLQ\\tNLQ\\tCost\\n"
+    ...       , "193.238.156.1\\t193.238.156.2\\t1.000\\t1.000\\t1.000\\n"
+    ...       , "garbage\\n"
+    ...       , "193.238.156.2\\t193.238.156.1\\t1.000\\t1.000\\t1.000\\n"
+    ...       ]
+    ...     )
+    >>> tables (fast) [0]
+    [('193.238.156.1', '193.238.156.2', 1.0, 1.0, 1.0)]
+"""
+
+__test__ = dict \
+    ( txtinfo = _test_txtinfo
+    )
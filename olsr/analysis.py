@@ -0,0 +1,289 @@
+#!/usr/bin/python
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import random
+
+from   array              import array
+from   heapq              import heappush, heappop
+from   rsclib.autosuper   import autosuper
+
+inf = float ('inf')
+
+class Routing (autosuper) :
+    """ Routing analysis of an OLSR Topology (see olsr.parser).
+        An entry of the topology is a link from last_hop to dst_ip with
+        the given cost (the ETX metric), links with infinite cost are
+        ignored. Nodes are identified by their node id in the topology,
+        address converts a node id to its IP4_Address, node_id an
+        address to the id.
+        Articulation points and bridges are computed for the undirected
+        graph of links (a link in either direction connects two nodes).
+        Every analysis is computed from scratch for the topology given,
+        nothing is reused from an earlier snapshot: for running the
+        analysis every minute on thousands of nodes the only speedup is
+        to estimate the betweenness from a sample of sources.
+    """
+
+    def __init__ (self, topo) :
+        self.topo = topo
+        self.n    = n = len (topo.addresses)
+        offsets, neighbours, rows = topo.adjacency (reverse = True)
+        cost      = topo.cost
+        # Outgoing links of each node (by last_hop) without infinite cost
+        self.offsets    = array ('L', [0]) * (n + 1)
+        self.neighbours = array ('L')
+        self.weights    = array ('d')
+        undirected      = [set () for i in xrange (n)]
+        for v in xrange (n) :
+            for k in xrange (offsets [v], offsets [v + 1]) :
+                c = cost [rows [k]]
+                if c == inf or c != c :
+                    continue
+                w = neighbours [k]
+                self.neighbours.append (w)
+                self.weights.append    (c)
+                if w != v :
+                    undirected [v].add (w)
+                    undirected [w].add (v)
+            self.offsets [v + 1] = len (self.neighbours)
+        self.undirected = [sorted (s) for s in undirected]
+    # end def __init__
+
+    def address (self, i) :
+        return self.topo.addresses [i]
+    # end def address
+
+    def node_id (self, ip) :
+        if isinstance (ip, (int, long)) :
+            return ip
+        return self.topo.node_id (ip)
+    # end def node_id
+
+    def shortest_paths (self, source) :
+        """ Dijkstra from source (address or node id): return arrays of
+            the distance (inf if unreachable) and of the predecessor on
+            a shortest path (-1 for none) by node id.
+        """
+        s     = self.node_id (source)
+        dist  = array ('d', [inf]) * self.n
+        pred  = array ('l', [-1])  * self.n
+        off   = self.offsets
+        nb    = self.neighbours
+        wt    = self.weights
+        dist [s] = 0.0
+        heap  = [(0.0, s)]
+        while heap :
+            d, v = heappop (heap)
+            if d > dist [v] :
+                continue
+            for k in xrange (off [v], off [v + 1]) :
+                w  = nb [k]
+                dw = d + wt [k]
+                if dw < dist [w] :
+                    dist [w] = dw
+                    pred [w] = v
+                    heappush (heap, (dw, w))
+        return dist, pred
+    # end def shortest_paths
+
+    def all_pairs (self, sources = None) :
+        """ Yield (source id, dist, pred) for all nodes (or the given
+            sources), see shortest_paths.
+        """
+        if sources is None :
+            sources = xrange (self.n)
+        for s in sources :
+            s = self.node_id (s)
+            dist, pred = self.shortest_paths (s)
+            yield s, dist, pred
+    # end def all_pairs
+
+    def path (self, source, target) :
+        """ Addresses on the cheapest path from source to target and
+            its cost, an empty list if target is unreachable.
+        """
+        t          = self.node_id (target)
+        dist, pred = self.shortest_paths (source)
+        if dist [t] == inf :
+            return [], inf
+        p = [t]
+        while pred [p [-1]] != -1 :
+            p.append (pred [p [-1]])
+        return [self.address (v) for v in reversed (p)], dist [t]
+    # end def path
+
+    def articulation_points_and_bridges (self) :
+        """ Node ids of articulation points (nodes whose failure splits
+            the mesh) and bridges (links whose failure splits the mesh)
+            as pairs of node ids. Iterative depth first search (Tarjan),
+            large meshes would exceed the recursion limit.
+        """
+        adj     = self.undirected
+        disc    = array ('l', [-1]) * self.n
+        low     = array ('l', [-1]) * self.n
+        parent  = array ('l', [-1]) * self.n
+        points  = set ()
+        bridges = []
+        t       = 0
+        for root in xrange (self.n) :
+            if disc [root] != -1 or not adj [root] :
+                continue
+            disc [root] = low [root] = t
+            t          += 1
+            children    = 0
+            stack       = [(root, iter (adj [root]))]
+            while stack :
+                v, it = stack [-1]
+                for w in it :
+                    if disc [w] == -1 :
+                        parent [w] = v
+                        disc [w] = low [w] = t
+                        t += 1
+                        if v == root :
+                            children += 1
+                        stack.append ((w, iter (adj [w])))
+                        break
+                    elif w != parent [v] and disc [w] < low [v] :
+                        low [v] = disc [w]
+                else :
+                    stack.pop ()
+                    if stack :
+                        u = parent [v]
+                        if low [v] < low [u] :
+                            low [u] = low [v]
+                        if low [v] > disc [u] :
+                            bridges.append ((u, v))
+                        if u != root and low [v] >= disc [u] :
+                            points.add (u)
+            if children > 1 :
+                points.add (root)
+        return points, bridges
+    # end def articulation_points_and_bridges
+
+    def betweenness (self, samples = None, seed = None) :
+        """ Betweenness centrality (Brandes) on the cost metric: array
+            of the fraction of shortest paths between other nodes that
+            pass through each node. The exact computation needs a
+            shortest path search from every node, with samples only
+            the given number of random sources is used and the result
+            is an estimate.
+        """
+        n       = self.n
+        sources = range (n)
+        if samples and samples < n :
+            sources = random.Random (seed).sample (sources, samples)
+        off     = self.offsets
+        nb      = self.neighbours
+        wt      = self.weights
+        result  = array ('d', [0.0]) * n
+        for s in sources :
+            order = []
+            preds = {}
+            sigma = {s : 1.0}
+            dist  = {}
+            seen  = {s : 0.0}
+            heap  = [(0.0, s, s)]
+            while heap :
+                d, v, p = heappop (heap)
+                if v in dist :
+                    continue
+                if v != s :
+                    sigma [v] += sigma [p]
+                dist [v] = d
+                order.append (v)
+                for k in xrange (off [v], off [v + 1]) :
+                    w  = nb [k]
+                    dw = d + wt [k]
+                    if w not in dist and dw < seen.get (w, inf) :
+                        seen  [w] = dw
+                        sigma [w] = 0.0
+                        preds [w] = [v]
+                        heappush (heap, (dw, w, v))
+                    elif dw == seen.get (w) and w not in dist :
+                        # another shortest path
+                        sigma [w] += sigma [v]
+                        preds [w].append (v)
+            delta = dict.fromkeys (order, 0.0)
+            for w in reversed (order) :
+                for v in preds.get (w, ()) :
+                    delta [v] += sigma [v] / sigma [w] * (1 + delta [w])
+                if w != s :
+                    result [w] += delta [w]
+        scale = 1.0
+        if n > 2 :
+            scale = 1.0 / ((n - 1) * (n - 2))
+        scale *= float (n) / len (sources) if sources else 0
+        for i in xrange (n) :
+            result [i] *= scale
+        return result
+    # end def betweenness
+
+# end class Routing
+
+if __name__ == "__main__" :
+    import sys
+    from optparse    import OptionParser
+    from olsr.parser import get_olsr_container
+
+    cmd = OptionParser \
+        (usage = "%prog [options] file-or-url\n"
+                 "Routing analysis of OLSR topology"
+        )
+    cmd.add_option \
+        ( "-f", "--from"
+        , dest    = "source"
+        , help    = "Print cost of cheapest path from this IP to all nodes"
+        )
+    cmd.add_option \
+        ( "-n", "--top"
+        , dest    = "top"
+        , help    = "Print given number of most central nodes, "
+                    "default: %default"
+        , type    = "int"
+        , default = 20
+        )
+    cmd.add_option \
+        ( "-s", "--samples"
+        , dest    = "samples"
+        , help    = "Estimate centrality from given number of random "
+                    "nodes, default: %default (exact)"
+        , type    = "int"
+        , default = 0
+        )
+    (opt, args) = cmd.parse_args ()
+    if len (args) != 1 :
+        cmd.print_help ()
+        sys.exit (23)
+    r = Routing (get_olsr_container (args [0]).topo)
+    points, bridges = r.articulation_points_and_bridges ()
+    print "Articulation points:"
+    for p in sorted (points, key = lambda p : r.topo.packed [p]) :
+        print "  %s" % r.address (p)
+    print "Bridges:"
+    for a, b in bridges :
+        print "  %s - %s" % (r.address (a), r.address (b))
+    if opt.top :
+        c = r.betweenness (opt.samples)
+        print "Centrality:"
+        for i in sorted (xrange (r.n), key = lambda i : -c [i]) [:opt.top] :
+            print "  %-15s %.4f" % (r.address (i), c [i])
+    if opt.source :
+        dist, pred = r.shortest_paths (opt.source)
+        print "Cost from %s:" % opt.source
+        for i in sorted (xrange (r.n), key = lambda i : dist [i]) :
+            print "  %-15s %s" % (r.address (i), dist [i])
@@ -20,11 +20,18 @@ from   rsclib.autosuper   import autosuper
 from   rsclib.IP_Address  import IP4_Address
 
 class Topo_Entry (autosuper) :
-    """ Model an OLSR topology entry. """
+    """ Model an OLSR topology entry.
+        The addresses may be given as IP4_Address (e.g. shared by all
+        entries of a node).
+    """
 
     def __init__ (self, dst_ip, last_hop, lq, nlq, cost) :
-        self.dst_ip   = IP4_Address (dst_ip)
-        self.last_hop = IP4_Address (last_hop)
+        if not isinstance (dst_ip, IP4_Address) :
+            dst_ip   = IP4_Address (dst_ip)
+        if not isinstance (last_hop, IP4_Address) :
+            last_hop = IP4_Address (last_hop)
+        self.dst_ip   = dst_ip
+        self.last_hop = last_hop
         self.lq       = lq
         self.nlq      = nlq
         self.cost     = cost
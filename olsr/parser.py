@@ -18,33 +18,235 @@
 
 import re
 
+from   array              import array
+from   collections        import namedtuple
+from   itertools          import izip
 from   urlparse           import urlparse
 from   urllib             import urlopen
 from   gzip               import GzipFile
-from   StringIO           import StringIO
+from   zlib               import decompressobj, MAX_WBITS
 from   rsclib.HTML_Parse  import Page_Tree, tag
 from   rsclib.autosuper   import autosuper
-from   rsclib.stateparser import Parser
+from   rsclib.stateparser import Parser, Parse_Error
 from   rsclib.IP_Address  import IP4_Address
 from   olsr.common        import Topo_Entry, HNA_Entry
 from   spider.backfire    import Backfire
+from   spider.session     import Session
+
+class Topology_Index (autosuper) :
+    """ Read-only dict-like view of the entries of a Topology by dst_ip
+        (forward) or by last_hop (reverse). The Topo_Entry objects are
+        created on access.
+    """
+
+    def __init__ (self, topo, reverse = False) :
+        self.topo    = topo
+        self.reverse = reverse
+    # end def __init__
+
+    def get (self, ip, default = None) :
+        try :
+            return self [ip]
+        except KeyError :
+            return default
+    # end def get
+
+    def iteritems (self) :
+        for i in self.node_ids () :
+            yield self.topo.addresses [i], self.topo.node_entries \
+                (i, self.reverse)
+    # end def iteritems
+
+    def iterkeys (self) :
+        for i in self.node_ids () :
+            yield self.topo.addresses [i]
+    # end def iterkeys
+
+    def itervalues (self) :
+        for i in self.node_ids () :
+            yield self.topo.node_entries (i, self.reverse)
+    # end def itervalues
+
+    def items (self) :
+        return list (self.iteritems ())
+    # end def items
+
+    def keys (self) :
+        return list (self.iterkeys ())
+    # end def keys
+
+    def node_ids (self) :
+        """ Ids of all nodes with entries """
+        offsets = self.topo.adjacency (self.reverse) [0]
+        for i in xrange (len (offsets) - 1) :
+            if offsets [i] != offsets [i + 1] :
+                yield i
+    # end def node_ids
+
+    def values (self) :
+        return list (self.itervalues ())
+    # end def values
+
+    def __contains__ (self, ip) :
+        return self.get (ip) is not None
+    # end def __contains__
+
+    def __getitem__ (self, ip) :
+        entries = self.topo.node_entries (self.topo.node_id (ip), self.reverse)
+        if not entries :
+            raise KeyError (ip)
+        return entries
+    # end def __getitem__
+
+    def __iter__ (self) :
+        return self.iterkeys ()
+    # end def __iter__
+
+    def __len__ (self) :
+        return sum (1 for i in self.node_ids ())
+    # end def __len__
+
+# end class Topology_Index
 
 class Topology (autosuper) :
+    """ OLSR topology stored in arrays: each node (IP address) gets an
+        integer id, the node with id i has the address addresses [i]
+        (an IP4_Address) and packed [i] (the address as an integer).
+        Each entry (link) is stored as a row of the columns dst_ids,
+        hop_ids (node ids of dst_ip and last_hop), lq, nlq and cost.
+        For graph computations adjacency returns the entries of each
+        node in compressed sparse row form.
+        The entries by dst_ip (forward) and by last_hop (reverse) are
+        available as dict-like views with lists of Topo_Entry.
+    """
 
     def __init__ (self) :
-        self.forward = {}
-        self.reverse = {}
+        self.ids       = {} # node id by address string
+        self.addresses = []
+        self.packed    = array ('L')
+        self.dst_ids   = array ('L')
+        self.hop_ids   = array ('L')
+        self.lq        = array ('d')
+        self.nlq       = array ('d')
+        self.cost      = array ('d')
+        self._csr      = {}
+        self.forward   = Topology_Index (self)
+        self.reverse   = Topology_Index (self, reverse = True)
     # end def __init__
 
     def add (self, entry) :
-        if entry.dst_ip not in self.forward :
-            self.forward [entry.dst_ip] = []
-        self.forward [entry.dst_ip].append (entry)
-        if entry.last_hop not in self.reverse :
-            self.reverse [entry.last_hop] = []
-        self.reverse [entry.last_hop].append (entry)
+        self.add_row \
+            (entry.dst_ip, entry.last_hop, entry.lq, entry.nlq, entry.cost)
     # end def add
 
+    def add_row (self, dst_ip, last_hop, lq, nlq, cost) :
+        """ Add entry, the addresses are strings, IP4_Address or node
+            ids. Return the row of the new entry.
+        """
+        if not isinstance (dst_ip, (int, long)) :
+            dst_ip   = self.intern (dst_ip)
+        if not isinstance (last_hop, (int, long)) :
+            last_hop = self.intern (last_hop)
+        self.dst_ids.append (dst_ip)
+        self.hop_ids.append (last_hop)
+        self.lq.append   (lq)
+        self.nlq.append  (nlq)
+        self.cost.append (cost)
+        self._csr = {}
+        return len (self.cost) - 1
+    # end def add_row
+
+    def adjacency (self, reverse = False) :
+        """ Compressed sparse row form of the entries by dst_ip (by
+            last_hop if reverse is True): three arrays offsets,
+            neighbours and rows. The entries of the node with id i are
+            the rows [offsets [i]:offsets [i + 1]] of the columns,
+            neighbours are the node ids at the other end of the
+            entries (last_hop or dst_ip, respectively). Entries of a
+            node are in the order in which they were added.
+        """
+        if reverse not in self._csr :
+            keys, other = self.dst_ids, self.hop_ids
+            if reverse :
+                keys, other = other, keys
+            n       = len (self.addresses)
+            offsets = array ('L', [0]) * (n + 1)
+            for k in keys :
+                offsets [k + 1] += 1
+            for i in xrange (n) :
+                offsets [i + 1] += offsets [i]
+            pos     = array ('L', offsets)
+            rows    = array ('L', [0]) * len (keys)
+            for r, k in enumerate (keys) :
+                rows [pos [k]] = r
+                pos  [k]      += 1
+            neighbours = array ('L', (other [r] for r in rows))
+            self._csr [reverse] = (offsets, neighbours, rows)
+        return self._csr [reverse]
+    # end def adjacency
+
+    def entry (self, row) :
+        """ Topo_Entry for the given row """
+        return Topo_Entry \
+            ( self.addresses [self.dst_ids [row]]
+            , self.addresses [self.hop_ids [row]]
+            , self.lq   [row]
+            , self.nlq  [row]
+            , self.cost [row]
+            )
+    # end def entry
+
+    def intern (self, ip) :
+        """ Node id of ip (string or IP4_Address), new nodes are added """
+        key = str (ip)
+        try :
+            return self.ids [key]
+        except KeyError :
+            pass
+        if not isinstance (ip, IP4_Address) :
+            ip = IP4_Address (ip)
+        # Different strings may denote the same address
+        norm = str (ip)
+        if norm not in self.ids :
+            self.ids [norm] = len (self.addresses)
+            self.addresses.append (ip)
+            self.packed.append (ip.ip)
+        i = self.ids [key] = self.ids [norm]
+        return i
+    # end def intern
+
+    def node_entries (self, i, reverse = False) :
+        """ List of Topo_Entry of node with id i """
+        offsets, neighbours, rows = self.adjacency (reverse)
+        return [self.entry (r) for r in rows [offsets [i]:offsets [i + 1]]]
+    # end def node_entries
+
+    def node_id (self, ip) :
+        """ Id of an existing node, raises KeyError """
+        return self.ids [str (ip)]
+    # end def node_id
+
+    def remove_row (self, row) :
+        """ Remove entry in given row: the last row is moved to this
+            row. Return the old index of the moved row.
+        """
+        last = len (self.cost) - 1
+        for col in self.dst_ids, self.hop_ids, self.lq, self.nlq, self.cost :
+            col [row] = col [last]
+            col.pop ()
+        self._csr = {}
+        return last
+    # end def remove_row
+
+    def update_row (self, row, lq, nlq, cost) :
+        """ Change link quality and cost of the entry in row, this
+            doesn't change the adjacency.
+        """
+        self.lq   [row] = lq
+        self.nlq  [row] = nlq
+        self.cost [row] = cost
+    # end def update_row
+
 # end class Topology
 
 class MID (autosuper) :
@@ -83,6 +285,143 @@ class HNA (autosuper) :
 
 # end class HNA
 
+# Differences between two snapshots of a table: lists of added and
+# removed entries and of (old, new) pairs of changed entries
+Delta = namedtuple ('Delta', ('added', 'removed', 'changed'))
+
+def delta (old, new, changed) :
+    """ Delta of two dicts of entries by key, changed (old, new)
+        decides if an entry with the same key has changed.
+    """
+    return Delta \
+        ( [new [k] for k in new if k not in old]
+        , [old [k] for k in old if k not in new]
+        , [ (old [k], new [k]) for k in new
+            if k in old and changed (old [k], new [k])
+          ]
+        )
+# end def delta
+
+def hna_delta (old, new) :
+    """ Delta of two HNA tables, an entry has changed if its gateway
+        differs.
+    """
+    return delta (old.by_dest, new.by_dest, lambda o, n : o.gw != n.gw)
+# end def hna_delta
+
+def mid_delta (old, new) :
+    """ Delta of two MID tables, entries are (ip, aliases) pairs, an
+        entry has changed if its aliases differ.
+    """
+    return delta \
+        ( dict ((k, (k, v)) for k, v in old.by_ip.iteritems ())
+        , dict ((k, (k, v)) for k, v in new.by_ip.iteritems ())
+        , lambda o, n : o [1] != n [1]
+        )
+# end def mid_delta
+
+# Deltas of the topology, MID and HNA tables of an OLSR_State update
+State_Delta = namedtuple ('State_Delta', ('topo', 'mid', 'hna'))
+
+class OLSR_State (autosuper) :
+    """ OLSR container (with topo, mid and hna like the parsers) that
+        is updated in place from repeated snapshots, e.g., polling the
+        txtinfo plugin. Each update computes the delta to the previous
+        state (see State_Delta), applies it and passes it to all
+        subscribers. The topology delta is computed on the arrays of
+        the Topology: an entry has changed if its link quality or cost
+        differs. Node ids of the topology are stable, nodes are never
+        removed (but may be left without entries).
+    """
+
+    def __init__ (self) :
+        self.hna         = HNA      ()
+        self.mid         = MID      ()
+        self.topo        = Topology ()
+        self.rows        = {} # row of entry by (dst id, hop id)
+        self.subscribers = []
+    # end def __init__
+
+    def read (self, file_or_url) :
+        """ Read new snapshot and update, see update """
+        return self.update (get_olsr_container (file_or_url))
+    # end def read
+
+    def subscribe (self, callback) :
+        """ Call callback with state and delta after each update """
+        self.subscribers.append (callback)
+    # end def subscribe
+
+    def unsubscribe (self, callback) :
+        self.subscribers.remove (callback)
+    # end def unsubscribe
+
+    def update (self, olsr) :
+        """ Update from a new snapshot (a parsed OLSR container), return
+            the State_Delta.
+        """
+        d = State_Delta \
+            ( self.update_topo (olsr.topo)
+            , mid_delta (self.mid, olsr.mid)
+            , hna_delta (self.hna, olsr.hna)
+            )
+        for k, v in d.mid.removed :
+            del self.mid.by_ip [k]
+        for k, v in d.mid.added + [n for o, n in d.mid.changed] :
+            self.mid.by_ip [k] = v
+        for h in d.hna.removed :
+            del self.hna.by_dest [h.dest]
+        for h in d.hna.added + [n for o, n in d.hna.changed] :
+            self.hna.by_dest [h.dest] = h
+        for callback in self.subscribers :
+            callback (self, d)
+        return d
+    # end def update
+
+    def update_topo (self, new) :
+        """ Apply entries of Topology new, return the Delta """
+        topo    = self.topo
+        rows    = self.rows
+        ids     = [topo.intern (a) for a in new.addresses]
+        # Row of each entry of new, the last one wins for duplicates
+        last    = dict \
+            ( ((ids [d], ids [h]), r)
+              for r, (d, h) in enumerate (izip (new.dst_ids, new.hop_ids))
+            )
+        seen    = set ()
+        added   = []
+        changed = []
+        for r, (d, h) in enumerate (izip (new.dst_ids, new.hop_ids)) :
+            key     = (ids [d], ids [h])
+            if last [key] != r :
+                continue
+            metrics = (new.lq [r], new.nlq [r], new.cost [r])
+            row     = rows.get (key)
+            if row is None :
+                added.append ((key, metrics))
+                continue
+            seen.add (row)
+            if (topo.lq [row], topo.nlq [row], topo.cost [row]) != metrics :
+                old = topo.entry (row)
+                topo.update_row (row, * metrics)
+                changed.append ((old, topo.entry (row)))
+        removed = []
+        # Remove from the end: the row moved by remove_row is never a
+        # row still to be removed
+        for row in sorted (set (rows.itervalues ()) - seen, reverse = True) :
+            removed.append (topo.entry (row))
+            del rows [(topo.dst_ids [row], topo.hop_ids [row])]
+            last = topo.remove_row (row)
+            if last != row :
+                rows [(topo.dst_ids [row], topo.hop_ids [row])] = row
+        for key, metrics in added :
+            rows [key] = topo.add_row (* (key + metrics))
+        return Delta \
+            ([topo.entry (rows [k]) for k, m in added], removed, changed)
+    # end def update_topo
+
+# end class OLSR_State
+
 class OLSR_Parser (Parser) :
     re_mid_head  = re.compile (r"IP address\s+Aliases")
     re_topo_head = re.compile \
@@ -139,6 +478,89 @@ class OLSR_Parser (Parser) :
 
 # end class OLSR_Parser
 
+class Txtinfo_Parser (autosuper) :
+    """ Fast parser for the output of the OLSR txtinfo plugin, fills
+        the same containers as OLSR_Parser. Instead of running each
+        line through the state machine (with several regexes per
+        line) the lines of the MID, Topology and HNA tables are split
+        into columns directly, topology lines are added to the columns
+        of the Topology without creating a Topo_Entry. Lines the
+        fast path can't handle are checked with the regexes of
+        OLSR_Parser, a table ends with the first line that doesn't
+        match.
+    """
+
+    def __init__ (self, * args, ** kw) :
+        self.hna    = HNA      ()
+        self.mid    = MID      ()
+        self.topo   = Topology ()
+        self.tables = \
+            { "Table: MID"      : (OLSR_Parser.re_mid_head,  self.mid_line)
+            , "Table: Topology" : (OLSR_Parser.re_topo_head, self.topo_line)
+            , "Table: HNA"      : (OLSR_Parser.re_hna_head,  self.hna_line)
+            }
+    # end def __init__
+
+    def parse (self, file) :
+        head  = None
+        table = None
+        for n, line in enumerate (file) :
+            line = line.rstrip ()
+            if head is not None :
+                if not head.search (line) :
+                    raise Parse_Error ("%s: %s" % (n + 1, line))
+                head = None
+                continue
+            if table is not None :
+                if table (line) :
+                    continue
+                table = None
+            if line in self.tables :
+                head, table = self.tables [line]
+    # end def parse
+
+    def hna_line (self, line) :
+        m = OLSR_Parser.re_hna_line.search (line)
+        if not m :
+            return False
+        self.hna.add (HNA_Entry (m.group (1), m.group (4)))
+        return True
+    # end def hna_line
+
+    def mid_line (self, line) :
+        m = OLSR_Parser.re_mid_line.search (line)
+        if not m :
+            return False
+        aliases = (x.strip () for x in m.group (2).split (';'))
+        self.mid.add (m.group (1), * aliases)
+        return True
+    # end def mid_line
+
+    def metric (self, v) :
+        if v == 'INFINITE' :
+            return float ('inf')
+        return float (v)
+    # end def metric
+
+    def topo_line (self, line) :
+        try :
+            dst, hop, lq, nlq, cost = line.split ()
+            if not dst [0].isdigit () :
+                return False
+            metrics = [self.metric (v) for v in (lq, nlq, cost)]
+        except ValueError :
+            m = OLSR_Parser.re_topo_line.search (line)
+            if not m :
+                return False
+            g        = m.groups ()
+            dst, hop = g [:2]
+            metrics  = [self.metric (v) for v in g [2:]]
+        self.topo.add_row (dst, hop, * metrics)
+        return True
+    # end def topo_line
+
+# end class Txtinfo_Parser
+
 class Backfire_OLSR_Parser (autosuper) :
 
     def __init__ (self, site) :
@@ -147,12 +569,56 @@ class Backfire_OLSR_Parser (autosuper) :
         self.topo = Topology ()
         d = dict (hna = self.hna, mid = self.mid, topo = self.topo)
         self.__super.__init__ (site = site)
-        Backfire (site = site, request = d)
+        session = Session ()
+        try :
+            Backfire (site = site, request = d, session = session)
+        finally :
+            session.close ()
     # end def __init__
 
 # end class Backfire_OLSR_Parser
 
+def read_lines (f, compressed = False, blocksize = 16384) :
+    """ Iterate over the lines read from the file-like object f in
+        blocks of blocksize bytes, gzip compressed data is decompressed
+        if compressed is True. Unlike GzipFile this doesn't need to seek
+        in f, so lines are available while the data is still arriving,
+        e.g., from a HTTP response (which is unbuffered, reading it
+        line by line would read single bytes). Concatenated gzip
+        members are decompressed one after the other.
+    """
+    z    = None
+    rest = ''
+    if compressed :
+        z = decompressobj (16 + MAX_WBITS)
+    while True :
+        data = f.read (blocksize)
+        if not data :
+            break
+        while data :
+            text = data
+            data = None
+            if z :
+                text = z.decompress (text)
+                data = z.unused_data
+                if data :
+                    z = decompressobj (16 + MAX_WBITS)
+            lines = (rest + text).split ('\n')
+            rest  = lines.pop ()
+            for line in lines :
+                yield line + '\n'
+    if z :
+        rest += z.flush ()
+    if rest :
+        yield rest
+# end def read_lines
+
 def get_olsr_container (file_or_url) :
+    """ Parse OLSR information from a file or URL (txtinfo output,
+        possibly gzip compressed if the name ends in .gz) or from the
+        web interface of a backfire router (URL without path). The
+        input is parsed line by line while it is read.
+    """
     if  (  file_or_url.startswith ('http://')
         or file_or_url.startswith ('https://')
         ) :
@@ -161,21 +627,26 @@ def get_olsr_container (file_or_url) :
         if p and '.' in p or ':' in p :
             p = None
         if not r.path :
-            olsr = Backfire_OLSR_Parser (site = file_or_url)
-        else :
-            f = urlopen (file_or_url)
-            if file_or_url.endswith ('.gz') :
-                c = f.read ()
-                f = GzipFile (None, 'r', 9, StringIO (c))
-            olsr = OLSR_Parser (verbose = 0)
-            olsr.parse (f)
+            return Backfire_OLSR_Parser (site = file_or_url)
+        f     = urlopen (file_or_url)
+        lines = read_lines \
+            ( f
+            , compressed =
+                (  file_or_url.endswith ('.gz')
+                or f.info ().get ('Content-Encoding') == 'gzip'
+                )
+            )
     else :
         if file_or_url.endswith ('.gz') :
             f = GzipFile (file_or_url, 'r')
         else :
             f = open (file_or_url, 'r')
-        olsr = OLSR_Parser (verbose = 0)
-        olsr.parse (f)
+        lines = f
+    olsr = Txtinfo_Parser ()
+    try :
+        olsr.parse (lines)
+    finally :
+        f.close ()
     return olsr
 # end def get_olsr_container
 
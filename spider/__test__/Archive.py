@@ -0,0 +1,78 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import shutil
+import tempfile
+from   spider.archive             import Archive, write_archive
+from   spider.__test__.Extract    import guess, summary
+
+_test_archive = """
+    >>> tmp = tempfile.mkdtemp ()
+    >>> fn  = os.path.join (tmp, 'dump.archive')
+    >>> bf  = guess ('backfire', 'Backfire')
+    >>> ff  = guess ('freifunk', 'Freifunk')
+    >>> results = \\
+    ...     { '10.0.0.10' : bf
+    ...     , '10.0.0.9'  : ff
+    ...     , '10.0.1.1'  : ('Timeout_Error', 'timed out')
+    ...     , '9.0.0.1'   : ('ValueError', ValueError ('Unknown Web Frontend'))
+    ...     }
+    >>> write_archive (fn, results, chunk_size = 2)
+    >>> archive = Archive (fn)
+    >>> len (archive), len (archive.index)
+    (4, 2)
+
+    Nodes are sorted by IP, errors are stored as name and message
+
+    >>> for ip, r in archive :
+    ...     print ip, r
+    9.0.0.1 ('ValueError', u'Unknown Web Frontend')
+    10.0.0.9 Freifunk Version: v1.7.4 
+    10.0.0.10 Backfire Version: Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.0
+    10.0.1.1 ('Timeout_Error', u'timed out')
+
+    Interfaces, addresses and wireless configuration of the results are
+    the same as in the original
+
+    >>> restored = dict (archive)
+    >>> restored ['10.0.0.10'] == bf, restored ['10.0.0.9'] == ff
+    (True, True)
+    >>> summary (restored ['10.0.0.10']) == summary (bf)
+    True
+    >>> summary (restored ['10.0.0.9']) == summary (ff)
+    True
+    >>> wlan = ff.interfaces ['eth1'].wlan_info
+    >>> restored ['10.0.0.9'].interfaces ['eth1'].wlan_info.__class__.__name__
+    'WLAN_Config_Freifunk'
+    >>> r = restored ['10.0.0.9'].interfaces ['eth1'].wlan_info
+    >>> (r.signal, r.noise, r.bssid) == (wlan.signal, wlan.noise, wlan.bssid)
+    True
+    >>> restored ['10.0.0.10'].fingerprint == bf.fingerprint
+    True
+
+    Only the chunks of the requested range of IPs are read
+
+    >>> [ip for c in archive.chunks ('10.0.0.10', '10.0.0.10') for ip, r in c]
+    ['10.0.0.10', '10.0.1.1']
+    >>> archive.close ()
+    >>> shutil.rmtree (tmp)
+"""
+
+__test__ = dict \
+    ( archive = _test_archive
+    )
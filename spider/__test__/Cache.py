@@ -0,0 +1,72 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+import os
+import shutil
+import tempfile
+from   datetime                   import timedelta
+from   spider.cache               import Backend_Cache
+from   spider.__test__.Extract    import guess
+
+_test_cache = """
+    >>> tmp   = tempfile.mkdtemp ()
+    >>> fn    = os.path.join (tmp, 'backend.cache')
+    >>> cache = Backend_Cache (fn, ttl = timedelta (hours = 1))
+    >>> bf    = guess ('backfire', 'Backfire')
+    >>> cache.update ('10.0.0.1', bf)
+    >>> cache.get ('10.0.0.1') == bf.fingerprint
+    True
+    >>> cache.get ('10.0.0.2') is None
+    True
+
+    Entries expire after the ttl
+
+    >>> cache.get ('10.0.0.1', now = bf.time + timedelta (minutes = 59)) [0]
+    'Backfire'
+    >>> print cache.get ('10.0.0.1', now = bf.time + timedelta (minutes = 61))
+    None
+
+    A result found with the cached backend keeps the time of detection,
+    so the backend is guessed again after the ttl
+
+    >>> bf2 = guess ('backfire', 'Backfire')
+    >>> bf2.cached, bf2.time > bf.time
+    (True, True)
+    >>> cache.update ('10.0.0.1', bf2)
+    >>> cache.by_ip ['10.0.0.1'][0] == bf.time
+    True
+
+    Timeouts keep the entry, unparseable information removes it
+
+    >>> cache.update ('10.0.0.1', ('Timeout_Error', 'timed out'))
+    >>> cache.get ('10.0.0.1') == bf.fingerprint
+    True
+    >>> cache.save ()
+    >>> cache.update ('10.0.0.1', ('ValueError', 'No interface config'))
+    >>> print cache.get ('10.0.0.1')
+    None
+    >>> cache.update ('10.0.0.1', ('ValueError', 'No interface config'))
+
+    The saved cache still has the entry
+
+    >>> Backend_Cache (fn).get ('10.0.0.1') == bf.fingerprint
+    True
+    >>> shutil.rmtree (tmp)
+"""
+
+__test__ = dict \
+    ( cache = _test_cache
+    )
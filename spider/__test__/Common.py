@@ -0,0 +1,158 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import pickle
+
+# for pickle
+from   spider.common      import Interface, Net_Link, Inet4, Inet6, WLAN_Config
+from   spider.common      import unroutable, unroutable_flags, unroutable_masks
+from   spider.common      import is_rfc1918, is_local, is_link_local
+from   rsclib.IP_Address  import IP4_Address
+
+dumps = os.path.join (os.path.dirname (os.path.abspath (__file__)), 'dumps')
+
+def text (dump) :
+    """ Interfaces and IPs of dump in a stable order """
+    r = []
+    for name in sorted (dump ['interfaces']) :
+        r.append (str (dump ['interfaces'][name]))
+    r.extend (sorted (str (i) for i in dump ['ips']))
+    return '\n'.join (r) + '\n'
+# end def text
+
+_test_old_pickle = """
+    common.pickle was written by the classes of spider.common before
+    addresses were stored as integers, common.txt is their output.
+
+    >>> old = pickle.load (open (os.path.join (dumps, 'common.pickle')))
+    >>> expected = open (os.path.join (dumps, 'common.txt')).read ()
+    >>> text (old) == expected
+    True
+    >>> new = pickle.loads (pickle.dumps (old, pickle.HIGHEST_PROTOCOL))
+    >>> text (new) == expected
+    True
+    >>> new == old
+    True
+
+    Only addresses which are converted back to the same text are
+    stored as integers
+
+    >>> eth0, wlan0 = old ['interfaces']['eth0'], old ['interfaces']['wlan0']
+    >>> wlan1 = old ['interfaces']['wlan1']
+    >>> def is_text (* values) :
+    ...     return tuple (isinstance (v, basestring) for v in values)
+    >>> is_text (eth0.link._mac, wlan0.link._mac, wlan0.link._bcast)
+    (True, True, False)
+    >>> is_text (* (i._ip for i in eth0.inet6 + wlan0.inet6 + eth0.inet4))
+    (True, False, False)
+    >>> is_text (wlan0.wlan_info._bssid, wlan1.wlan_info._bssid)
+    (True, False)
+    >>> Inet6 ('FD00::1', 64, None) == Inet6 ('fd00::1', 64, None)
+    False
+"""
+
+_test_wlan_extra = """
+    Unknown keys are kept in extra, for keyword arguments and for the
+    state of (old) pickles
+
+    >>> w = WLAN_Config (ssid = 'x', mode = 'adhoc', encryption = 'none')
+    >>> w.mode, w.extra, w.encryption
+    ('Ad_Hoc', {'encryption': 'none'}, 'none')
+    >>> w.set (encryption = 'wpa', txpower = '20')
+    >>> sorted (w.extra.items ())
+    [('encryption', 'none'), ('txpower', '20')]
+    >>> w.noise = 5
+    >>> w.rate = 54
+    Traceback (most recent call last):
+      ...
+    AttributeError: 'WLAN_Config' object has no attribute 'rate'
+    >>> w2 = WLAN_Config.__new__ (WLAN_Config)
+    >>> w2.__setstate__ \\
+    ...     (dict (ssid = 'y', bssid = '02:CA:FF:EE:BA:BE', rate = 54))
+    >>> w2.ssid, w2.bssid, w2.extra, w2.rate
+    ('y', '02:CA:FF:EE:BA:BE', {'rate': 54}, 54)
+    >>> w3 = pickle.loads (pickle.dumps (w, pickle.HIGHEST_PROTOCOL))
+    >>> w3 == w, w3.noise, sorted (w3.extra.items ())
+    (True, 5, [('encryption', 'none'), ('txpower', '20')])
+"""
+
+_test_unroutable = """
+    The networks are checked with one integer mask per prefix length
+
+    >>> for mask, nets in unroutable_masks :
+    ...     print '%08x' % mask, sorted ('%08x' % n for n in nets)
+    ffff0000 ['a9fe0000', 'c0a80000']
+    fff00000 ['ac100000']
+    ff000000 ['0a000000', '7f000000']
+
+    Addresses at the borders of the unroutable networks, flags are the
+    same as those of the checks with IP4_Address
+
+    >>> ips = \\
+    ...     [ '9.255.255.255', '10.0.0.0', '10.255.255.255', '11.0.0.0'
+    ...     , '172.15.255.255', '172.16.0.0', '172.31.255.255', '172.32.0.0'
+    ...     , '192.167.255.255', '192.168.0.1', '192.169.0.0'
+    ...     , '126.255.255.255', '127.0.0.1', '128.0.0.0'
+    ...     , '169.253.255.255', '169.254.1.1', '169.255.0.0'
+    ...     , '193.238.156.1', '0.0.0.0', '255.255.255.255'
+    ...     ]
+    >>> flags = unroutable_flags (ips)
+    >>> for ip, f in zip (ips, flags) :
+    ...     print '%-16s %s' % (ip, f)
+    9.255.255.255    0
+    10.0.0.0         1
+    10.255.255.255   1
+    11.0.0.0         0
+    172.15.255.255   0
+    172.16.0.0       1
+    172.31.255.255   1
+    172.32.0.0       0
+    192.167.255.255  0
+    192.168.0.1      1
+    192.169.0.0      0
+    126.255.255.255  0
+    127.0.0.1        1
+    128.0.0.0        0
+    169.253.255.255  0
+    169.254.1.1      1
+    169.255.0.0      0
+    193.238.156.1    0
+    0.0.0.0          0
+    255.255.255.255  0
+    >>> def check (ip) :
+    ...     ip = IP4_Address (ip)
+    ...     return is_rfc1918 (ip) or is_local (ip) or is_link_local (ip)
+    >>> [bool (f) for f in flags] == [bool (check (ip)) for ip in ips]
+    True
+    >>> [bool (f) for f in flags] == [unroutable (ip) for ip in ips]
+    True
+
+    Addresses that can't be parsed are flagged unroutable, unroutable
+    itself also accepts networks
+
+    >>> list (unroutable_flags (['10.0.0.1', 'fe80::1', None, 'node']))
+    [1, 1, 1, 1]
+    >>> unroutable ('10.1.0.0/16'), unroutable ('193.238.0.0/16')
+    (True, False)
+"""
+
+__test__ = dict \
+    ( old_pickle = _test_old_pickle
+    , wlan_extra = _test_wlan_extra
+    , unroutable = _test_unroutable
+    )
@@ -0,0 +1,76 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import pickle
+from   spider.diff                import diff_sources, Diff_Table
+from   spider.parser              import sorted_results
+from   spider.__test__.Extract    import guess
+
+def copy (g) :
+    """ Copy of Guess g (as after reading a pickle dump) """
+    return pickle.loads (pickle.dumps (g, pickle.HIGHEST_PROTOCOL))
+# end def copy
+
+_test_diff = """
+    >>> bf  = guess ('backfire', 'Backfire')
+    >>> ff  = guess ('freifunk', 'Freifunk')
+    >>> bf2 = copy (bf)
+    >>> bf2.version = 'Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.1'
+    >>> del bf2.interfaces ['eth0.1']
+    >>> for i in [i for i in bf2.ips if i.ip == '193.238.157.19'] :
+    ...     del bf2.ips [i]
+    >>> bf2.interfaces ['wlan0'].wlan_info.channel = '11'
+    >>> bf2.interfaces ['wlan0'].mtu = 1528
+    >>> old = \\
+    ...     { '10.0.0.1' : bf
+    ...     , '10.0.0.2' : ('Timeout_Error', 'timed out')
+    ...     , '10.0.0.3' : ff
+    ...     , '10.0.0.4' : ('ValueError', 'Unknown Web Frontend')
+    ...     , '10.0.0.6' : ff
+    ...     }
+    >>> new = \\
+    ...     { '10.0.0.1' : bf2
+    ...     , '10.0.0.2' : copy (ff)
+    ...     , '10.0.0.4' : ('Timeout_Error', 'timed out')
+    ...     , '10.0.0.5' : ('Timeout_Error', 'timed out')
+    ...     , '10.0.0.6' : copy (ff)
+    ...     }
+    >>> changes = list \\
+    ...     (diff_sources (sorted_results (old), sorted_results (new)))
+    >>> [(ip, r is new.get (ip)) for ip, r, c in changes]
+    [('10.0.0.1', True), ('10.0.0.2', True), ('10.0.0.3', True), ('10.0.0.4', True), ('10.0.0.5', True)]
+    >>> print Diff_Table.format ([(ip, c) for ip, r, c in changes]).replace ('\\r', '')
+    10.0.0.1;version;;Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.0;Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.1
+    10.0.0.1;interface;eth0.1;eth0.1;
+    10.0.0.1;mtu;wlan0;1500;1528
+    10.0.0.1;channel;wlan0;3;11
+    10.0.0.1;ip;193.238.157.19;193.238.157.19;
+    10.0.0.2;error;;Timeout_Error;
+    10.0.0.3;node;;Freifunk;
+    10.0.0.4;error;;ValueError;Timeout_Error
+    10.0.0.5;node;;;Timeout_Error
+    <BLANKLINE>
+
+    Unchanged runs have no differences
+
+    >>> list (diff_sources (sorted_results (new), sorted_results (new)))
+    []
+"""
+
+__test__ = dict \
+    ( diff = _test_diff
+    )
@@ -0,0 +1,153 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+
+from   spider.backfire    import Interfaces_Extractor
+from   spider.freifunk    import Status_Extractor
+from   spider.parser      import Guess
+from   spider.session     import Page
+
+pages = os.path.join (os.path.dirname (os.path.abspath (__file__)), 'pages')
+
+def guess (name, backend, use_tree = False) :
+    """ Guess of the recorded pages in directory name of pages for the
+        given backend. With use_tree the pages are parsed into a tree by
+        tidy like before the extractors were introduced.
+    """
+    site = 'file://' + os.path.join (pages, name)
+    Page.use_tree = use_tree
+    try :
+        return Guess \
+            (site = site, ip = name, fingerprint = (backend, dict (site = site)))
+    finally :
+        Page.use_tree = False
+# end def guess
+
+def summary (g) :
+    """ Type, version, interfaces and IPs of Guess g in a stable order """
+    r = [str (g)]
+    for name in sorted (g.interfaces) :
+        r.append (str (g.interfaces [name]))
+    r.extend (sorted (str (i) for i in g.ips))
+    return '\n'.join (r)
+# end def summary
+
+def found (x) :
+    """ Number of elements found by Extractor x by key """
+    for k in sorted (x.found) :
+        print k, len (x.found [k])
+# end def found
+
+_test_backfire = """
+    >>> bf = guess ('backfire', 'Backfire')
+    >>> bf.cached
+    True
+    >>> old = guess ('backfire', 'Backfire', use_tree = True)
+    >>> bf == old, summary (bf) == summary (old)
+    (True, True)
+    >>> print summary (bf)
+    Backfire Version: Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.0
+    Interface (eth0.1, 4, is_wlan=False)
+        Inet4 (193.238.157.19/255.255.255.0, 193.238.157.255, None)
+    Interface (wlan0, 1, is_wlan=True)
+        Inet4 (193.238.156.18/255.255.0.0, 193.238.159.255, None)
+        Inet6 (fd00:10:10:18::1/64, fd00:10:10:18::ffff, None)
+        WLAN_Config
+            ( ssid=www.funkfeuer.at
+            , mode=Ad_Hoc
+            , channel=3
+            , bssid=02:ca:ff:ee:ba:be
+            , signal=-71
+            , noise=-95
+            )
+    Inet4 (193.238.156.18/255.255.0.0, 193.238.159.255, None)
+    Inet4 (193.238.157.19/255.255.255.0, 193.238.157.255, None)
+
+    Extraction stops after the footer with the luci version, the
+    interface table was seen before
+
+    >>> fn = os.path.join \\
+    ...     (pages, 'backfire', 'cgi-bin', 'luci', 'freifunk', 'olsr', 'interfaces')
+    >>> x = Interfaces_Extractor ().run (open (fn).read ().decode ('utf-8'))
+    >>> found (x)
+    a 1
+    div 4
+    p 1
+    >>> [name for name, elem, key in x.stack]
+    [u'html', u'body']
+"""
+
+_test_freifunk = """
+    >>> ff = guess ('freifunk', 'Freifunk')
+    >>> old = guess ('freifunk', 'Freifunk', use_tree = True)
+    >>> ff == old, summary (ff) == summary (old)
+    (True, True)
+    >>> print summary (ff)
+    Freifunk Version: v1.7.4 
+    Interface (br0, 5, is_wlan=False)
+        Net_Link (ether, 00:16:b6:d9:39:12, ff:ff:ff:ff:ff:ff)
+        Inet4 (192.168.1.1/24, 192.168.1.255, global)
+        Inet4 (193.238.157.1/26, 193.238.157.63, global)
+    Interface (eth1, 3, is_wlan=True)
+        Net_Link (ether, 00:16:b6:d9:39:14, ff:ff:ff:ff:ff:ff)
+        Inet4 (193.238.156.9/16, 193.238.159.255, global)
+        WLAN_Config_Freifunk
+            ( ssid=www.funkfeuer.at
+            , mode=Ad_Hoc
+            , channel=3
+            , bssid=02:CA:FF:EE:BA:BE
+            , signal=-75
+            , noise=-92
+            )
+    Interface (vlan1, 4, is_wlan=False)
+        Net_Link (ether, 00:16:b6:d9:39:12, ff:ff:ff:ff:ff:ff)
+        Inet4 (193.238.158.8/28, 193.238.158.15, global)
+    Inet4 (193.238.156.9/16, 193.238.159.255, global)
+    Inet4 (193.238.157.1/26, 193.238.157.63, global)
+    Inet4 (193.238.158.8/28, 193.238.158.15, global)
+
+    HTMLParser can't parse the next page, it is parsed by tidy instead
+
+    >>> broken = os.path.join (pages, 'freifunk-broken', 'cgi-bin-status.html')
+    >>> Status_Extractor ().run (open (broken).read ().decode ('latin1'))
+    ... # doctest:+ELLIPSIS
+    Traceback (most recent call last):
+      ...
+    HTMLParseError: unknown status keyword ...'foo' in marked section, ...
+    >>> summary (guess ('freifunk-broken', 'Freifunk')) == summary (ff)
+    True
+
+    Only the table cell with the WLAN config and the small text with
+    the version are kept, extraction stops after them
+
+    >>> fn = os.path.join (pages, 'freifunk', 'cgi-bin-status.html')
+    >>> x = Status_Extractor ().run (open (fn).read ().decode ('latin1'))
+    >>> found (x)
+    ifconfig 1
+    small 1
+    td 1
+    >>> print x.found ['small'][0].text
+    v1.7.4 
+    >>> [name for name, elem, key in x.stack]
+    [u'html', u'body']
+"""
+
+__test__ = dict \
+    ( backfire = _test_backfire
+    , freifunk = _test_freifunk
+    )
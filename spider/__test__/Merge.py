@@ -0,0 +1,79 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   spider.parser              import merge_result, merge_sources
+from   spider.parser              import sorted_results
+from   spider.__test__.Extract    import guess
+
+def fold (dumps) :
+    """ Merge dumps one after the other into a dict like parser.main
+        did before the results were merged as streams.
+    """
+    ipdict = {}
+    for d in dumps :
+        for k, v in d.iteritems () :
+            merge_result (ipdict, k, v)
+    return sorted_results (ipdict)
+# end def fold
+
+def stream (dumps) :
+    """ Merge dumps like parser.main does for pickle dumps """
+    return list (merge_sources ([sorted_results (d) for d in dumps]))
+# end def stream
+
+_test_merge = """
+    >>> bf = guess ('backfire', 'Backfire')
+    >>> ff = guess ('freifunk', 'Freifunk')
+    >>> timeout = ('Timeout_Error', 'timed out')
+    >>> invalid = ('ValueError', 'unknown page')
+    >>> dumps = \\
+    ...     [ { '10.0.0.10' : bf, '10.0.0.9' : timeout, '10.0.1.1' : invalid }
+    ...     , { '10.0.0.10' : timeout, '10.0.0.9' : invalid }
+    ...     , { '10.0.0.9' : ff, '10.0.1.1' : timeout, '9.0.0.1' : timeout }
+    ...     ]
+    >>> for ip, r in stream (dumps) :
+    ...     print ip, r
+    9.0.0.1 ('Timeout_Error', 'timed out')
+    10.0.0.9 Freifunk Version: v1.7.4 
+    10.0.0.10 Backfire Version: Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.0
+    10.0.1.1 ('ValueError', 'unknown page')
+    >>> stream (dumps) == fold (dumps)
+    True
+    >>> list (merge_sources (sorted_results (d) for d in dumps)) == fold (dumps)
+    True
+
+    With debug, IPs missing in a later named dump are reported
+
+    >>> names = ['a.pickle', 'b.pickle', 'c.pickle']
+    >>> sources = [sorted_results (d) for d in dumps]
+    >>> for ip, r in merge_sources (sources + [[]], True, names) :
+    ...     pass # doctest: +ELLIPSIS
+    9.0.0.1: new: ('Timeout_Error', 'timed out')
+    10.0.0.9: new: ('Timeout_Error', 'timed out')
+    10.0.0.9: overwriting ('Timeout_Error', 'timed out') with ('ValueError', 'unknown page')
+    10.0.0.9: overwriting ('ValueError', 'unknown page') with Freifunk Version: v1.7.4 
+    10.0.0.10: new: Backfire ...
+    10.0.0.10: Not overwriting Backfire ... with ('Timeout_Error', 'timed out')
+    10.0.0.10: not existing in dump c.pickle
+    10.0.1.1: new: ('ValueError', 'unknown page')
+    10.0.1.1: Not overwriting ('ValueError', 'unknown page') with ('Timeout_Error', 'timed out')
+    10.0.1.1: not existing in dump b.pickle
+"""
+
+__test__ = dict \
+    ( merge = _test_merge
+    )
@@ -0,0 +1,70 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+import resource
+import socket
+from   spider.probe               import Probe
+
+_test_probe = """
+    A port listening on 127.0.0.1 is alive, the same port on 127.0.0.2
+    is refused
+
+    >>> server = socket.socket (socket.AF_INET, socket.SOCK_STREAM)
+    >>> server.bind (('127.0.0.1', 0))
+    >>> server.listen (5)
+    >>> port   = server.getsockname () [1]
+    >>> ips    = ['127.0.0.1', '127.0.0.2']
+    >>> p = Probe (ips, timeout = 0.5, port = port).run ()
+    >>> sorted (p.alive), sorted (p.refused), sorted (p.dead)
+    (['127.0.0.1'], ['127.0.0.2'], [])
+
+    Hosts that don't answer within the timeout are dead (with a
+    timeout of 0 even the local ones)
+
+    >>> p = Probe (ips, timeout = 0, port = port).run ()
+    >>> sorted (p.alive), sorted (p.refused), sorted (p.dead)
+    ([], [], ['127.0.0.1', '127.0.0.2'])
+
+    The port can be given per IP, with a single connect in flight the
+    result is the same
+
+    >>> p = Probe \\
+    ...     ( ips [1:2], {'127.0.0.2' : port}, timeout = 0.5, parallel = 1
+    ...     , port = 1
+    ...     ).run ()
+    >>> sorted (p.alive), sorted (p.refused), sorted (p.dead)
+    ([], ['127.0.0.2'], [])
+    >>> p = Probe (ips * 3, timeout = 0.5, parallel = 1, port = port)
+    >>> p = p.run ()
+    >>> sorted (p.alive), sorted (p.refused), sorted (p.dead)
+    (['127.0.0.1'], ['127.0.0.2'], [])
+    >>> server.close ()
+
+    By default parallel depends on the limit of open files
+
+    >>> limits = resource.getrlimit (resource.RLIMIT_NOFILE)
+    >>> resource.setrlimit (resource.RLIMIT_NOFILE, (100, limits [1]))
+    >>> Probe (ips).parallel
+    50
+    >>> resource.setrlimit (resource.RLIMIT_NOFILE, (4096, limits [1]))
+    >>> Probe (ips).parallel
+    256
+    >>> resource.setrlimit (resource.RLIMIT_NOFILE, limits)
+"""
+
+__test__ = dict \
+    ( probe = _test_probe
+    )
@@ -0,0 +1,75 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   spider.__test__.Extract import pages
+from   spider.parser           import Guess
+from   spider.replay           import Benchmark, read_corpus
+from   spider.session          import Page
+
+def benchmark (nodes, n, ** kw) :
+    """ Run Benchmark without the delay before backend pages """
+    delay = Page.delay
+    Page.delay = 0
+    try :
+        return Benchmark (nodes, n, threads = 4, timeout = 30, ** kw).run ()
+    finally :
+        Page.delay = delay
+# end def benchmark
+
+def counts (b) :
+    """ Number of results by type or error of Benchmark b """
+    result = {}
+    for r in b.results.itervalues () :
+        k = r.type if isinstance (r, Guess) else r [0]
+        result [k] = result.get (k, 0) + 1
+    for k in sorted (result) :
+        print "%-10s %d" % (k + ':', result [k])
+# end def counts
+
+_test_replay = """
+    The pages of the extractor tests are a corpus with a node of each
+    backend (and a second Freifunk node)
+
+    >>> nodes = read_corpus (pages)
+    >>> len (nodes)
+    6
+    >>> for path in sorted (nodes [-1]) :
+    ...     print path
+    /
+    /cgi-bin/index.cgi?post_olsr=1
+    /cgi-bin/index.cgi?post_routes=2
+    /index.html
+
+    Each node is served at two simulated addresses
+
+    >>> b = benchmark (nodes, 12)
+    >>> len (b.results)
+    12
+    >>> counts (b)
+    Backfire:  2
+    Freifunk:  4
+    OLSR:      2
+    OpenWRT:   2
+    Router_OS: 2
+    >>> sum (s ['requests'] for s in b.stats if s)
+    36
+
+"""
+
+__test__ = dict \
+    ( replay = _test_replay
+    )
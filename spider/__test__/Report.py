@@ -0,0 +1,69 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+import os
+import shutil
+import tempfile
+from   multiprocessing            import Pool
+from   spider.parser              import Interface_Info, Version_Statistics
+from   spider.parser              import Wide_Table
+from   spider.__test__.Extract    import guess
+
+def write (cls, fn, results, pool = None, chunk_size = 3) :
+    """ Write CSV report cls of results to fn, return its text """
+    w = cls (fn, pool = pool, chunk_size = chunk_size)
+    for ip, result in results :
+        w.add (ip, result)
+    w.close ()
+    return open (fn).read ()
+# end def write
+
+_test_report = """
+    Reports formatted in chunks by a pool of worker processes are the
+    same as those formatted serially
+
+    >>> tmp     = tempfile.mkdtemp ()
+    >>> fn      = os.path.join (tmp, 'report.csv')
+    >>> bf      = guess ('backfire', 'Backfire')
+    >>> ff      = guess ('freifunk', 'Freifunk')
+    >>> err     = ('Timeout_Error', 'timed out')
+    >>> results = \\
+    ...     [('10.0.0.%s' % n, (bf, ff, err) [n % 3]) for n in xrange (20)]
+    >>> pool    = Pool (2)
+    >>> for cls in Version_Statistics, Interface_Info, Wide_Table :
+    ...     serial = write (cls, fn, results)
+    ...     pooled = write (cls, fn, results, pool)
+    ...     single = write (cls, fn, results, pool, chunk_size = 100)
+    ...     lines  = serial.splitlines ()
+    ...     print cls.__name__, len (lines), serial == pooled == single
+    Version_Statistics 15 True
+    Interface_Info 36 True
+    Wide_Table 42 True
+
+    The header is written once, a row per interface (and per error)
+
+    >>> print lines [0] [:40]
+    timestamp;address;type;version;error;int
+    >>> print [l for l in lines if 'Error' in l] [0]
+    ;10.0.0.2;;;Timeout_Error;;;;;;;;;;;
+    >>> pool.close ()
+    >>> pool.join ()
+    >>> shutil.rmtree (tmp)
+"""
+
+__test__ = dict \
+    ( report = _test_report
+    )
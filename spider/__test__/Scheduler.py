@@ -0,0 +1,72 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+from   datetime                   import datetime, timedelta
+from   spider.scheduler           import Scheduler
+from   spider.__test__.Extract    import guess
+
+t0      = datetime (2026, 1, 1)
+hours   = lambda n : t0 + timedelta (hours = n)
+timeout = ('Timeout_Error', 'timed out')
+
+_test_scheduler = """
+    >>> bf = guess ('backfire', 'Backfire')
+    >>> store = \\
+    ...     [ ('10.0.0.1', hours (0), bf)
+    ...     , ('10.0.0.2', hours (0), timeout)
+    ...     , ('10.0.0.3', hours (0), timeout)
+    ...     , ('10.0.0.4', hours (0), bf)
+    ...     , ('10.0.0.1', hours (6), bf)
+    ...     , ('10.0.0.2', hours (1), timeout)
+    ...     ]
+    >>> s   = Scheduler (store)
+    >>> ips = ['10.0.0.%s' % i for i in (1, 2, 3, 4, 5)]
+
+    The interval doubles for each unchanged result, the retry interval
+    for each further failure
+
+    >>> for ip in ips [:4] :
+    ...     print ip, s.next_due (s.by_ip [ip])
+    10.0.0.1 2026-01-01 18:00:00
+    10.0.0.2 2026-01-01 03:00:00
+    10.0.0.3 2026-01-01 01:00:00
+    10.0.0.4 2026-01-01 06:00:00
+
+    New IPs come first with the full timeout, IPs that didn't answer
+    last with the probe timeout (fewest failures first), in between
+    the most overdue IPs first
+
+    >>> s.schedule (ips, now = hours (2))
+    [('10.0.0.5', 180), ('10.0.0.3', 30)]
+    >>> s.schedule (ips, now = hours (7))
+    [('10.0.0.5', 180), ('10.0.0.4', 180), ('10.0.0.3', 30), ('10.0.0.2', 30)]
+    >>> s.schedule (ips, now = hours (20)) [:3]
+    [('10.0.0.5', 180), ('10.0.0.4', 180), ('10.0.0.1', 180)]
+
+    The backoff is limited by max_interval
+
+    >>> s = Scheduler ([('10.0.0.1', hours (n), timeout) for n in xrange (40)])
+    >>> s.next_due (s.by_ip ['10.0.0.1'])
+    datetime.datetime(2026, 1, 9, 15, 0)
+    >>> s.schedule (ips [:1], now = hours (206))
+    []
+    >>> s.schedule (ips [:1], now = hours (207))
+    [('10.0.0.1', 30)]
+"""
+
+__test__ = dict \
+    ( scheduler = _test_scheduler
+    )
@@ -0,0 +1,206 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import threading
+import time
+
+from   BaseHTTPServer     import BaseHTTPRequestHandler, HTTPServer
+from   SocketServer       import ThreadingMixIn
+from   gzip               import GzipFile
+from   StringIO           import StringIO
+from   spider.session     import Deadline, Session
+
+class Stub_Handler (BaseHTTPRequestHandler) :
+    """ Answer each path with a small page, the body starts with the
+        port of the client, so reuse of a connection can be seen.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET (self) :
+        headers = {}
+        status  = 200
+        body    = '%s %s' % (self.client_address [1], self.path)
+        if self.path == '/agent' :
+            body = self.headers.getheader ('user-agent')
+        elif self.path == '/auth' :
+            auth = self.headers.getheader ('authorization')
+            if not auth :
+                status = 401
+                headers ['WWW-Authenticate'] = 'Basic realm="node"'
+            body = str (auth)
+        elif self.path == '/cookie' :
+            body = str (self.headers.getheader ('cookie'))
+            headers ['Set-Cookie'] = 'session=42; Path=/'
+        elif self.path == '/gzip' :
+            body = 'compressed ' * 10
+            if 'gzip' in self.headers.getheader ('accept-encoding', '') :
+                s = StringIO ()
+                f = GzipFile (fileobj = s, mode = 'wb')
+                f.write (body)
+                f.close ()
+                body = s.getvalue ()
+                headers ['Content-Encoding'] = 'gzip'
+        elif self.path == '/slow' :
+            time.sleep (1)
+        elif self.path == '/redirect' :
+            status = 302
+            headers ['Location'] = '/target'
+        self.send_response (status)
+        for k, v in headers.iteritems () :
+            self.send_header (k, v)
+        self.send_header ('Content-Length', str (len (body)))
+        self.end_headers ()
+        self.wfile.write (body)
+        # Drop kept-alive connection without telling the client
+        if self.path == '/stale' :
+            self.close_connection = 1
+    # end def do_GET
+
+    def log_message (self, * args) :
+        pass
+    # end def log_message
+
+# end class Stub_Handler
+
+class Stub_Server (ThreadingMixIn, HTTPServer) :
+    daemon_threads = True
+
+    def handle_error (self, request, client_address) :
+        """ Ignore clients that went away (e.g. cut off by a deadline) """
+        pass
+    # end def handle_error
+# end class Stub_Server
+
+def stub_server () :
+    """ Start stub server in a thread, return server and base URL """
+    server   = Stub_Server (('127.0.0.1', 0), Stub_Handler)
+    t        = threading.Thread (target = server.serve_forever)
+    t.daemon = True
+    t.start ()
+    return server, 'http://127.0.0.1:%s' % server.server_address [1]
+# end def stub_server
+
+def port (body) :
+    return body.split () [0]
+# end def port
+
+_test_session = """
+    >>> server, url = stub_server ()
+    >>> s   = Session (timeout = 5)
+
+    Keep-alive: all requests go over one connection
+
+    >>> a = s.fetch (url + '/a') [2]
+    >>> b = s.fetch (url + '/b') [2]
+    >>> port (a) == port (b), s.stats ['connects'], s.stats ['requests']
+    (True, 1, 2)
+
+    The node closes the kept-alive connection, the request is retried
+    over a new connection
+
+    >>> c = s.fetch (url + '/stale') [2]
+    >>> d = s.fetch (url + '/d') [2]
+    >>> port (c) == port (b), port (d) == port (c), s.stats ['connects']
+    (True, False, 2)
+    >>> s.stats ['requests']
+    4
+
+    Gzip transfer encoding is decoded
+
+    >>> s.fetch (url + '/gzip') [2] == 'compressed ' * 10
+    True
+    >>> s.stats ['bytes'] < 4 * 20 + len ('compressed ' * 10)
+    True
+
+    Redirects are followed, the final URL is returned
+
+    >>> u, h, body = s.fetch (url + '/redirect')
+    >>> u == url + '/target', body.split () [1]
+    (True, '/target')
+
+    Same client as rsclib's Page_Tree: its User-Agent and cookies
+
+    >>> s.fetch (url + '/agent') [2] == Session.user_agent
+    True
+    >>> s.fetch (url + '/cookie') [2]
+    'None'
+    >>> s.fetch (url + '/cookie') [2]
+    'session=42'
+
+    Basic authentication when the node asks for it
+
+    >>> s.fetch (url + '/auth')
+    Traceback (most recent call last):
+      ...
+    HTTPError: HTTP Error 401: Unauthorized
+    >>> s.close ()
+    >>> s = Session (timeout = 5, username = 'admin', password = 'secret')
+    >>> s.fetch (url + '/auth') [2]
+    'Basic YWRtaW46c2VjcmV0'
+    >>> s.close ()
+    >>> server.shutdown ()
+"""
+
+_test_deadline = """
+    Without a total deadline the timeout of the request is used
+
+    >>> d = Deadline (connect = 2)
+    >>> d.remaining (), d.timeout ('connect', 5), d.timeout ('read', 5)
+    (None, 2, 5)
+
+    No timeout exceeds the time remaining until the total deadline
+
+    >>> d = Deadline (total = 0.5, read = 2)
+    >>> 0.4 < d.timeout ('read') <= 0.5
+    True
+    >>> 0.4 < d.timeout ('connect', 5) <= 0.5
+    True
+    >>> d.timeout ('connect', 0.1)
+    0.1
+    >>> time.sleep (0.6)
+    >>> d.remaining ()
+    0
+    >>> d.timeout ('read')
+    Traceback (most recent call last):
+      ...
+    Timeout_Error: Deadline of 0.5 seconds exceeded
+
+    A request exceeding the deadline is cut off, later requests fail
+    immediately
+
+    >>> server, url = stub_server ()
+    >>> s     = Session (timeout = 5, deadline = Deadline (total = 0.3))
+    >>> start = time.time ()
+    >>> s.fetch (url + '/slow') # doctest:+ELLIPSIS
+    Traceback (most recent call last):
+      ...
+    Timeout_Error: ...
+    >>> time.time () - start < 0.9
+    True
+    >>> s.fetch (url + '/a')
+    Traceback (most recent call last):
+      ...
+    Timeout_Error: Deadline of 0.3 seconds exceeded
+    >>> s.close ()
+    >>> server.shutdown ()
+"""
+
+__test__ = dict \
+    ( session  = _test_session
+    , deadline = _test_deadline
+    )
@@ -0,0 +1,73 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import pickle
+import shutil
+import tempfile
+from   datetime                   import timedelta
+from   spider.store               import Result_Store
+from   spider.__test__.Extract    import guess, summary
+
+_test_store = """
+    >>> tmp   = tempfile.mkdtemp ()
+    >>> fn    = os.path.join (tmp, 'results.store')
+    >>> bf    = guess ('backfire', 'Backfire')
+    >>> ff    = guess ('freifunk', 'Freifunk')
+    >>> store = Result_Store (fn)
+    >>> list (store)
+    []
+    >>> store.append ('10.0.0.1', ('Timeout_Error', 'timed out'))
+    >>> store.append ('10.0.0.2', bf, dict (requests = 3))
+    >>> store.append ('10.0.0.1', ff)
+
+    Records are readable while the store is still being written
+
+    >>> for ip, t, r, stats in Result_Store (fn).records () :
+    ...     print ip, r, stats
+    10.0.0.1 ('Timeout_Error', 'timed out') None
+    10.0.0.2 Backfire Version: Backfire (10.03.1, r20728) / Luci 0.10 Release 0.10.0 {'requests': 3}
+    10.0.0.1 Freifunk Version: v1.7.4  None
+    >>> store.close ()
+    >>> records = list (store)
+    >>> [len (r) for r in records]
+    [3, 3, 3]
+    >>> summary (records [1][2]) == summary (bf)
+    True
+
+    fresh returns the latest successful result of each IP
+
+    >>> fresh = store.fresh (timedelta (hours = 1))
+    >>> sorted (fresh), summary (fresh ['10.0.0.1']) == summary (ff)
+    (['10.0.0.1', '10.0.0.2'], True)
+    >>> store.fresh (timedelta (hours = -1))
+    {}
+
+    A truncated last record (of a killed run) is ignored
+
+    >>> data = pickle.dumps (('10.0.0.3', None, bf), Result_Store.protocol)
+    >>> f    = open (fn, 'ab')
+    >>> f.write (data [:len (data) // 2])
+    >>> f.close ()
+    >>> [r [0] for r in store]
+    ['10.0.0.1', '10.0.0.2', '10.0.0.1']
+    >>> shutil.rmtree (tmp)
+"""
+
+__test__ = dict \
+    ( store = _test_store
+    )
@@ -0,0 +1,65 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+import os
+import shutil
+import tempfile
+from   spider.parser              import Timing_Report, percentile
+from   spider.__test__.Extract    import guess
+
+_test_timing = """
+    Nearest-rank percentiles of sorted values
+
+    >>> v = range (1, 101)
+    >>> [percentile (v, q) for q in (0, 0.5, 0.9, 0.99)]
+    [1, 51, 91, 100]
+    >>> [percentile ([7], q) for q in (0, 0.5, 0.99)]
+    [7, 7, 7]
+
+    The report has the percentiles of each metric by type and version,
+    errors are reported with their name as type, results without stats
+    (e.g. of aliases) are ignored
+
+    >>> tmp = tempfile.mkdtemp ()
+    >>> fn  = os.path.join (tmp, 'timing.csv')
+    >>> bf  = guess ('backfire', 'Backfire')
+    >>> err = ('Timeout_Error', 'timed out')
+    >>> t   = Timing_Report (fn)
+    >>> for n in xrange (1, 11) :
+    ...     t.add ('10.0.0.%s' % n, bf, dict (total = n * 0.5, requests = n))
+    >>> t.add ('10.0.0.11', bf, None)
+    >>> t.add ('10.0.0.12', err, dict (total = 30.0, connects = 3))
+    >>> t.close ()
+    >>> for l in open (fn) :
+    ...     l = l.strip ().split (';')
+    ...     if l [2] in ('metric', 'total', 'requests', 'connects') :
+    ...         print ' '.join (l [2:])
+    metric nodes sum p50 p90 p99 max
+    total 10 27.500 3.000 5.000 5.000 5.000
+    requests 10 55 6 10 10 10
+    connects 10 0 0 0 0 0
+    total 1 30.000 30.000 30.000 30.000 30.000
+    requests 1 0 0 0 0 0
+    connects 1 3 3 3 3 3
+    >>> rows = [l.split (';') for l in open (fn)]
+    >>> rows [1][0], rows [1][1] == bf.version, rows [-1][:2]
+    ('Backfire', True, ['Timeout_Error', ''])
+    >>> shutil.rmtree (tmp)
+"""
+
+__test__ = dict \
+    ( timing = _test_timing
+    )
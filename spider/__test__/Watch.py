@@ -0,0 +1,71 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   olsr.common        import Topo_Entry, HNA_Entry
+from   olsr.parser        import Delta
+from   spider.watch       import delta_ips
+
+inf = float ('inf')
+
+def link (d, h, cost = 1.0) :
+    """ Topo_Entry from 10.0.0.h to 10.0.0.d """
+    return Topo_Entry ('10.0.0.%s' % d, '10.0.0.%s' % h, 1.0, 1.0, cost)
+# end def link
+
+def hna (net, gw) :
+    return HNA_Entry (net, '10.0.0.%s' % gw)
+# end def hna
+
+no_change = Delta ([], [], [])
+
+_test_delta_ips = """
+    Nodes of new and removed links are affected
+
+    >>> td = Delta ([link (1, 2)], [link (3, 4)], [])
+    >>> sorted (delta_ips (td, no_change))
+    ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4']
+
+    A changed link only affects its nodes if it went up or down
+
+    >>> td = Delta \\
+    ...     ( []
+    ...     , []
+    ...     , [ (link (1, 2, 1.0), link (1, 2, 2.5))
+    ...       , (link (3, 4, 1.0), link (3, 4, inf))
+    ...       , (link (5, 6, inf), link (5, 6, 1.0))
+    ...       ]
+    ...     )
+    >>> sorted (delta_ips (td, no_change))
+    ['10.0.0.3', '10.0.0.4', '10.0.0.5', '10.0.0.6']
+
+    Gateways of new, removed and changed HNA entries are affected, a
+    changed entry affects both the old and the new gateway
+
+    >>> hd = Delta \\
+    ...     ( [hna ('192.168.1.0', 7)]
+    ...     , [hna ('192.168.2.0', 8)]
+    ...     , [(hna ('192.168.3.0', 1), hna ('192.168.3.0', 9))]
+    ...     )
+    >>> sorted (delta_ips (no_change, hd))
+    ['10.0.0.1', '10.0.0.7', '10.0.0.8', '10.0.0.9']
+    >>> delta_ips (no_change, no_change)
+    set([])
+"""
+
+__test__ = dict \
+    ( delta_ips = _test_delta_ips
+    )
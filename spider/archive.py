@@ -0,0 +1,455 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import marshal
+import mmap
+import socket
+import struct
+
+from   calendar           import timegm
+from   datetime           import datetime
+from   rsclib.autosuper   import autosuper
+from   spider.common      import Interface, Net_Link, Inet4, Inet6
+from   spider.common      import WLAN_Config
+from   spider.freifunk    import WLAN_Config_Freifunk
+
+magic   = 'CNDB spider archive\n'
+version = 1
+schema  = dict \
+    ( nodes      =
+        ( 'ip'          # IP as 32 bit integer
+        , 'time'        # seconds since epoch (UTC) or None
+        , 'error'       # name of error or None for successful results
+        , 'message'     # error message
+        , 'type'
+        , 'version'
+        , 'backend'
+        , 'params'      # dict of backend parameters
+        )
+    , interfaces =
+        ( 'node', 'number', 'name', 'mtu', 'qdisc', 'qlen', 'is_wlan'
+        , 'linktype', 'mac', 'link_bcast'
+        , 'wlan'        # class name of wlan_info or None
+        , 'wlan_name', 'ssid', 'mode', 'channel', 'bssid', 'signal', 'noise'
+        )
+    , inets      = ('iface', 'family', 'ip', 'netmask', 'bcast', 'scope')
+    , ips        = ('node', 'ip', 'netmask', 'bcast', 'scope')
+    )
+
+wlan_classes = dict \
+    ( WLAN_Config          = WLAN_Config
+    , WLAN_Config_Freifunk = WLAN_Config_Freifunk
+    )
+# attribute of wlan_info, column in interfaces
+wlan_columns = \
+    ( ('name',    'wlan_name')
+    , ('ssid',    'ssid')
+    , ('mode',    'mode')
+    , ('channel', 'channel')
+    , ('bssid',   'bssid')
+    , ('signal',  'signal')
+    , ('noise',   'noise')
+    )
+
+def ip_int (ip) :
+    return struct.unpack ('!L', socket.inet_aton (ip)) [0]
+# end def ip_int
+
+def int_ip (n) :
+    return socket.inet_ntoa (struct.pack ('!L', n))
+# end def int_ip
+
+def error_message (err) :
+    try :
+        return unicode (err)
+    except UnicodeError :
+        return repr (err)
+# end def error_message
+
+class Chunk (autosuper) :
+    """ Tables of consecutive nodes of an archive """
+
+    def __init__ (self, tables) :
+        self.tables = tables
+    # end def __init__
+
+    def __len__ (self) :
+        return len (self.tables ['nodes']['ip'])
+    # end def __len__
+
+    def children (self, table, parent, n) :
+        """ Return list of row ranges in table for n parent rows """
+        ranges = []
+        col    = self.tables [table][parent]
+        start  = 0
+        for p in xrange (n) :
+            end = start
+            while end < len (col) and col [end] == p :
+                end += 1
+            ranges.append (xrange (start, end))
+            start = end
+        return ranges
+    # end def children
+
+    def column (self, table, name) :
+        """ Column of table, None values for columns not in archive """
+        t = self.tables [table]
+        if name in t :
+            return t [name]
+        return [None] * len (t.values () [0])
+    # end def column
+
+    def __iter__ (self) :
+        """ Yield (ip, result) for all nodes, results are Guess objects
+            or error tuples (name, message) like in a pickle dump.
+        """
+        from spider.parser import Guess
+        nodes  = dict \
+            ((k, self.column ('nodes', k)) for k in schema ['nodes'])
+        ifs    = dict \
+            ((k, self.column ('interfaces', k)) for k in schema ['interfaces'])
+        inets  = dict \
+            ((k, self.column ('inets', k)) for k in schema ['inets'])
+        ips    = dict \
+            ((k, self.column ('ips', k)) for k in schema ['ips'])
+        n_if   = len (ifs ['node'])
+        by_if  = self.children ('inets',      'iface', n_if)
+        by_nd  = self.children ('interfaces', 'node',  len (self))
+        ip_nd  = self.children ('ips',        'node',  len (self))
+        for n in xrange (len (self)) :
+            ip = int_ip (nodes ['ip'][n])
+            if nodes ['error'][n] is not None :
+                yield ip, (nodes ['error'][n], nodes ['message'][n])
+                continue
+            interfaces = {}
+            inet_by_ip = {}
+            for i in by_nd [n] :
+                iface = Interface \
+                    ( ifs ['number'][i], ifs ['name'][i], ifs ['mtu'][i]
+                    , ifs ['qdisc'][i],  ifs ['qlen'][i]
+                    )
+                iface.is_wlan = ifs ['is_wlan'][i]
+                if ifs ['linktype'][i] is not None :
+                    iface.link = Net_Link \
+                        ( ifs ['linktype'][i], ifs ['mac'][i]
+                        , ifs ['link_bcast'][i]
+                        )
+                if ifs ['wlan'][i] is not None :
+                    cls = wlan_classes [ifs ['wlan'][i]]
+                    wi  = iface.wlan_info = cls.__new__ (cls)
+                    wi.__setstate__ \
+                        (dict ((k, ifs [c][i]) for k, c in wlan_columns))
+                for j in by_if [i] :
+                    cls  = (Inet4, Inet6) [inets ['family'][j] == 6]
+                    inet = cls \
+                        ( inets ['ip'][j], inets ['netmask'][j]
+                        , inets ['bcast'][j], inets ['scope'][j]
+                        )
+                    inet.iface = iface
+                    if cls is Inet4 :
+                        iface.inet4.append (inet)
+                        inet_by_ip [inet.ip] = inet
+                    else :
+                        iface.inet6.append (inet)
+                interfaces [iface.name] = iface
+            node_ips = {}
+            for j in ip_nd [n] :
+                inet = inet_by_ip.get (ips ['ip'][j])
+                if inet is None :
+                    inet = Inet4 \
+                        ( ips ['ip'][j], ips ['netmask'][j]
+                        , ips ['bcast'][j], ips ['scope'][j]
+                        )
+                node_ips [inet] = True
+            g = Guess.__new__ (Guess)
+            g.__dict__.update \
+                ( version = nodes ['version'][n]
+                , type    = nodes ['type'][n]
+                , time    = None
+                , cached  = False
+                , status  = None
+                , rqinfo  = dict
+                    ( ips        = node_ips
+                    , interfaces = interfaces
+                    , version    = nodes ['version'][n]
+                    )
+                )
+            if nodes ['time'][n] is not None :
+                g.time = datetime.utcfromtimestamp (nodes ['time'][n])
+            if nodes ['backend'][n] is not None :
+                g.backend = nodes ['backend'][n]
+                g.params  = nodes ['params'][n]
+            yield ip, g
+    # end def __iter__
+
+# end class Chunk
+
+class Archive (autosuper) :
+    """ Columnar archive of spider results.
+
+        An archive file starts with a magic string followed by a header
+        with the format version and the schema (the columns of each
+        table). Then follow chunks of consecutive nodes sorted by IP,
+        each chunk is a dictionary of tables, a table is a dictionary of
+        columns (lists of plain values, serialized with marshal). Rows
+        of child tables refer to their parent row by its index in the
+        chunk, rows are sorted by parent. At the end of the file is an
+        index with offset, first and last IP and number of nodes of
+        each chunk, the last 8 bytes are the offset of the index.
+
+        For reading, the file is memory mapped and only the chunks
+        iterated over are decoded.
+    """
+
+    def __init__ (self, filename) :
+        self.filename = filename
+        f = open (filename, 'rb')
+        try :
+            self.data = mmap.mmap (f.fileno (), 0, access = mmap.ACCESS_READ)
+        finally :
+            f.close ()
+        if self.data [:len (magic)] != magic :
+            raise ValueError ("Not a spider archive: %s" % filename)
+        header, pos = self.read (len (magic))
+        if header ['version'] > version :
+            raise ValueError \
+                ( "Unsupported archive version %s: %s"
+                % (header ['version'], filename)
+                )
+        self.version = header ['version']
+        self.schema  = header ['schema']
+        pos,         = struct.unpack ('!Q', self.data [-8:])
+        self.index   = self.read (pos) [0]
+    # end def __init__
+
+    def chunks (self, first = None, last = None) :
+        """ Yield chunks that contain nodes with IPs in the range from
+            first to last (inclusive), default all.
+        """
+        if first is not None :
+            first = ip_int (first)
+        if last is not None :
+            last  = ip_int (last)
+        for pos, lo, hi, n in self.index :
+            if first is not None and hi < first :
+                continue
+            if last is not None and lo > last :
+                break
+            yield Chunk (self.read (pos) [0])
+    # end def chunks
+
+    def close (self) :
+        self.data.close ()
+    # end def close
+
+    def read (self, pos) :
+        n, = struct.unpack ('!L', self.data [pos:pos + 4])
+        return marshal.loads (self.data [pos + 4:pos + 4 + n]), pos + 4 + n
+    # end def read
+
+    def __iter__ (self) :
+        """ Yield (ip, result) sorted by IP """
+        for chunk in self.chunks () :
+            for ip, r in chunk :
+                yield ip, r
+    # end def __iter__
+
+    def __len__ (self) :
+        return sum (n for pos, lo, hi, n in self.index)
+    # end def __len__
+
+# end class Archive
+
+class Archive_Writer (autosuper) :
+    """ Write spider archive, results must be added sorted by IP """
+
+    def __init__ (self, filename, chunk_size = 1024) :
+        self.filename   = filename
+        self.chunk_size = chunk_size
+        self.index      = []
+        self.last       = None
+        self.f          = open (filename, 'wb')
+        self.f.write (magic)
+        self.write (dict (version = version, schema = schema))
+        self.new_chunk ()
+    # end def __init__
+
+    def add (self, ip, result) :
+        n = ip_int (ip)
+        if self.last is not None and n <= self.last :
+            raise ValueError ("IPs must be added in ascending order: %s" % ip)
+        self.last = n
+        nodes     = self.tables ['nodes']
+        node      = len (nodes ['ip'])
+        row       = dict.fromkeys (schema ['nodes'])
+        row ['ip'] = n
+        if isinstance (result, tuple) :
+            row ['error']   = result [0]
+            row ['message'] = error_message (result [1])
+        else :
+            self.add_guess (node, row, result)
+        for k, v in row.iteritems () :
+            nodes [k].append (v)
+        if len (nodes ['ip']) >= self.chunk_size :
+            self.flush ()
+    # end def add
+
+    def add_guess (self, node, row, guess) :
+        d = guess.__dict__
+        if d.get ('time') :
+            row ['time'] = timegm (guess.time.utctimetuple ()) \
+                + guess.time.microsecond / 1e6
+        row ['type']    = d.get ('type')
+        row ['version'] = guess.version
+        row ['backend'] = d.get ('backend')
+        if d.get ('params') :
+            row ['params'] = dict \
+                ( (k, v) for k, v in d ['params'].iteritems ()
+                  if isinstance (v, (basestring, int)) or v is None
+                )
+        t = self.tables
+        for iface in (guess.interfaces or {}).itervalues () :
+            i = len (t ['interfaces']['node'])
+            r = dict \
+                ( node    = node
+                , number  = iface.number
+                , name    = iface.name
+                , mtu     = iface.mtu
+                , qdisc   = iface.qdisc
+                , qlen    = iface.qlen
+                , is_wlan = iface.is_wlan
+                )
+            if iface.link :
+                r.update \
+                    ( linktype   = iface.link.linktype
+                    , mac        = iface.link.mac
+                    , link_bcast = iface.link.bcast
+                    )
+            if iface.wlan_info :
+                wi = iface.wlan_info
+                r ['wlan'] = wi.__class__.__name__
+                for k, c in wlan_columns :
+                    r [c] = getattr (wi, k, None)
+            for k in schema ['interfaces'] :
+                t ['interfaces'][k].append (r.get (k))
+            for family, inets in ((4, iface.inet4), (6, iface.inet6)) :
+                for inet in inets :
+                    self.row \
+                        ( 'inets'
+                        , iface   = i
+                        , family  = family
+                        , ip      = inet.ip
+                        , netmask = inet.netmask
+                        , bcast   = inet.bcast
+                        , scope   = inet.scope
+                        )
+        for inet in (guess.ips or {}).iterkeys () :
+            self.row \
+                ( 'ips'
+                , node    = node
+                , ip      = inet.ip
+                , netmask = inet.netmask
+                , bcast   = inet.bcast
+                , scope   = inet.scope
+                )
+    # end def add_guess
+
+    def close (self) :
+        self.flush ()
+        pos = self.f.tell ()
+        self.write (self.index)
+        self.f.write (struct.pack ('!Q', pos))
+        self.f.close ()
+    # end def close
+
+    def flush (self) :
+        ips = self.tables ['nodes']['ip']
+        if ips :
+            self.index.append ((self.f.tell (), ips [0], ips [-1], len (ips)))
+            self.write (self.tables)
+        self.new_chunk ()
+    # end def flush
+
+    def new_chunk (self) :
+        self.tables = dict \
+            ( (t, dict ((k, []) for k in cols))
+              for t, cols in schema.iteritems ()
+            )
+    # end def new_chunk
+
+    def row (self, table, ** kw) :
+        for k, v in self.tables [table].iteritems () :
+            v.append (kw.get (k))
+    # end def row
+
+    def write (self, obj) :
+        data = marshal.dumps (obj, 2)
+        self.f.write (struct.pack ('!L', len (data)))
+        self.f.write (data)
+    # end def write
+
+# end class Archive_Writer
+
+def write_archive (filename, ipdict, chunk_size = 1024) :
+    """ Write dict of spider results by IP to archive """
+    w = Archive_Writer (filename, chunk_size)
+    for ip in sorted (ipdict, key = ip_int) :
+        w.add (ip, ipdict [ip])
+    w.close ()
+# end def write_archive
+
+def main () :
+    import sys
+    from optparse      import OptionParser
+    from spider.parser import read_pickle
+
+    cmd = OptionParser \
+        (usage = "%prog [options] pickle-dump ...\n"
+                 "Convert pickle dumps of the spider to archives"
+        )
+    cmd.add_option \
+        ( "-c", "--chunk-size"
+        , dest    = "chunk_size"
+        , help    = "Number of nodes per chunk of archive"
+        , type    = "int"
+        , default = 1024
+        )
+    cmd.add_option \
+        ( "-o", "--output"
+        , dest    = "output"
+        , help    = "Archive file (only for single dump), default is the "
+                    "name of the dump with extension .archive"
+        )
+    (opt, args) = cmd.parse_args ()
+    if not args or opt.output and len (args) > 1 :
+        cmd.print_help ()
+        sys.exit (23)
+    for fn in args :
+        out = opt.output
+        if not out :
+            out = fn
+            if out.endswith ('.gz') :
+                out = out [:-3]
+            if out.endswith ('.pickle') :
+                out = out [:-7]
+            out = out + '.archive'
+        write_archive (out, read_pickle (fn), opt.chunk_size)
+# end def main
+
+if __name__ == '__main__' :
+    import spider.archive
+    spider.archive.main ()
@@ -18,19 +18,92 @@
 # #*** </License> ***********************************************************#
 
 import re
-from   rsclib.HTML_Parse  import tag, Page_Tree
+from   rsclib.HTML_Parse  import tag
 from   rsclib.autosuper   import autosuper
 from   spider.common      import Interface, Inet4, Inet6, unroutable
 from   spider.common      import WLAN_Config
+from   spider.extract     import Extractor
 from   spider.luci        import Version_Mixin
+from   spider.session     import Page
 from   olsr.common        import Topo_Entry, HNA_Entry
 
-class Interfaces (Page_Tree, Version_Mixin) :
+wlan_overview = \
+    ( 'Wireless Overview'
+    , 'Drahtlosübersicht'.decode ('utf-8')
+    , 'WLAN Übersicht'.decode ('utf-8')
+    )
+
+def is_wlan_overview (div) :
+    return \
+        (   len (div)
+        and div [0].tag == tag ('h2')
+        and div [0].text in wlan_overview
+        )
+# end def is_wlan_overview
+
+class Interfaces_Extractor (Extractor) :
+    """ Divs with version info and interface table, luci version.
+        Extraction is complete after the interface table and the luci
+        version (anchor or paragraph) were seen, the latter is checked
+        only for outermost extracted elements so that the text following
+        the anchor is complete.
+    """
+
+    div_ids     = ('header', 'maincontent')
+    div_classes = ('footer', 'header_right', 'hostinfo')
+    luci_href   = 'http://luci.subsignal.org/'
+    has_table   = False
+    has_version = False
+
+    def complete (self, key, elem) :
+        if key == 'div' and elem.get ('id') == 'maincontent' :
+            if elem.find (".//%s" % tag ("table")) is not None :
+                self.has_table = True
+        if self.stack and self.stack [-1][1] is not None :
+            return False
+        for e in elem.iter () :
+            if  (  (e.tag == tag ('a') and e.get ('href') == self.luci_href)
+                or (e.tag == tag ('p') and e.get ('class') == 'luci')
+                ) :
+                self.has_version = True
+        return self.has_table and self.has_version
+    # end def complete
+
+    def select (self, name, attrs) :
+        if name == 'div' :
+            if  (  attrs.get ('id')    in self.div_ids
+                or attrs.get ('class') in self.div_classes
+                ) :
+                return 'div'
+        elif name == 'p' and attrs.get ('class') == 'luci' :
+            return 'p'
+        elif name == 'a' and attrs.get ('href') == self.luci_href :
+            return 'a'
+    # end def select
+
+# end class Interfaces_Extractor
+
+class WLAN_Extractor (Extractor) :
+    """ The cbi-map div of the wireless overview """
+
+    def complete (self, key, elem) :
+        return is_wlan_overview (elem)
+    # end def complete
+
+    def select (self, name, attrs) :
+        if name == 'div' and attrs.get ('class') == 'cbi-map' :
+            return 'map'
+    # end def select
+
+# end class WLAN_Extractor
+
+class Interfaces (Page, Version_Mixin) :
     url          = 'cgi-bin/luci/freifunk/olsr/interfaces'
     retries      = 2
     wlan_info    = None
     timeout      = 10
     html_charset = 'utf-8' # force utf-8 encoding
+    extractor    = Interfaces_Extractor
 
     yesno = dict \
         ( yes  = True
@@ -40,73 +113,67 @@ class Interfaces (Page_Tree, Version_Mixin) :
         )
 
     def parse (self) :
-        root = self.tree.getroot ()
+        found = self.extract.found
         self.if_by_name = {}
         self.ips        = {}
-        for div in root.findall (".//%s" % tag ("div")) :
+        for div in found.get ('div', ()) :
             self.try_get_version (div)
             if div.get ('id') == 'maincontent' and not self.if_by_name :
-                tbl = div.find (".//%s" % tag ("table"))
-                for n, tr in enumerate (tbl) :
-                    if tr [0].tag == tag ('th') :
-                        assert tr [0].text in ('Interface', 'Schnittstelle') \
-                            , tr [0].text
-                        continue
-                    name, status, mtu, wlan, ip, mask, bcast = \
-                        (x.text for x in tr)
-                    if name in self.if_by_name :
-                        iface = self.if_by_name [name]
-                    else :
-                        iface = Interface (n, name, mtu)
-                        iface.is_wlan = self.yesno.get (wlan, False)
-                    if status == 'DOWN' :
-                        continue
-                    # append IP address to interface if there is one
-                    if ip is not None :
-                        if ':' in ip :
-                            i6 = Inet6 (ip, mask, bcast, iface = name)
-                            iface.append_inet6 (i6)
-                        else :
-                            i4 = Inet4 (ip, mask, bcast, iface = name)
-                            iface.append_inet4 (i4)
-                            if not unroutable (i4.ip) :
-                                self.if_by_name [name] = iface
-                                self.ips [i4] = True
-        self.set_version (root)
+                self.parse_table (div.find (".//%s" % tag ("table")))
+        self.set_version_from (self.extract.body_last, found.get ('a', ()))
         if not self.if_by_name :
             raise ValueError, "No interface config found"
-        bfw = Backfire_WLAN_Config (site = self.site)
+        bfw = Backfire_WLAN_Config \
+            (site = self.site, timeout = self.timeout, session = self.session)
         for d in bfw.wlans :
             if d.name in self.if_by_name :
                 iface = self.if_by_name [d.name]
                 iface.wlan_info = d
     # end def parse
 
+    def parse_table (self, tbl) :
+        for n, tr in enumerate (tbl) :
+            if tr [0].tag == tag ('th') :
+                assert tr [0].text in ('Interface', 'Schnittstelle') \
+                    , tr [0].text
+                continue
+            name, status, mtu, wlan, ip, mask, bcast = (x.text for x in tr)
+            if name in self.if_by_name :
+                iface = self.if_by_name [name]
+            else :
+                iface = Interface (n, name, mtu)
+                iface.is_wlan = self.yesno.get (wlan, False)
+            if status == 'DOWN' :
+                continue
+            # append IP address to interface if there is one
+            if ip is not None :
+                if ':' in ip :
+                    i6 = Inet6 (ip, mask, bcast, iface = name)
+                    iface.append_inet6 (i6)
+                else :
+                    i4 = Inet4 (ip, mask, bcast, iface = name)
+                    iface.append_inet4 (i4)
+                    if not unroutable (i4.ip) :
+                        self.if_by_name [name] = iface
+                        self.ips [i4] = True
+    # end def parse_table
+
 # end class Interfaces
 
-class Backfire_WLAN_Config (Page_Tree) :
+class Backfire_WLAN_Config (Page) :
     url          = 'cgi-bin/luci/freifunk/status'
     retries      = 2
     timeout      = 10
     html_charset = 'utf-8' # force utf-8 encoding
+    extractor    = WLAN_Extractor
 
     title_re     = re.compile \
         (r'.*ignal.*(?:(-[0-9]+)|(?:N/A))\s+d.*oise.*(-[0-9]+)\s+d')
 
     def parse (self) :
-        wlo = \
-            ( 'Wireless Overview'
-            , 'Drahtlosübersicht'.decode ('utf-8')
-            , 'WLAN Übersicht'.decode ('utf-8')
-            )
-        root = self.tree.getroot ()
         self.wlans = []
-        for div in root.findall (".//%s" % tag ("div")) :
-            if div.get ('class') != 'cbi-map' :
-                continue
-            if not len (div) or div [0].tag != tag ('h2') :
-                continue
-            if div [0].text not in wlo :
+        for div in self.extract.found.get ('map', ()) :
+            if not is_wlan_overview (div) :
                 continue
             for tr in div.findall (".//%s" % tag ("tr")) :
                 cls = tr.get ('class') or ''
@@ -139,13 +206,13 @@ class Backfire_WLAN_Config (Page_Tree) :
     # end def parse
 # end class Backfire_WLAN_Config
 
-class MID_Parser (Page_Tree) :
+class MID_Parser (Page) :
 
     url = 'cgi-bin/luci/freifunk/olsr/mid/'
 
-    def __init__ (self, site, content) :
+    def __init__ (self, site, content, ** kw) :
         self.content = content
-        self.__super.__init__ (site = site)
+        self.__super.__init__ (site = site, ** kw)
     # end def __init__
 
     def parse (self) :
@@ -164,13 +231,13 @@ class MID_Parser (Page_Tree) :
 
 # end class MID_Parser
 
-class HNA_Parser (Page_Tree) :
+class HNA_Parser (Page) :
 
     url = 'cgi-bin/luci/freifunk/olsr/hna/'
 
-    def __init__ (self, site, content) :
+    def __init__ (self, site, content, ** kw) :
         self.content = content
-        self.__super.__init__ (site = site)
+        self.__super.__init__ (site = site, ** kw)
     # end def __init__
 
     def parse (self) :
@@ -189,13 +256,13 @@ class HNA_Parser (Page_Tree) :
 
 # end class HNA_Parser
 
-class Topo_Parser (Page_Tree) :
+class Topo_Parser (Page) :
 
     url = 'cgi-bin/luci/freifunk/olsr/topology/'
 
-    def __init__ (self, site, content) :
+    def __init__ (self, site, content, ** kw) :
         self.content = content
-        self.__super.__init__ (site = site)
+        self.__super.__init__ (site = site, ** kw)
     # end def __init__
 
     def parse (self) :
@@ -225,17 +292,24 @@ class Backfire (autosuper) :
 
     parsers = dict (hna = HNA_Parser, mid = MID_Parser, topo = Topo_Parser)
 
-    def __init__ (self, site, request) :
+    def __init__ (self, site, request, timeout = None, session = None) :
         self.site    = site
         self.request = request
+        self.timeout = timeout
         if 'interfaces' in self.request or 'ips' in self.request :
-            bfi = Interfaces (site = self.site)
+            bfi = Interfaces \
+                (site = self.site, timeout = self.timeout, session = session)
             self.request ['ips']        = bfi.ips
             self.request ['interfaces'] = bfi.if_by_name
             self.request ['version']    = bfi.version
         for k, v in self.parsers.iteritems () :
             if k in self.request :
-                v (site = self.site, content = self.request [k])
+                v \
+                    ( site    = self.site
+                    , content = self.request [k]
+                    , timeout = self.timeout
+                    , session = session
+                    )
     # end def __init__
 
 # end class Backfire
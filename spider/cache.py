@@ -0,0 +1,71 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import pickle
+
+from   datetime           import datetime, timedelta
+from   rsclib.autosuper   import autosuper
+
+class Backend_Cache (autosuper) :
+    """ Persistent cache of the backend detected for an IP.
+        For each IP we keep the time of detection, the fingerprint
+        (backend, params) of the Guess and the version found. Entries
+        older than ttl are not used, so the backend is guessed again
+        from time to time. An entry is removed when the node returns
+        unparseable information.
+    """
+
+    def __init__ (self, filename = None, ttl = timedelta (days = 7)) :
+        self.filename = filename
+        self.ttl      = ttl
+        self.by_ip    = {}
+        if filename and os.path.exists (filename) :
+            f = open (filename, 'rb')
+            self.by_ip = pickle.load (f)
+            f.close ()
+    # end def __init__
+
+    def get (self, ip, now = None) :
+        """ Return fingerprint for ip or None """
+        now = now or datetime.utcnow ()
+        if ip in self.by_ip :
+            time, fingerprint, version = self.by_ip [ip]
+            if time + self.ttl > now :
+                return fingerprint
+    # end def get
+
+    def update (self, ip, result) :
+        """ Update cache from spider result (Guess or error tuple) """
+        if isinstance (result, tuple) :
+            if result [0] == 'ValueError' :
+                self.by_ip.pop (ip, None)
+            return
+        time = result.time
+        # Keep time of detection if the cached backend was used
+        if getattr (result, 'cached', False) and ip in self.by_ip :
+            time = self.by_ip [ip][0]
+        self.by_ip [ip] = (time, result.fingerprint, result.version)
+    # end def update
+
+    def save (self, filename = None) :
+        f = open (filename or self.filename, 'wb')
+        pickle.dump (self.by_ip, f, pickle.HIGHEST_PROTOCOL)
+        f.close ()
+    # end def save
+
+# end class Backend_Cache
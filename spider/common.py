@@ -17,7 +17,10 @@
 # along with this module. If not, see <http://www.gnu.org/licenses/>.
 # #*** </License> ***********************************************************#
 
-from   rsclib.autosuper   import autosuper
+import socket
+import struct
+
+from   rsclib.autosuper   import _autosuper
 from   rsclib.IP_Address  import IP4_Address
 
 class Parse_Error (ValueError) :
@@ -45,12 +48,150 @@ def is_link_local (ip) :
     return ip in linklocal
 # end def is_link_local
 
+def pack_ip4 (ip) :
+    """ IPv4 address as 32 bit integer, unchanged if not parseable """
+    try :
+        return struct.unpack ('!L', socket.inet_pton (socket.AF_INET, ip)) [0]
+    except (socket.error, TypeError, ValueError) :
+        return ip
+# end def pack_ip4
+
+def _masks (networks) :
+    """ List of (mask, set of network addresses) as integers """
+    by_mask = {}
+    for n in networks :
+        mask = (0xFFFFFFFF << (32 - n.mask)) & 0xFFFFFFFF
+        by_mask.setdefault (mask, set ()).add (n.ip & mask)
+    return sorted (by_mask.iteritems (), reverse = True)
+# end def _masks
+
+unroutable_masks = _masks (rfc1918_networks + [localnet, linklocal])
+
 def unroutable (ip) :
-    ip  = IP4_Address (ip)
+    n = pack_ip4 (ip)
+    if isinstance (n, (int, long)) :
+        return unroutable_packed (n)
+    ip = IP4_Address (ip)
     return is_rfc1918 (ip) or is_local (ip) or is_link_local (ip)
 # end def unroutable
 
-class Compare_Mixin (autosuper) :
+def unroutable_packed (n) :
+    """ Check IPv4 address n given as integer """
+    for mask, nets in unroutable_masks :
+        if n & mask in nets :
+            return True
+    return False
+# end def unroutable_packed
+
+def unroutable_flags (ips) :
+    """ Flags (as a bytearray) for a sequence of IPv4 addresses, like
+        unroutable but without creating an IP4_Address per address.
+        Addresses that can't be parsed are flagged unroutable.
+    """
+    return bytearray \
+        ( unroutable_packed (n) if isinstance (n, (int, long)) else 1
+          for n in (pack_ip4 (ip) for ip in ips)
+        )
+# end def unroutable_flags
+
+def unpack_ip4 (n) :
+    return socket.inet_ntop (socket.AF_INET, struct.pack ('!L', n))
+# end def unpack_ip4
+
+def pack_ip6 (ip) :
+    """ IPv6 address as 128 bit integer, unchanged if not parseable or
+        not in the shortest form produced by unpack_ip6
+    """
+    try :
+        hi, lo = struct.unpack \
+            ('!QQ', socket.inet_pton (socket.AF_INET6, ip))
+    except (socket.error, TypeError, ValueError) :
+        return ip
+    n = (hi << 64) | lo
+    if unpack_ip6 (n) != ip :
+        return ip
+    return n
+# end def pack_ip6
+
+def unpack_ip6 (n) :
+    return socket.inet_ntop \
+        (socket.AF_INET6, struct.pack ('!QQ', n >> 64, n & (2 ** 64 - 1)))
+# end def unpack_ip6
+
+def pack_mac (mac) :
+    """ MAC address as 48 bit integer, unchanged if not parseable or
+        not in the form produced by unpack_mac (e.g. upper case)
+    """
+    try :
+        parts = mac.split (':')
+        n     = 0
+        if len (parts) != 6 :
+            return mac
+        for p in parts :
+            if not 1 <= len (p) <= 2 :
+                return mac
+            n = (n << 8) | int (p, 16)
+    except (AttributeError, ValueError) :
+        return mac
+    if unpack_mac (n) != mac :
+        return mac
+    return n
+# end def pack_mac
+
+def unpack_mac (n) :
+    if not isinstance (n, (int, long)) :
+        return n
+    return ':'.join ('%02x' % ((n >> s) & 0xFF) for s in xrange (40, -8, -8))
+# end def unpack_mac
+
+class Compact (object) :
+    """ Base class for objects that exist in large numbers (e.g. when
+        reading many spider results): subclasses define __slots__, so
+        instances have no __dict__. Like autosuper we define __super.
+        The pickle state is a dict of slot values, for old pickles
+        the state is the __dict__ of the object.
+    """
+
+    __metaclass__ = _autosuper
+    __slots__     = ()
+
+    def __init__ (self, * args, ** kw) :
+        init = self.__super.__init__
+        if getattr (init, '__objclass__', None) is object :
+            init ()
+        else :
+            init (* args, ** kw)
+    # end def __init__
+
+    @classmethod
+    def slot_names (cls) :
+        for c in reversed (cls.__mro__) :
+            for k in c.__dict__.get ('__slots__', ()) :
+                yield k
+    # end def slot_names
+
+    def __getstate__ (self) :
+        state = dict (getattr (self, '__dict__', {}))
+        for k, v in getattr (self, 'pickle_exceptions', {}).iteritems () :
+            if k in state :
+                state [k] = v
+        for k in self.slot_names () :
+            state [k] = getattr (self, k, None)
+        return state
+    # end def __getstate__
+
+    def __setstate__ (self, state) :
+        for k in self.slot_names () :
+            object.__setattr__ (self, k, None)
+        for k, v in state.iteritems () :
+            setattr (self, k, v)
+    # end def __setstate__
+
+# end class Compact
+
+class Compare_Mixin (Compact) :
+
+    __slots__ = ()
 
     def __ne__ (self, other) :
         return not self == other
@@ -58,27 +199,53 @@ class Compare_Mixin (autosuper) :
 
 # end class Compare_Mixin
 
-class Net_Link (autosuper) :
+class Net_Link (Compact) :
     """Physical layer link interface
     """
 
+    __slots__ = ('linktype', '_mac', '_bcast')
+
     def __init__ (self, linktype, mac, bcast) :
         self.linktype = linktype
         self.mac      = mac
         self.bcast    = bcast
     # end def __init__
 
+    @property
+    def bcast (self) :
+        return unpack_mac (self._bcast)
+    # end def bcast
+
+    @bcast.setter
+    def bcast (self, value) :
+        self._bcast = pack_mac (value)
+    # end def bcast
+
+    @property
+    def mac (self) :
+        return unpack_mac (self._mac)
+    # end def mac
+
+    @mac.setter
+    def mac (self, value) :
+        self._mac = pack_mac (value)
+    # end def mac
+
     def __str__ (self) :
-        return "Net_Link (%(linktype)s, %(mac)s, %(bcast)s)" % self.__dict__
+        return "Net_Link (%s, %s, %s)" % (self.linktype, self.mac, self.bcast)
     # end def __str__
     __repr__ = __str__
 
 # end class Net_Link
 
 class Inet (Compare_Mixin) :
-    """IP Network address
+    """IP Network address, the IP is stored as an integer
+       where this keeps its text (see pack_ip6)
     """
 
+    __slots__ = ('_ip', 'netmask', 'scope', 'iface', 'bcast')
+    version   = None
+
     def __init__ (self, ip, netmask, scope = None, iface = None, bcast = None) :
         self.ip      = ip
         self.netmask = netmask
@@ -87,24 +254,51 @@ class Inet (Compare_Mixin) :
         self.bcast   = bcast
     # end def __init__
 
+    @property
+    def ip (self) :
+        ip = self._ip
+        if isinstance (ip, (int, long)) :
+            return self.unpack (ip)
+        return ip
+    # end def ip
+
+    @ip.setter
+    def ip (self, value) :
+        self._ip = self.pack (value)
+    # end def ip
+
+    @staticmethod
+    def pack (ip) :
+        return ip
+    # end def pack
+
+    unpack = pack
+
     def __str__ (self) :
-        return self.__class__.__name__ \
-            + " (%(ip)s/%(netmask)s, %(bcast)s, %(scope)s)" % self.__dict__
+        return "%s (%s/%s, %s, %s)" % \
+            ( self.__class__.__name__
+            , self.ip, self.netmask, self.bcast, self.scope
+            )
     # end def __str__
     __repr__ = __str__
 
     def __hash__ (self) :
-        return hash (self.ip)
+        return hash (self._ip)
     # end def __hash__
 
     def __eq__ (self, other) :
-        return self.ip == other.ip
+        return self._ip == other._ip and self.version == other.version
     # end def __eq__
 
 # end class Inet
 
 class Inet4 (Inet) :
 
+    __slots__ = ()
+    version   = 4
+    pack      = staticmethod (pack_ip4)
+    unpack    = staticmethod (unpack_ip4)
+
     def __init__ (self, ip, mask, bcast, scope = None, iface = None, ** kw) :
         self.__super.__init__ (ip, mask, scope, iface, bcast = bcast)
     # end def __init__
@@ -113,6 +307,11 @@ class Inet4 (Inet) :
 
 class Inet6 (Inet) :
 
+    __slots__ = ()
+    version   = 6
+    pack      = staticmethod (pack_ip6)
+    unpack    = staticmethod (unpack_ip6)
+
     def __init__ (self, ip, mask, bcast, scope = None, iface = None, ** kw) :
         self.__super.__init__ (ip, mask, scope, iface, bcast = bcast)
     # end def __init__
@@ -123,6 +322,11 @@ class Interface (Compare_Mixin) :
     """Network interface
     """
 
+    __slots__ = \
+        ( 'number', 'name', 'mtu', 'qdisc', 'qlen', 'link'
+        , 'inet4', 'inet6', 'is_wlan', 'wlan_info', '_names'
+        )
+
     def __init__ (self, number, name, mtu = None, qdisc = None, qlen = None) :
         self.number    = number
         self.name      = name
@@ -134,8 +338,21 @@ class Interface (Compare_Mixin) :
         self.inet6     = []
         self.is_wlan   = None
         self.wlan_info = None
+        self._names    = None
     # end def __init__
 
+    @property
+    def names (self) :
+        if self._names is None :
+            self._names = [self.name]
+        return self._names
+    # end def names
+
+    @names.setter
+    def names (self, value) :
+        self._names = value
+    # end def names
+
     def append_inet4 (self, inet) :
         self.inet4.append (inet)
         if not inet.iface.startswith (self.name) :
@@ -179,8 +396,8 @@ class Interface (Compare_Mixin) :
     def __str__ (self) :
         r = []
         r.append \
-            ( "Interface (%(name)s, %(number)s, is_wlan=%(is_wlan)s)"
-            % self.__dict__
+            ( "Interface (%s, %s, is_wlan=%s)"
+            % (self.name, self.number, self.is_wlan)
             )
         if self.link :
             r.append (str (self.link))
@@ -194,16 +411,21 @@ class Interface (Compare_Mixin) :
     # end def __str__
     __repr__ = __str__
 
-    def __getattr__ (self, name) :
-        if name == 'names' :
-            self.names = [self.name]
-            return self.names
-        raise AttributeError, name
-    # end def __getattr__
-
 # end class Interface
 
 class WLAN_Config (Compare_Mixin) :
+    """ Wireless configuration, the BSSID is stored as an integer
+        where this keeps its text (see pack_mac).
+        Values of unknown keys (not a slot or property) passed to
+        __init__ or set or found in the pickle state are kept in the
+        dict extra (None if there are none) and can be read as
+        attributes.
+    """
+
+    __slots__ = \
+        ( 'name', 'ssid', 'mode', 'channel', '_bssid', 'signal', 'noise'
+        , 'extra'
+        )
 
     modes = \
         { 'ad hoc'  : 'Ad_Hoc'
@@ -236,11 +458,21 @@ class WLAN_Config (Compare_Mixin) :
 
     def __init__ (self, ** kw) :
         self.name   = self.ssid = self.mode = self.channel = self.bssid = None
-        self.signal = self.noise = None
+        self.signal = self.noise = self.extra = None
         self.set (** kw)
         self.__super.__init__ (** kw)
     # end def __init__
 
+    @property
+    def bssid (self) :
+        return unpack_mac (self._bssid)
+    # end def bssid
+
+    @bssid.setter
+    def bssid (self, value) :
+        self._bssid = pack_mac (value)
+    # end def bssid
+
     @property
     def standard (self) :
         if self.channel is None :
@@ -290,20 +522,29 @@ class WLAN_Config (Compare_Mixin) :
                 if fixer :
                     fixer (k, v)
                 else :
-                    setattr (self, k, v)
+                    self._set (k, v)
     # end def set
 
+    def _set (self, name, value) :
+        if hasattr (self.__class__, name) :
+            setattr (self, name, value)
+        else :
+            if self.extra is None :
+                self.extra = {}
+            self.extra [name] = value
+    # end def _set
+
     def __eq__ (self, other) :
         return \
             (   self.ssid    == other.ssid
             and self.mode    == other.mode
             and self.channel == other.channel
-            and self.bssid   == other.bssid
+            and self._bssid  == other._bssid
             )
     # end def __eq__
 
     def __hash__ (self) :
-        return hash ((self.ssid, self.mode, self.channel, self.bssid))
+        return hash ((self.ssid, self.mode, self.channel, self._bssid))
     # end def __hash__
 
     def __str__ (self) :
@@ -316,16 +557,34 @@ class WLAN_Config (Compare_Mixin) :
                 z.append ("%s=%%(%s)s" % (k, k))
         x.append ('\n        , '.join (z))
         x.append ('\n        )')
-        return ''.join (x) % self.__dict__
+        d = dict \
+            ( (k, getattr (self, k, None))
+              for k in ('ssid', 'mode', 'channel', 'bssid', 'signal', 'noise')
+            )
+        return ''.join (x) % d
     # end def __str__
     __repr__ = __str__
 
     def __getattr__ (self, name) :
-        # Zombie lifting for earlier versions
-        if name == 'signal' or name == 'noise' :
-            setattr (self, name, None)
-            return None
+        extra = None
+        if name != 'extra' :
+            extra = self.extra
+        if extra and name in extra :
+            return extra [name]
         raise AttributeError, name
     # end def __getattr__
 
+    def __setstate__ (self, state) :
+        known = {}
+        extra = {}
+        for k, v in state.iteritems () :
+            if hasattr (self.__class__, k) :
+                known [k] = v
+            else :
+                extra [k] = v
+        self.__super.__setstate__ (known)
+        for k, v in extra.iteritems () :
+            self._set (k, v)
+    # end def __setstate__
+
 # end class WLAN_Config
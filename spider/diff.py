@@ -0,0 +1,217 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   collections        import namedtuple
+from   spider.archive     import Archive, Archive_Writer, ip_int, magic
+from   spider.parser      import Guess, CSV_Writer, read_pickle
+from   spider.parser      import sorted_results
+
+# A single change of a node between two spider runs:
+# kind is one of 'node' (node added or removed), 'error' (error name,
+# None if the node answered), 'type', 'version', 'interface' (item is
+# the interface name), 'ip' (item is the IP) or the name of an
+# attribute of an interface (item is the interface name). old or new
+# is None if the item didn't exist in the respective run.
+Change = namedtuple ('Change', ('ip', 'kind', 'item', 'old', 'new'))
+
+# attributes of interfaces compared, signal and noise change with
+# every run and are ignored
+interface_attributes = \
+    ( 'number', 'mtu', 'is_wlan', 'mac', 'ip4', 'ip6'
+    , 'ssid', 'mode', 'channel', 'bssid'
+    )
+
+def summary (result) :
+    """ Short description of result: error name or type of node """
+    if isinstance (result, Guess) :
+        return result.type
+    return result [0]
+# end def summary
+
+def interface_values (iface) :
+    """ Dict of compared attributes of iface """
+    d = dict \
+        ( number  = iface.number
+        , mtu     = iface.mtu
+        , is_wlan = iface.is_wlan
+        , mac     = None
+        , ip4     = ' '.join
+            (sorted ('%s/%s' % (i.ip, i.netmask) for i in iface.inet4))
+        , ip6     = ' '.join
+            (sorted ('%s/%s' % (i.ip, i.netmask) for i in iface.inet6))
+        )
+    if iface.link :
+        d ['mac'] = iface.link.mac
+    wi = iface.wlan_info
+    for k in 'ssid', 'mode', 'channel', 'bssid' :
+        d [k] = getattr (wi, k, None) if wi else None
+    return d
+# end def interface_values
+
+def diff_guess (ip, old, new) :
+    """ Yield changes between two successful results for ip """
+    for k in 'type', 'version' :
+        if getattr (old, k) != getattr (new, k) :
+            yield Change (ip, k, None, getattr (old, k), getattr (new, k))
+    oi = old.interfaces or {}
+    ni = new.interfaces or {}
+    for name in sorted (set (oi) | set (ni)) :
+        if name not in ni :
+            yield Change (ip, 'interface', name, name, None)
+        elif name not in oi :
+            yield Change (ip, 'interface', name, None, name)
+        else :
+            ov = interface_values (oi [name])
+            nv = interface_values (ni [name])
+            for k in interface_attributes :
+                if ov [k] != nv [k] :
+                    yield Change (ip, k, name, ov [k], nv [k])
+    oips = set (str (i.ip) for i in (old.ips or {}))
+    nips = set (str (i.ip) for i in (new.ips or {}))
+    for i in sorted (oips - nips, key = ip_int) :
+        yield Change (ip, 'ip', i, i, None)
+    for i in sorted (nips - oips, key = ip_int) :
+        yield Change (ip, 'ip', i, None, i)
+# end def diff_guess
+
+def diff_result (ip, old, new) :
+    """ Yield changes for ip, old or new is None if ip is missing in
+        the respective run. If the node answered in only one of the
+        runs, only the change of the error is reported.
+    """
+    if old is None :
+        yield Change (ip, 'node', None, None, summary (new))
+    elif new is None :
+        yield Change (ip, 'node', None, summary (old), None)
+    elif isinstance (old, Guess) and isinstance (new, Guess) :
+        for c in diff_guess (ip, old, new) :
+            yield c
+    else :
+        oe = ne = None
+        if not isinstance (old, Guess) :
+            oe = old [0]
+        if not isinstance (new, Guess) :
+            ne = new [0]
+        if oe != ne :
+            yield Change (ip, 'error', None, oe, ne)
+# end def diff_result
+
+def diff_sources (old, new) :
+    """ Compare two iterables of (ip, result) sorted by IP (e.g.
+        Archives) in a single pass. Yield (ip, result, changes) for
+        each node with changes, result is the new result (None for
+        removed nodes).
+    """
+    old  = iter (old)
+    new  = iter (new)
+    o    = next (old, None)
+    n    = next (new, None)
+    while o is not None or n is not None :
+        ok = nk = None
+        if o is not None :
+            ok = ip_int (o [0])
+        if n is not None :
+            nk = ip_int (n [0])
+        if nk is None or ok is not None and ok < nk :
+            ip, ov, nv = o [0], o [1], None
+            o = next (old, None)
+        elif ok is None or nk < ok :
+            ip, ov, nv = n [0], None, n [1]
+            n = next (new, None)
+        else :
+            ip, ov, nv = n [0], o [1], n [1]
+            o = next (old, None)
+            n = next (new, None)
+        changes = list (diff_result (ip, ov, nv))
+        if changes :
+            yield ip, nv, changes
+# end def diff_sources
+
+def open_results (filename) :
+    """ Results sorted by IP from an archive or a pickle dump """
+    if not filename.endswith ('.gz') and filename != '-' :
+        f = open (filename, 'rb')
+        try :
+            is_archive = f.read (len (magic)) == magic
+        finally :
+            f.close ()
+        if is_archive :
+            return Archive (filename)
+    return sorted_results (read_pickle (filename))
+# end def open_results
+
+class Diff_Table (CSV_Writer) :
+
+    fields = ['address', 'kind', 'item', 'old', 'new']
+
+    @classmethod
+    def rows (cls, ip, changes) :
+        for c in changes :
+            yield dict \
+                ( address = str (ip)
+                , kind    = c.kind
+                , item    = c.item
+                , old     = c.old
+                , new     = c.new
+                )
+    # end def rows
+
+# end class Diff_Table
+
+def main () :
+    import sys
+    from optparse import OptionParser
+
+    cmd = OptionParser \
+        (usage = "%prog [options] old new\n"
+                 "Compare two spider runs (archives or pickle dumps)"
+        )
+    cmd.add_option \
+        ( "-A", "--changed-archive"
+        , dest    = "changed_archive"
+        , help    = "Write new results of changed nodes to this archive"
+        )
+    cmd.add_option \
+        ( "-o", "--output"
+        , dest    = "output"
+        , help    = "CSV file of changes, default is stdout"
+        , default = "-"
+        )
+    (opt, args) = cmd.parse_args ()
+    if len (args) != 2 :
+        cmd.print_help ()
+        sys.exit (23)
+    old, new = (open_results (fn) for fn in args)
+    table    = Diff_Table (opt.output)
+    changed  = None
+    if opt.changed_archive :
+        changed = Archive_Writer (opt.changed_archive)
+    for ip, result, changes in diff_sources (old, new) :
+        table.add (ip, changes)
+        if changed and result is not None :
+            changed.add (ip, result)
+    table.close ()
+    if changed :
+        changed.close ()
+    for r in old, new :
+        if isinstance (r, Archive) :
+            r.close ()
+# end def main
+
+if __name__ == '__main__' :
+    import spider.diff
+    spider.diff.main ()
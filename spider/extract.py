@@ -0,0 +1,190 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   HTMLParser            import HTMLParser
+from   htmlentitydefs        import name2codepoint
+from   xml.etree.ElementTree import Element, SubElement
+from   rsclib.HTML_Parse     import tag
+
+class Stop (Exception) :
+    pass
+# end class Stop
+
+def get_text (node, strip = True) :
+    """ Return all text below node, like rsclib.ETree.get_text """
+    text = []
+    if node.text :
+        text.append (node.text)
+    for n in node :
+        text.append (get_text (n, strip = False))
+    if node.tail :
+        text.append (node.tail)
+    text = ''.join (text)
+    if strip :
+        return text.strip ()
+    return text
+# end def get_text
+
+class Extractor (HTMLParser) :
+    """ Single pass extraction of parts of an HTML page.
+        Instead of building the tree of the whole page, only elements
+        for which select returns a key are built (with everything they
+        contain), selected elements may be nested. They are collected by
+        key in document order in found. Parsing stops as soon as
+        complete returns True for a finished element. Tags get the XHTML
+        namespace like in a Page_Tree, so code working on parts of a
+        Page_Tree works on extracted elements. If the last element in
+        the body was extracted, it is available as body_last.
+        For pages HTMLParser can't parse (it raises HTMLParseError),
+        run_tree takes the same parts from the tree built by tidy.
+    """
+
+    void    = set \
+        (( 'area', 'base', 'br', 'col', 'hr', 'img', 'input', 'link'
+         , 'meta', 'param'
+        ))
+    # Start tags that implicitly end the given open elements
+    implied = dict \
+        ( li     = ('li',)
+        , option = ('option',)
+        , p      = ('p',)
+        , td     = ('td', 'th')
+        , th     = ('td', 'th')
+        , tr     = ('td', 'th', 'tr')
+        )
+
+    def __init__ (self) :
+        HTMLParser.__init__ (self)
+        self.found     = {}
+        self.stack     = []
+        self.body_last = None
+    # end def __init__
+
+    def complete (self, key, elem) :
+        """ Return True if nothing more is needed from the page """
+        return False
+    # end def complete
+
+    def select (self, name, attrs) :
+        """ Return key for elements to extract, None otherwise """
+        return None
+    # end def select
+
+    def handle_charref (self, name) :
+        try :
+            if name [0] in 'xX' :
+                c = unichr (int (name [1:], 16))
+            else :
+                c = unichr (int (name))
+        except ValueError :
+            c = '&#%s;' % name
+        self.handle_data (c)
+    # end def handle_charref
+
+    def handle_data (self, data) :
+        if not self.stack or self.stack [-1][1] is None :
+            return
+        elem = self.stack [-1][1]
+        if len (elem) :
+            elem [-1].tail = (elem [-1].tail or '') + data
+        else :
+            elem.text = (elem.text or '') + data
+    # end def handle_data
+
+    def handle_endtag (self, name) :
+        for n in xrange (len (self.stack) - 1, -1, -1) :
+            if self.stack [n][0] == name :
+                break
+        else :
+            return
+        while len (self.stack) > n :
+            self.pop ()
+    # end def handle_endtag
+
+    def handle_entityref (self, name) :
+        if name in name2codepoint :
+            self.handle_data (unichr (name2codepoint [name]))
+        else :
+            self.handle_data ('&%s;' % name)
+    # end def handle_entityref
+
+    def handle_starttag (self, name, attrs) :
+        ends = self.implied.get (name, ())
+        while self.stack and self.stack [-1][0] in ends :
+            self.pop ()
+        attrs  = dict ((k, v if v is not None else k) for k, v in attrs)
+        parent = None
+        if self.stack :
+            parent = self.stack [-1][1]
+        key    = self.select (name, attrs)
+        if parent is not None :
+            elem = SubElement (parent, tag (name), attrs)
+        elif key is not None :
+            elem = Element (tag (name), attrs)
+        else :
+            elem = None
+        if key is not None :
+            self.found.setdefault (key, []).append (elem)
+        if self.stack and self.stack [-1][0] == 'body' :
+            self.body_last = elem
+        self.stack.append ((name, elem, key))
+        if name in self.void :
+            self.pop ()
+    # end def handle_starttag
+
+    def pop (self) :
+        name, elem, key = self.stack.pop ()
+        if key is not None and self.complete (key, elem) :
+            raise Stop
+    # end def pop
+
+    def run (self, text) :
+        """ Extract from text (unicode), return self """
+        try :
+            self.feed (text)
+            self.close ()
+            while self.stack :
+                self.pop ()
+        except Stop :
+            pass
+        return self
+    # end def run
+
+    def run_tree (self, root) :
+        """ Extract from the tree of the page (like that of a Page_Tree)
+            instead of the text, return self. Note that complete is
+            called when an element starts, not when it ends.
+        """
+        prefix = tag ('')
+        try :
+            for elem in root.iter () :
+                if  (  not isinstance (elem.tag, basestring)
+                    or not elem.tag.startswith (prefix)
+                    ) :
+                    continue
+                key = self.select (elem.tag [len (prefix):], elem.attrib)
+                if key is not None :
+                    self.found.setdefault (key, []).append (elem)
+                    if self.complete (key, elem) :
+                        break
+        finally :
+            if len (root) and len (root [-1]) :
+                self.body_last = root [-1][-1]
+        return self
+    # end def run_tree
+
+# end class Extractor
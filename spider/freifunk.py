@@ -18,11 +18,12 @@
 # #*** </License> ***********************************************************#
 
 import re
-from   rsclib.HTML_Parse  import tag, Page_Tree
 from   rsclib.autosuper   import autosuper
 from   rsclib.stateparser import Parser
 from   spider.common      import unroutable, Net_Link
 from   spider.common      import Inet4, Inet6, Interface, WLAN_Config
+from   spider.extract     import Extractor
+from   spider.session     import Page
 
 pt_mac    = r'((?:[0-9a-fA-F]{2}:){5}[0-9a-fA-F]{2})'
 
@@ -182,12 +183,60 @@ class WLAN_Config_Freifunk (WLAN_Config, Parser) :
 
 # end class WLAN_Config_Freifunk
 
-class Status (Page_Tree) :
+def is_version (s) :
+    return s.startswith ('v1.') or s.startswith ('1.')
+# end def is_version
+
+def is_td_version (s) :
+    return s.startswith ('v1.') or s.startswith ('Fonera-1')
+# end def is_td_version
+
+class Status_Extractor (Extractor) :
+    """ The ifconfig output, the table cell with the WLAN config and the
+        version (in small text or a table cell) of the status page.
+        Other table cells and small texts are dropped when they end,
+        they are no longer built once the version in small text (which
+        takes precedence) and the WLAN config were found. Extraction is
+        complete when all three were found.
+    """
+
+    has_ifconfig = False
+    has_version  = False
+    has_wlan     = False
+
+    def complete (self, key, elem) :
+        text = (elem.text or '').strip ()
+        if key == 'ifconfig' :
+            self.has_ifconfig = True
+        elif key == 'small' and is_version (text) :
+            self.has_version  = True
+        elif key == 'td' and 'SSID:' in text and not self.has_wlan :
+            self.has_wlan     = True
+        elif key == 'td' and not self.has_version and is_td_version (text) :
+            pass
+        else :
+            self.found [key].remove (elem)
+        return self.has_ifconfig and self.has_version and self.has_wlan
+    # end def complete
+
+    def select (self, name, attrs) :
+        if name == 'pre' and attrs.get ('id') == 'ifconfig' :
+            return 'ifconfig'
+        if name == 'small' and not self.has_version :
+            return name
+        if name == 'td' and not (self.has_version and self.has_wlan) :
+            return name
+    # end def select
+
+# end class Status_Extractor
+
+class Status (Page) :
     url       = 'cgi-bin-status.html'
     retries   = 2
     wlan_info = None
     timeout   = 10
     version   = 'Unknown'
+    extractor = Status_Extractor
 
     def _check_interface (self, iface, is_wlan = False) :
         found = False
@@ -202,41 +251,39 @@ class Status (Page_Tree) :
     # end def _check_interface
 
     def parse (self) :
-        #print self.tree_as_string ()
-        root = self.tree.getroot ()
-        for pre in root.findall (".//%s" % tag ("pre")) :
-            if pre.get ('id') == 'ifconfig' :
-                self.ifconfig = Interface_Config ()
-                self.ifconfig.parse (pre.text.split ('\n'))
-                #print pre.text
-                self.if_by_name = {}
-                self.ips        = {}
-                for k, v in self.ifconfig.assignments.iteritems () :
-                    v = v.strip ()
-                    if not v :
-                        continue
-                    if k == 'lan_ifname' :
-                        is_wlan = False
-                    elif k == 'wan_ifname' :
-                        is_wlan = False
-                    elif k.startswith ('wl') and k.endswith ('_ifname') :
-                        is_wlan = True
-                    elif k == 'wifi_ifname' :
-                        is_wlan = True
-                    else :
-                        continue
-                    # unused interface name:
-                    if v not in self.ifconfig.if_by_name :
-                        continue
-                    iface = self.ifconfig.if_by_name [v]
-                    self._check_interface (iface, is_wlan)
-                for iface in self.ifconfig.interfaces :
-                    if iface.name not in self.if_by_name :
-                        self._check_interface (iface)
-                break
+        found = self.extract.found
+        for pre in found.get ('ifconfig', ()) :
+            self.ifconfig = Interface_Config ()
+            self.ifconfig.parse (pre.text.split ('\n'))
+            #print pre.text
+            self.if_by_name = {}
+            self.ips        = {}
+            for k, v in self.ifconfig.assignments.iteritems () :
+                v = v.strip ()
+                if not v :
+                    continue
+                if k == 'lan_ifname' :
+                    is_wlan = False
+                elif k == 'wan_ifname' :
+                    is_wlan = False
+                elif k.startswith ('wl') and k.endswith ('_ifname') :
+                    is_wlan = True
+                elif k == 'wifi_ifname' :
+                    is_wlan = True
+                else :
+                    continue
+                # unused interface name:
+                if v not in self.ifconfig.if_by_name :
+                    continue
+                iface = self.ifconfig.if_by_name [v]
+                self._check_interface (iface, is_wlan)
+            for iface in self.ifconfig.interfaces :
+                if iface.name not in self.if_by_name :
+                    self._check_interface (iface)
+            break
         else :
             raise ValueError, "No interface config found"
-        for td in root.findall (".//%s" % tag ("td")) :
+        for td in found.get ('td', ()) :
             if (not td.text or 'SSID:' not in td.text) :
                 continue
             self.wlan_info = WLAN_Config_Freifunk ()
@@ -256,30 +303,33 @@ class Status (Page_Tree) :
                 wl_count += 1
 
         assert wl_count <= 1
-        for sm in root.findall (".//%s" % tag ("small")) :
-            if sm.text :
-                s = sm.text.strip ()
-                if s.startswith ('v1.') or s.startswith ('1.') :
-                    self.version = sm.text
-                    break
+        for sm in found.get ('small', ()) :
+            if sm.text and is_version (sm.text.strip ()) :
+                self.version = sm.text
+                break
         if self.version == 'Unknown' :
-            for td in root.findall (".//%s" % tag ("td")) :
-                if td.text :
-                    s = td.text.strip ()
-                    if s.startswith ('v1.') or s.startswith ('Fonera-1') :
-                        self.version = td.text.strip ()
-                        break
+            for td in found.get ('td', ()) :
+                if td.text and is_td_version (td.text.strip ()) :
+                    self.version = td.text.strip ()
+                    break
     # end def parse
 
 # end class Status
 
 class Freifunk (autosuper) :
 
-    def __init__ (self, site, request, url = None) :
+    def __init__ \
+        (self, site, request, url = None, timeout = None, session = None) :
         self.site    = site
         self.request = request
+        self.timeout = timeout
         if 'interfaces' in self.request or 'ips' in self.request :
-            st = Status (site = self.site, url = url)
+            st = Status \
+                ( site    = self.site
+                , url     = url
+                , timeout = timeout
+                , session = session
+                )
             self.request ['ips']        = st.ips
             self.request ['interfaces'] = st.if_by_name
             self.request ['version']    = st.version
@@ -19,6 +19,7 @@
 
 from   rsclib.HTML_Parse  import tag
 from   rsclib.autosuper   import autosuper
+from   spider.extract     import get_text
 
 class Version_Mixin (autosuper) :
     version      = "Unknown"
@@ -47,26 +48,33 @@ class Version_Mixin (autosuper) :
     # end def try_get_version
 
     def set_version (self, root) :
+        self.set_version_from (root [-1][-1], root.iter (tag ("a")))
+    # end def set_version
+
+    def set_version_from (self, last, anchors) :
+        """ Set version from the last element in the page body and the
+            anchors of the page (after calls to try_get_version).
+        """
         lv = self.luci_version
         if lv is None :
-            p = root [-1][-1]
-            if p.tag == tag ('p') and p.get ('class') == 'luci' :
-                lv = self.luci_version = self.tree.get_text (p)
+            if  (   last is not None
+                and last.tag == tag ('p')
+                and last.get ('class') == 'luci'
+                ) :
+                lv = self.luci_version = get_text (last)
         # New 2014-Beta (sic) backfire has changed the version info :-(
         if lv is None :
-            footer = None
-            for a in root.findall (".//%s" % tag ("a")) :
+            for a in anchors :
                 if a.get ('href') == 'http://luci.subsignal.org/' :
+                    if a.text.startswith ("Powered by LuCI") :
+                        self.luci_version = lv = a.text
+                        self.bf_version   = a.tail.strip ()
                     break
-            if a is not None :
-                if a.text.startswith ("Powered by LuCI") :
-                    self.luci_version = lv = a.text
-                    self.bf_version   = a.tail.strip ()
         if (lv and lv.startswith ('Powered by LuCI')) :
             lv = lv.split ('(', 1) [-1].split (')', 1) [0]
             self.luci_version = lv
         if self.bf_version and self.luci_version :
             self.version = "%s / Luci %s" % (self.bf_version, self.luci_version)
-    # end def set_version
+    # end def set_version_from
 
 # end class Version_Mixin
@@ -17,11 +17,12 @@
 # along with this module. If not, see <http://www.gnu.org/licenses/>.
 # #*** </License> ***********************************************************#
 
-from   rsclib.HTML_Parse  import tag, Page_Tree
+from   rsclib.HTML_Parse  import tag
 from   rsclib.autosuper   import autosuper
 from   spider.common      import Interface, Inet4, Inet6
+from   spider.session     import Page
 
-class Config (Page_Tree) :
+class Config (Page) :
     url     = None
     retries = 2
     timeout = 10
@@ -79,12 +80,19 @@ class Config (Page_Tree) :
 
 class OLSR (autosuper) :
 
-    def __init__ (self, site, request, url = None) :
+    def __init__ \
+        (self, site, request, url = None, timeout = None, session = None) :
         self.site    = site
         self.url     = url
         self.request = request
+        self.timeout = timeout
         if 'interfaces' in self.request or 'ips' in self.request :
-            cfg = Config (site = self.site, url = url)
+            cfg = Config \
+                ( site    = self.site
+                , url     = url
+                , timeout = timeout
+                , session = session
+                )
             self.request ['ips']        = cfg.ips
             self.request ['interfaces'] = cfg.if_by_name
             self.request ['version']    = cfg.version
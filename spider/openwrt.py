@@ -17,13 +17,14 @@
 # along with this module. If not, see <http://www.gnu.org/licenses/>.
 # #*** </License> ***********************************************************#
 
-from   rsclib.HTML_Parse  import tag, Page_Tree
+from   rsclib.HTML_Parse  import tag
 from   rsclib.autosuper   import autosuper
 from   spider.common      import Interface, Inet4, Inet6, unroutable
 from   spider.common      import WLAN_Config
 from   spider.luci        import Version_Mixin
+from   spider.session     import Page
 
-class Status (Page_Tree, Version_Mixin) :
+class Status (Page, Version_Mixin) :
     url          = 'cgi-bin/luci/freifunk/status/status'
     retries      = 2
     timeout      = 10
@@ -79,7 +80,7 @@ class Status (Page_Tree, Version_Mixin) :
 
 # end class Status
 
-class Table_Iter (Page_Tree) :
+class Table_Iter (Page) :
 
     def table_iter (self) :
         root  = self.tree.getroot ()
@@ -133,13 +134,15 @@ class OLSR_Routes (Table_Iter) :
 
 class OpenWRT (autosuper) :
 
-    def __init__ (self, site, request) :
+    def __init__ (self, site, request, timeout = None, session = None) :
         self.site    = site
         self.request = request
+        self.timeout = timeout
         if 'interfaces' in self.request or 'ips' in self.request :
-            st    = Status           (site = site)
-            conn  = OLSR_Connections (site = site)
-            route = OLSR_Routes      (site = site)
+            kw    = dict (site = site, timeout = timeout, session = session)
+            st    = Status           (** kw)
+            conn  = OLSR_Connections (** kw)
+            route = OLSR_Routes      (** kw)
             self.version = st.version
             assert len (st.wlans) <= 1
             interfaces   = {}
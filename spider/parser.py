@@ -19,19 +19,28 @@
 
 import os
 import re
+import sys
+import heapq
+import pickle
 from   stat                 import ST_MTIME
 from   csv                  import DictWriter
 from   gzip                 import GzipFile
+from   collections          import deque
+from   StringIO             import StringIO
+from   multiprocessing      import Pool
 from   datetime             import datetime
-from   rsclib.HTML_Parse    import tag, Page_Tree
+from   rsclib.HTML_Parse    import tag
 from   rsclib.stateparser   import Parser
 from   rsclib.autosuper     import autosuper
-from   rsclib.IP_Address    import IP4_Address
+from   rsclib.timeout       import Timeout_Error
 from   spider.freifunk      import Freifunk
 from   spider.olsr_httpinfo import OLSR
 from   spider.backfire      import Backfire
 from   spider.openwrt       import OpenWRT
 from   spider.routeros      import Router_OS
+from   spider.store         import Result_Store
+from   spider.archive       import Archive, Archive_Writer, ip_int
+from   spider.session       import Page, Session
 
 # for pickle
 from   spider.common      import Interface, Net_Link, Inet4, Inet6, WLAN_Config
@@ -40,21 +49,24 @@ from   spider.freifunk    import Interface_Config, WLAN_Config_Freifunk
 
 site_template = 'http://%(ip)s'
 
-class First_Guess (Page_Tree) :
+class First_Guess (Page) :
     url     = ''
     delay   = 0
     retries = 2
     timeout = 10
+    phase   = 'guess'
 
     status_url = 'cgi-bin-status.html'
     status_ok  = 0
 
-    def __init__ (self, rqinfo, site, url, port = 0) :
+    def __init__ \
+        (self, rqinfo, site, url, port = 0, timeout = None, session = None) :
         self.rqinfo = rqinfo
         if port :
             site = "%s:%s" % (site, port)
         self.params = dict (request = self.rqinfo, site = site)
-        self.__super.__init__ (site = site, url = url)
+        self.__super.__init__ \
+            (site = site, url = url, timeout = timeout, session = session)
     # end def __init__
 
     def parse (self) :
@@ -138,17 +150,20 @@ class First_Guess (Page_Tree) :
 
 # end class First_Guess
 
-class Luci_Guess (Page_Tree) :
+class Luci_Guess (Page) :
     delay        = 0
     retries      = 2
     timeout      = 10
     url          = 'cgi-bin/luci'
     html_charset = 'utf-8' # force utf-8 encoding
+    phase        = 'guess'
 
-    def __init__ (self, rqinfo, site, url = None) :
+    def __init__ \
+        (self, rqinfo, site, url = None, timeout = None, session = None) :
         self.rqinfo = rqinfo
         self.params = dict (request = self.rqinfo, site = site)
-        self.__super.__init__ (site = site, url = url)
+        self.__super.__init__ \
+            (site = site, url = url, timeout = timeout, session = session)
     # end def __init__
 
     def parse (self) :
@@ -177,18 +192,39 @@ class Guess (Compare_Mixin) :
         , Router_OS = Router_OS
         )
 
-    def __init__ (self, site, ip, url = None, port = 0) :
+    def __init__ \
+        ( self
+        , site
+        , ip
+        , url          = None
+        , port         = 0
+        , timeout      = None
+        , fingerprint  = None
+        , min_interval = None
+        , stats        = None
+        , deadline     = None
+        ) :
+        """ The optional timeout is applied to each page request of
+            the guessing and of the backend.
+            If a fingerprint (backend, params) of an earlier run is
+            given, we try that backend directly. If this fails for
+            another reason than a timeout (e.g. after a firmware
+            upgrade) we fall back to guessing the backend.
+            All pages of the node are fetched via one HTTP session,
+            requests are at least min_interval seconds apart. Counters
+            and timings of the session are summed up in the optional
+            dict stats (see Session). An optional deadline limits the
+            connects, reads and the total time of all requests (see
+            Deadline).
+        """
         self.version = "Unknown"
-        self.rqinfo  = dict.fromkeys (('ips', 'interfaces'))
-        self.rqinfo ['ip'] = ip
-        g = First_Guess (self.rqinfo, site, url, port)
-        self.params  = g.params
-        self.backend = g.backend
-        if self.backend == 'Luci' :
-            g2  = Luci_Guess (self.rqinfo, self.params ['site'])
-            self.params  = g2.params
-            self.backend = g2.backend
-        self.status  = self.backend_table [self.backend] (** self.params)
+        self.cached  = False
+        session      = self.new_session \
+            (timeout, min_interval, stats, deadline)
+        try :
+            self.guess (site, ip, url, port, timeout, fingerprint, session)
+        finally :
+            session.close ()
         try :
             self.version = self.rqinfo ['version']
         except KeyError :
@@ -197,6 +233,65 @@ class Guess (Compare_Mixin) :
         self.time = datetime.utcnow ()
     # end def __init__
 
+    @property
+    def fingerprint (self) :
+        """ Backend and parameters for spidering this node again """
+        params = dict \
+            ((k, v) for k, v in self.params.iteritems () if k != 'request')
+        return self.backend, params
+    # end def fingerprint
+
+    def guess (self, site, ip, url, port, timeout, fingerprint, session) :
+        if fingerprint :
+            backend, params = fingerprint
+            try :
+                self.run_backend \
+                    (ip, backend, dict (params), timeout, session)
+                self.cached = True
+                return
+            except Timeout_Error :
+                raise
+            except Exception :
+                pass
+        self.rqinfo = self.new_rqinfo (ip)
+        g = First_Guess (self.rqinfo, site, url, port, timeout, session)
+        backend = g.backend
+        params  = g.params
+        if backend == 'Luci' :
+            g2  = Luci_Guess \
+                ( self.rqinfo, params ['site']
+                , timeout = timeout
+                , session = session
+                )
+            backend = g2.backend
+            params  = g2.params
+        self.run_backend (ip, backend, params, timeout, session)
+    # end def guess
+
+    def new_session (self, timeout, min_interval, stats, deadline) :
+        return Session \
+            ( timeout
+            , min_interval = min_interval
+            , stats        = stats
+            , deadline     = deadline
+            )
+    # end def new_session
+
+    def new_rqinfo (self, ip) :
+        rqinfo = dict.fromkeys (('ips', 'interfaces'))
+        rqinfo ['ip'] = ip
+        return rqinfo
+    # end def new_rqinfo
+
+    def run_backend (self, ip, backend, params, timeout, session) :
+        if 'request' not in params :
+            self.rqinfo = params ['request'] = self.new_rqinfo (ip)
+        self.params  = params
+        self.backend = backend
+        self.status  = self.backend_table [self.backend] \
+            (timeout = timeout, session = session, ** self.params)
+    # end def run_backend
+
     def as_json (self) :
         d = dict (type = self.type, version = self.version)
         iface = d ['interfaces'] = []
@@ -248,18 +343,430 @@ class Guess (Compare_Mixin) :
 
 # end class Guess
 
+def merge_result (ipdict, ip, v, debug = False) :
+    """ Merge spider result v for ip into ipdict.
+        A Guess overwrites everything, an error tuple only overwrites
+        a previous error tuple if it is a Timeout_Error or if the new
+        error is a ValueError.
+    """
+    if ip in ipdict :
+        ov       = ipdict [ip]
+        istuple  = isinstance (v, tuple)
+        if isinstance (ov, tuple) :
+            overwrite = False
+            if not istuple :
+                overwrite = True
+            elif ov [0] == 'Timeout_Error' :
+                overwrite = True
+            elif v [0] == 'ValueError' :
+                overwrite = True
+            if overwrite :
+                #print debug, istuple, v, ov [0]
+                if (debug and (not istuple or v [0] != ov [0])) :
+                    print "%s: overwriting %s with %s" % (ip, ov, v)
+                ipdict [ip] = v
+            elif istuple and ov [0] != v [0] and debug :
+                print "%s: Not overwriting %s with %s" % (ip, ov, v)
+        else :
+            assert isinstance (ov, Guess)
+            if istuple :
+                if debug :
+                    print "%s: Not overwriting %s with %s" % (ip, ov, v)
+            else :
+                assert isinstance (v, Guess)
+                ipdict [ip] = v
+    else :
+        if debug :
+            print "%s: new: %s" % (ip, v)
+        ipdict [ip] = v
+# end def merge_result
+
+def keyed_source (n, src) :
+    """ Yield (ip as integer, n, ip, result) for items of source n """
+    for ip, r in src :
+        yield ip_int (ip), n, ip, r
+# end def keyed_source
+
+def report_missing (ip, found, named, names) :
+    """ Report named sources after the first one containing ip that
+        don't contain ip.
+    """
+    seen = False
+    for n in named :
+        if n in found :
+            seen = True
+        elif seen :
+            print "%s: not existing in dump %s" % (ip, names [n])
+# end def report_missing
+
+def merge_sources (sources, debug = False, names = None) :
+    """ Streaming k-way merge of sources, each an iterable of (ip,
+        result) sorted by IP (e.g. an Archive). Yield (ip, result)
+        sorted by IP where result is merged with merge_result from the
+        results for ip in the order of sources. Only the results of
+        the current IP are kept in memory.
+        With debug, names is an optional list with a name for each
+        source (or None): an IP found in a named source but missing in
+        a later named source is reported as not existing in that one.
+    """
+    streams = [keyed_source (n, src) for n, src in enumerate (sources)]
+    named   = []
+    if debug and names :
+        named = [n for n, name in enumerate (names) if name is not None]
+    merged  = {}
+    found   = set ()
+    last    = None
+    for k, n, ip, r in heapq.merge (* streams) :
+        if last is not None and last != ip :
+            report_missing (last, found, named, names)
+            found.clear ()
+            yield last, merged.pop (last)
+        merge_result (merged, ip, r, debug)
+        found.add (n)
+        last = ip
+    if last is not None :
+        report_missing (last, found, named, names)
+        yield last, merged.pop (last)
+# end def merge_sources
+
+def sorted_results (ipdict) :
+    """ Items of ipdict sorted by IP """
+    return sorted (ipdict.iteritems (), key = lambda x : ip_int (x [0]))
+# end def sorted_results
+
+def timestamp (guess) :
+    return guess.time.strftime ("%Y-%m-%d %H:%M:%S+0")
+# end def timestamp
+
+class Pickle_Writer (autosuper) :
+    """ Collect results, written as pickle dump on close """
+
+    def __init__ (self, filename) :
+        self.filename = filename
+        self.ipdict   = {}
+    # end def __init__
+
+    def add (self, ip, result) :
+        self.ipdict [ip] = result
+    # end def add
+
+    def close (self) :
+        if self.filename.endswith ('.gz') :
+            f = GzipFile (self.filename, 'wb', 9)
+        else :
+            f = open (self.filename, 'wb')
+        pickle.dump (self.ipdict, f)
+        f.close ()
+    # end def close
+
+# end class Pickle_Writer
+
+def format_chunk (cls, chunk) :
+    return cls.format (chunk)
+# end def format_chunk
+
+class CSV_Writer (autosuper) :
+    """ Write rows for results to CSV file ('-' is stdout).
+        Results are collected in chunks, the rows of a chunk are
+        formatted as CSV text in one go, by a worker process if a pool
+        is given. Formatted chunks are written in order as soon as they
+        are ready, only a few chunks per worker are kept in memory.
+    """
+
+    fields      = []
+    max_pending = 8
+
+    def __init__ (self, filename, pool = None, chunk_size = 512) :
+        if filename == '-' :
+            self.f = sys.stdout
+        else :
+            self.f = open (filename, 'w')
+        self.pool       = pool
+        self.chunk_size = chunk_size
+        self.chunk      = []
+        self.pending    = deque ()
+        dw = DictWriter (self.f, self.fields, delimiter = ';')
+        dw.writerow (dict ((k, k) for k in self.fields))
+    # end def __init__
+
+    @classmethod
+    def format (cls, chunk) :
+        """ CSV text for chunk of results """
+        f  = StringIO ()
+        dw = DictWriter (f, cls.fields, delimiter = ';')
+        for ip, result in chunk :
+            dw.writerows (cls.rows (ip, result))
+        return f.getvalue ()
+    # end def format
+
+    def add (self, ip, result) :
+        self.chunk.append ((ip, result))
+        if len (self.chunk) >= self.chunk_size :
+            self.flush ()
+    # end def add
+
+    def close (self) :
+        self.flush ()
+        self.write (0)
+        if self.f is not sys.stdout :
+            self.f.close ()
+    # end def close
+
+    def flush (self) :
+        if self.chunk :
+            if self.pool is None :
+                self.f.write (self.format (self.chunk))
+            else :
+                self.pending.append \
+                    ( self.pool.apply_async
+                        (format_chunk, (self.__class__, self.chunk))
+                    )
+            self.chunk = []
+        self.write (self.max_pending)
+    # end def flush
+
+    def write (self, max_pending) :
+        """ Write formatted chunks until at most max_pending remain """
+        while self.pending :
+            if len (self.pending) <= max_pending :
+                if not self.pending [0].ready () :
+                    break
+            self.f.write (self.pending.popleft ().get ())
+    # end def write
+
+# end class CSV_Writer
+
+class Version_Statistics (CSV_Writer) :
+
+    fields = ['timestamp', 'address', 'type', 'version']
+
+    @classmethod
+    def rows (cls, ip, guess) :
+        if isinstance (guess, Guess) :
+            yield dict \
+                ( timestamp = timestamp (guess)
+                , address   = str (ip)
+                , version   = guess.version
+                , type      = guess.type
+                )
+    # end def rows
+
+# end class Version_Statistics
+
+class Interface_Info (CSV_Writer) :
+
+    fields = \
+        [ 'timestamp', 'address', 'interface', 'mac', 'wlan'
+        , 'ssid', 'mode', 'channel', 'bssid'
+        , 'ip4', 'ip6', 'signal', 'noise'
+        ]
+
+    @classmethod
+    def rows (cls, ip, guess) :
+        if not isinstance (guess, Guess) :
+            return
+        for iface in guess.interfaces.itervalues () :
+            wi = iface.wlan_info
+            mc = None
+            if iface.link :
+                mc = iface.link.mac
+            d  = dict \
+                ( timestamp = timestamp (guess)
+                , address   = str (ip)
+                , interface = iface.name
+                , mac       = mc
+                , wlan      = bool (wi)
+                , ip4       = ' '.join (str (i.ip) for i in iface.inet4)
+                , ip6       = ' '.join (str (i.ip) for i in iface.inet6)
+                )
+            if wi :
+                d.update \
+                    ( channel = wi.channel
+                    , bssid   = wi.bssid
+                    , ssid    = wi.ssid
+                    , mode    = wi.mode
+                    , signal  = wi.signal
+                    , noise   = wi.noise
+                    )
+            yield d
+    # end def rows
+
+# end class Interface_Info
+
+class Wide_Table (Interface_Info) :
+    """ One table with all information: a row per interface with the
+        information of the node repeated, one row for nodes without
+        interfaces and for errors.
+    """
+
+    fields = \
+        ( ['timestamp', 'address', 'type', 'version', 'error']
+        + Interface_Info.fields [2:]
+        )
+
+    @classmethod
+    def rows (cls, ip, result) :
+        if not isinstance (result, Guess) :
+            yield dict (address = str (ip), error = result [0])
+            return
+        node = dict (type = result.type, version = result.version)
+        rows = 0
+        for d in super (Wide_Table, cls).rows (ip, result) :
+            d.update (node)
+            rows += 1
+            yield d
+        if not rows :
+            yield dict \
+                (node, timestamp = timestamp (result), address = str (ip))
+    # end def rows
+
+# end class Wide_Table
+
+def percentile (values, q) :
+    """ Nearest-rank percentile q (0 <= q < 1) of sorted values """
+    return values [min (len (values) - 1, int (q * len (values)))]
+# end def percentile
+
+class Timing_Report (CSV_Writer) :
+    """ Percentiles of the counters and timings of spidering nodes
+        (stats of result stores, see spider.session.Session) by type
+        and version of node, failed nodes are reported with the name of
+        the error as type. Timings are in seconds.
+    """
+
+    fields  = \
+        [ 'type', 'version', 'metric', 'nodes', 'sum'
+        , 'p50', 'p90', 'p99', 'max'
+        ]
+    metrics = \
+        ( 'total', 'queue', 'connect', 'fetch', 'guess', 'backend'
+        , 'requests', 'connects', 'retries', 'bytes'
+        )
+
+    def __init__ (self, filename) :
+        self.__super.__init__ (filename)
+        self.samples = {}
+    # end def __init__
+
+    def add (self, ip, result, stats) :
+        if stats is None :
+            return
+        if isinstance (result, Guess) :
+            key = (result.type, result.version)
+        else :
+            key = (result [0], '')
+        samples = self.samples.setdefault (key, {})
+        for m in self.metrics :
+            samples.setdefault (m, []).append (stats.get (m, 0))
+    # end def add
+
+    def close (self) :
+        for key in sorted (self.samples) :
+            self.chunk.append ((key, self.samples.pop (key)))
+        self.__super.close ()
+    # end def close
+
+    @classmethod
+    def rows (cls, key, samples) :
+        type, version = key
+        for m in cls.metrics :
+            v = sorted (samples [m])
+            d = dict \
+                ( sum = sum (v)
+                , p50 = percentile (v, 0.5)
+                , p90 = percentile (v, 0.9)
+                , p99 = percentile (v, 0.99)
+                , max = v [-1]
+                )
+            for k, x in d.iteritems () :
+                if isinstance (x, float) :
+                    d [k] = '%.3f' % x
+            d.update (type = type, version = version, metric = m)
+            d ['nodes'] = len (v)
+            yield d
+    # end def rows
+
+# end class Timing_Report
+
+class Verbose_Writer (autosuper) :
+
+    def __init__ (self, verbose) :
+        self.verbose = verbose
+    # end def __init__
+
+    def add (self, ip, guess) :
+        if self.verbose > 1 :
+            print "%-15s" % ip
+            print '=' * 15
+            if isinstance (guess, Guess) :
+                print guess.verbose_repr ()
+            else :
+                print "Exception:", guess
+        else :
+            print "%-15s: %s" % (ip, guess)
+    # end def add
+
+    def close (self) :
+        pass
+    # end def close
+
+# end class Verbose_Writer
+
+def read_pickle (fn) :
+    """ Read pickle dump (gzipped if name ends in .gz, stdin for '-'),
+        fix up Guess objects of older spider versions.
+    """
+    mt = None
+    if fn == '-' :
+        f = sys.stdin
+    else :
+        mt = datetime.utcfromtimestamp (os.stat (fn) [ST_MTIME])
+        if fn.endswith ('.gz') :
+            f = GzipFile (fn, 'r')
+        else :
+            f = open (fn, 'r')
+    obj = pickle.load (f)
+    for v in obj.itervalues () :
+        if isinstance (v, Guess) :
+            if not hasattr (v, 'rqinfo') :
+                v.rqinfo                = {}
+                v.rqinfo ['ips']        = v.status.ips
+                v.rqinfo ['interfaces'] = v.status.if_by_name
+                v.status                = None
+            if mt and not hasattr (v, 'time') :
+                v.time = mt
+    return obj
+# end def read_pickle
+
 def main () :
-    import sys
-    import pickle
     from optparse import OptionParser
 
     cmd = OptionParser ()
+    cmd.add_option \
+        ( "-a", "--read-archive"
+        , dest    = "read_archive"
+        , help    = "Read archive files, merged after pickle files"
+        , action  = "append"
+        , default = []
+        )
+    cmd.add_option \
+        ( "-A", "--output-archive"
+        , dest    = "output_archive"
+        , help    = "Optional archive output file"
+        )
     cmd.add_option \
         ( "-d", "--debug"
         , dest    = "debug"
         , action  = "store_true"
         , help    = "Debug merging of pickle dumps"
         )
+    cmd.add_option \
+        ( "-j", "--jobs"
+        , dest    = "jobs"
+        , help    = "Number of worker processes formatting CSV output"
+        , type    = "int"
+        , default = 0
+        )
     cmd.add_option \
         ( "-l", "--local"
         , dest    = "local"
@@ -285,6 +792,14 @@ def main () :
         , action  = "append"
         , default = []
         )
+    cmd.add_option \
+        ( "-s", "--read-store"
+        , dest    = "read_store"
+        , help    = "Read result store of spider run, merged after pickle "
+                    "files in the order the results were written"
+        , action  = "append"
+        , default = []
+        )
     cmd.add_option \
         ( "-V", "--version-statistics"
         , dest    = "version_statistics"
@@ -295,6 +810,17 @@ def main () :
         , dest    = "interface_info"
         , help    = "Output interface information by spidered IP"
         )
+    cmd.add_option \
+        ( "-W", "--wide-table"
+        , dest    = "wide_table"
+        , help    = "Output one table with node and interface information"
+        )
+    cmd.add_option \
+        ( "-T", "--timing-report"
+        , dest    = "timing_report"
+        , help    = "Output percentiles of timings of spidering by type "
+                    "and version of node (from result stores)"
+        )
     cmd.add_option \
         ( "-v", "--verbose"
         , dest    = "verbose"
@@ -302,70 +828,34 @@ def main () :
         , help    = "Show verbose results"
         )
     (opt, args) = cmd.parse_args ()
-    if len (args) < 1 and not opt.read_pickle :
+    if  (   len (args) < 1
+        and not opt.read_pickle
+        and not opt.read_archive
+        and not opt.read_store
+        ) :
         cmd.print_help ()
         sys.exit (23)
-    ipdict = {}
+    sources  = []
     for fn in opt.read_pickle :
         if opt.debug :
             print "Processing pickle dump %s" % fn
-        keys = dict.fromkeys (ipdict.iterkeys ())
-        mt   = None
-        if fn == '-' :
-            f = sys.stdin
-        else :
-            mt = datetime.utcfromtimestamp (os.stat (fn) [ST_MTIME])
-            if fn.endswith ('.gz') :
-                f = GzipFile (fn, 'r')
-            else :
-                f = open (fn, 'r')
-        obj = pickle.load (f)
-        for k, v in obj.iteritems () :
-            # Fixup of object
-            if isinstance (v, Guess) :
-                if not hasattr (v, 'rqinfo') :
-                    v.rqinfo                = {}
-                    v.rqinfo ['ips']        = v.status.ips
-                    v.rqinfo ['interfaces'] = v.status.if_by_name
-                    v.status                = None
-                if mt and not hasattr (v, 'time') :
-                    v.time = mt
-            if k in ipdict :
-                keys [k] = True
-                ov       = ipdict [k]
-                istuple  = isinstance (v, tuple)
-                if isinstance (ov, tuple) :
-                    overwrite = False
-                    if not istuple :
-                        overwrite = True
-                    elif ov [0] == 'Timeout_Error' :
-                        overwrite = True
-                    elif v [0] == 'ValueError' :
-                        overwrite = True
-                    if overwrite :
-                        #print opt.debug, istuple, v, ov [0]
-                        if (opt.debug and (not istuple or v [0] != ov [0])) :
-                            print "%s: overwriting %s with %s" % (k, ov, v)
-                        ipdict [k] = v
-                    elif istuple and ov [0] != v [0] and opt.debug :
-                        print "%s: Not overwriting %s with %s" % (k, ov, v)
-                else :
-                    assert isinstance (ov, Guess)
-                    if istuple :
-                        if opt.debug :
-                            print "%s: Not overwriting %s with %s" % (k, ov, v)
-                    else :
-                        assert isinstance (v, Guess)
-                        ipdict [k] = v
-            else :
-                if opt.debug :
-                    print "%s: new: %s" % (k, v)
-                ipdict [k] = v
+        sources.append (sorted_results (read_pickle (fn)))
+    names    = list (opt.read_pickle)
+    archives = [Archive (fn) for fn in opt.read_archive]
+    sources.extend (archives)
+    stored   = {}
+    timing   = None
+    if opt.timing_report :
+        timing = Timing_Report (opt.timing_report)
+    for fn in opt.read_store :
         if opt.debug :
-            for k, v in keys.iteritems () :
-                if not v :
-                    print "%s: not existing in dump %s" % (k, fn)
-
+            print "Processing result store %s" % fn
+        for k, t, v, stats in Result_Store (fn).records () :
+            merge_result (stored, k, v, opt.debug)
+            if timing :
+                timing.add (k, v, stats)
+    sources.append (sorted_results (stored))
+    spidered = {}
     for ip in args :
         port = opt.port
         try :
@@ -381,86 +871,36 @@ def main () :
             url  = 'index.html'
         ff = Guess (site = site, ip = ip, url = url, port = port)
         print ff.verbose_repr ()
-        ipdict [str (ip)] = ff
+        spidered [str (ip)] = ff
+    sources.append (sorted_results (spidered))
+    writers = []
+    pool    = None
+    if opt.jobs :
+        pool = Pool (opt.jobs)
     if opt.output_pickle :
-        if opt.output_pickle.endswith ('.gz') :
-            f = GzipFile (opt.output_pickle, 'wb', 9)
-        else :
-            f = open (opt.output_pickle, 'wb')
-        pickle.dump (ipdict, f)
-        f.close ()
-    key = lambda x : IP4_Address (x [0])
+        writers.append (Pickle_Writer (opt.output_pickle))
+    if opt.output_archive :
+        writers.append (Archive_Writer (opt.output_archive))
     if opt.version_statistics :
-        fields = ['timestamp', 'address', 'type', 'version']
-        if opt.version_statistics == '-' :
-            f  = sys.stdout
-        else :
-            f  = open (opt.version_statistics, 'w')
-        dw     = DictWriter (f, fields, delimiter = ';')
-        dw.writerow (dict ((k, k) for k in fields))
-        for ip, guess in sorted (ipdict.iteritems (), key = key) :
-            if isinstance (guess, Guess) :
-                dw.writerow \
-                    ( dict
-                        ( timestamp = guess.time.strftime
-                            ("%Y-%m-%d %H:%M:%S+0")
-                        , address   = str (ip)
-                        , version   = guess.version
-                        , type      = guess.type
-                        )
-                    )
-        f.close ()
+        writers.append (Version_Statistics (opt.version_statistics, pool))
     if opt.interface_info :
-        fields = \
-            [ 'timestamp', 'address', 'interface', 'mac', 'wlan'
-            , 'ssid', 'mode', 'channel', 'bssid'
-            , 'ip4', 'ip6', 'signal', 'noise'
-            ]
-        if opt.interface_info == '-' :
-            f  = sys.stdout
-        else :
-            f  = open (opt.interface_info, 'w')
-        dw     = DictWriter (f, fields, delimiter = ';')
-        dw.writerow (dict ((k, k) for k in fields))
-        for ip, guess in sorted (ipdict.iteritems (), key = key) :
-            if isinstance (guess, Guess) :
-                for iface in guess.interfaces.itervalues () :
-                    wi = iface.wlan_info
-                    mc = None
-                    if iface.link :
-                        mc = iface.link.mac
-                    d  = dict \
-                        ( timestamp = guess.time.strftime
-                            ("%Y-%m-%d %H:%M:%S+0")
-                        , address   = str (ip)
-                        , interface = iface.name
-                        , mac       = mc
-                        , wlan      = bool (wi)
-                        , ip4       = ' '.join (str (i.ip) for i in iface.inet4)
-                        , ip6       = ' '.join (str (i.ip) for i in iface.inet6)
-                        )
-                    if wi :
-                        d.update \
-                            ( channel = wi.channel
-                            , bssid   = wi.bssid
-                            , ssid    = wi.ssid
-                            , mode    = wi.mode
-                            , signal  = wi.signal
-                            , noise   = wi.noise
-                            )
-                    dw.writerow (d)
-        f.close ()
+        writers.append (Interface_Info (opt.interface_info, pool))
+    if opt.wide_table :
+        writers.append (Wide_Table (opt.wide_table, pool))
     if opt.verbose :
-        for ip, guess in sorted (ipdict.iteritems (), key = key) :
-            if opt.verbose > 1 :
-                print "%-15s" % ip
-                print '=' * 15
-                if isinstance (guess, Guess) :
-                    print guess.verbose_repr ()
-                else :
-                    print "Exception:", guess
-            else :
-                print "%-15s: %s" % (ip, guess)
+        writers.append (Verbose_Writer (opt.verbose))
+    for ip, result in merge_sources (sources, opt.debug, names) :
+        for w in writers :
+            w.add (ip, result)
+    for w in writers :
+        w.close ()
+    if timing :
+        timing.close ()
+    if pool :
+        pool.close ()
+        pool.join ()
+    for archive in archives :
+        archive.close ()
 # end def main
 
 if __name__ == '__main__' :
@@ -0,0 +1,114 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import errno
+import resource
+import socket
+import select
+
+from   time               import time
+from   rsclib.autosuper   import autosuper
+
+class Probe (autosuper) :
+    """ Check which hosts answer on their web port using non-blocking
+        TCP connects. Up to parallel connects are in flight at the same
+        time, each host gets at most timeout seconds to answer.
+        After run, IPs are in one of alive (connect succeeded), refused
+        (host is up but nothing listens on the port) or dead (no answer
+        or unreachable).
+        Each connect in flight needs a file descriptor, by default
+        parallel is half of the limit of open files of the process
+        (the rest is left to the spider) but at most max_parallel,
+        select can't wait for descriptors above FD_SETSIZE (1024).
+    """
+
+    in_progress  = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+    max_parallel = 256
+
+    def __init__ \
+        (self, ips, ip_port = {}, timeout = 3, parallel = None, port = 80) :
+        if parallel is None :
+            soft, hard = resource.getrlimit (resource.RLIMIT_NOFILE)
+            parallel   = self.max_parallel
+            if soft != resource.RLIM_INFINITY :
+                parallel = max (1, min (parallel, soft // 2))
+        self.ips      = list (ips)
+        self.ip_port  = ip_port
+        self.timeout  = timeout
+        self.parallel = parallel
+        self.port     = port
+        self.alive    = set ()
+        self.refused  = set ()
+        self.dead     = set ()
+    # end def __init__
+
+    def connect (self, ip) :
+        """ Start non-blocking connect, return socket or None if the
+            connect already failed.
+        """
+        port = int (self.ip_port.get (ip, self.port))
+        sock = socket.socket (socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking (0)
+        err  = sock.connect_ex ((ip, port))
+        if err == 0 or err in self.in_progress :
+            return sock
+        sock.close ()
+        self.classify (ip, err)
+        return None
+    # end def connect
+
+    def classify (self, ip, err) :
+        if err == 0 :
+            self.alive.add (ip)
+        elif err == errno.ECONNREFUSED :
+            self.refused.add (ip)
+        else :
+            self.dead.add (ip)
+    # end def classify
+
+    def run (self) :
+        todo    = list (reversed (self.ips))
+        pending = {}
+        while todo or pending :
+            while todo and len (pending) < self.parallel :
+                ip   = todo.pop ()
+                sock = self.connect (ip)
+                if sock is not None :
+                    pending [sock] = (ip, time () + self.timeout)
+            if not pending :
+                continue
+            now  = time ()
+            wait = min (d for ip, d in pending.itervalues ()) - now
+            if wait > 0 :
+                r, w, x = select.select ([], pending.keys (), [], wait)
+            else :
+                w = []
+            for sock in w :
+                ip, d = pending.pop (sock)
+                err   = sock.getsockopt (socket.SOL_SOCKET, socket.SO_ERROR)
+                sock.close ()
+                self.classify (ip, err)
+            now = time ()
+            for sock, (ip, d) in pending.items () :
+                if d <= now :
+                    del pending [sock]
+                    sock.close ()
+                    self.dead.add (ip)
+        return self
+    # end def run
+
+# end class Probe
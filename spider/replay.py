@@ -0,0 +1,477 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import pickle
+import random
+import resource
+import select
+import socket
+import struct
+import tempfile
+
+from   BaseHTTPServer     import HTTPServer, BaseHTTPRequestHandler
+from   SocketServer       import ThreadingMixIn
+from   multiprocessing    import Process
+from   time               import sleep, time
+from   urllib             import unquote
+from   urlparse           import urlparse
+from   rsclib.autosuper   import autosuper
+from   spider.parser      import Guess, site_template
+from   spider.session     import Page, Session, request_path
+
+class Recording_Session (Session) :
+    """ Session that records all responses in pages, a dict by path of
+        (status, location, body).
+    """
+
+    def __init__ (self, pages, * args, ** kw) :
+        self.pages = pages
+        self.__super.__init__ (* args, ** kw)
+    # end def __init__
+
+    def request (self, url, timeout) :
+        status, reason, headers, body = self.__super.request (url, timeout)
+        self.pages [request_path (urlparse (url))] = \
+            (status, headers.getheader ('location'), body)
+        return status, reason, headers, body
+    # end def request
+
+# end class Recording_Session
+
+class Recording_Guess (Guess) :
+    """ Guess that records all pages of the node in pages """
+
+    def __init__ (self, pages, * args, ** kw) :
+        self.pages = pages
+        self.__super.__init__ (* args, ** kw)
+    # end def __init__
+
+    def new_session (self, timeout, min_interval, stats, deadline) :
+        return Recording_Session \
+            ( self.pages
+            , timeout
+            , min_interval = min_interval
+            , stats        = stats
+            , deadline     = deadline
+            )
+    # end def new_session
+
+# end class Recording_Guess
+
+def record (corpus, ip, port = 0, timeout = None) :
+    """ Spider ip and record its pages in the corpus directory """
+    pages = {}
+    g     = Recording_Guess \
+        ( pages
+        , site    = site_template % locals ()
+        , ip      = ip
+        , port    = port
+        , timeout = timeout
+        )
+    f     = open (os.path.join (corpus, '%s.pickle' % ip), 'wb')
+    pickle.dump (pages, f, pickle.HIGHEST_PROTOCOL)
+    f.close ()
+    return g
+# end def record
+
+def read_pages (directory) :
+    """ Return pages (see record) of a node from a directory tree: each
+        file is the body of the page with the path of the file relative
+        to directory (quoted, e.g., '%3F' for the '?' of a query), a
+        file index.html is also the page of its directory.
+    """
+    pages = {}
+    for dirpath, dirnames, filenames in os.walk (directory) :
+        for fn in filenames :
+            name = os.path.relpath (os.path.join (dirpath, fn), directory)
+            path = '/' + unquote (name.replace (os.sep, '/'))
+            f    = open (os.path.join (dirpath, fn), 'rb')
+            page = (200, None, f.read ())
+            f.close ()
+            pages [path] = page
+            if fn == 'index.html' :
+                path = path [:-len (fn)]
+                pages [path] = pages [path.rstrip ('/') or '/'] = page
+    return pages
+# end def read_pages
+
+def read_corpus (corpus) :
+    """ Return list of recorded nodes (dicts of pages by path): the
+        pickle files written by record and the directory trees of pages
+        (see read_pages) in the corpus directory.
+    """
+    nodes = []
+    for fn in sorted (os.listdir (corpus)) :
+        path = os.path.join (corpus, fn)
+        if fn.endswith ('.pickle') :
+            f = open (path, 'rb')
+            nodes.append (pickle.load (f))
+            f.close ()
+        elif os.path.isdir (path) :
+            nodes.append (read_pages (path))
+    return nodes
+# end def read_corpus
+
+class Replay_Handler (BaseHTTPRequestHandler) :
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET (self) :
+        server = self.server
+        ip     = self.connection.getsockname () [0]
+        if ip in server.dead :
+            # Never answer, the client runs into its timeout
+            sleep (server.hang)
+            self.close_connection = 1
+            return
+        delay  = server.latency + random.random () * server.jitter
+        if delay :
+            sleep (delay)
+        if random.random () < server.failures :
+            # Close connection without response
+            self.close_connection = 1
+            return
+        page = server.node (ip).get (self.path)
+        if page is None :
+            self.send_error (404)
+            return
+        status, location, body = page
+        self.send_response (status)
+        if location :
+            self.send_header ('Location', location)
+        self.send_header ('Content-Type',   'text/html')
+        self.send_header ('Content-Length', str (len (body)))
+        self.end_headers ()
+        self.wfile.write (body)
+    # end def do_GET
+
+    def log_message (self, * args) :
+        pass
+    # end def log_message
+
+# end class Replay_Handler
+
+class Replay_Server (ThreadingMixIn, HTTPServer) :
+    """ Local stand-in for the nodes of a mesh: listens on the given
+        addresses of the loopback network (e.g. 127.1.0.1, see
+        simulated_ips), one socket per address, and answers requests
+        with the pages of a recorded node. The node for an address is
+        chosen by the address, so each address always gets the same node.
+        Each request is delayed by latency plus a random part of up to
+        jitter seconds, the given fraction of requests fails (the
+        connection is closed without answer). Requests to addresses in
+        dead never get an answer.
+    """
+
+    allow_reuse_address = True
+    daemon_threads      = True
+    hang                = 3600
+
+    def __init__ \
+        ( self
+        , nodes
+        , ips
+        , port     = 0
+        , latency  = 0
+        , jitter   = 0
+        , failures = 0
+        , dead     = ()
+        ) :
+        HTTPServer.__init__ (self, (ips [0], port), Replay_Handler)
+        self.sockets  = {self.socket.fileno () : self.socket}
+        for ip in ips [1:] :
+            s = socket.socket (self.address_family, self.socket_type)
+            s.setsockopt (socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind ((ip, self.port))
+            s.listen (self.request_queue_size)
+            self.sockets [s.fileno ()] = s
+        self.nodes    = nodes
+        self.latency  = latency
+        self.jitter   = jitter
+        self.failures = failures
+        self.dead     = set (dead)
+    # end def __init__
+
+    @property
+    def port (self) :
+        return self.server_address [1]
+    # end def port
+
+    def node (self, ip) :
+        n, = struct.unpack ('!L', socket.inet_aton (ip))
+        return self.nodes [n % len (self.nodes)]
+    # end def node
+
+    def serve_forever (self) :
+        """ Accept connections on the sockets of all addresses, we use
+            poll as there may be more sockets than select can handle.
+        """
+        poll = select.poll ()
+        for fd in self.sockets :
+            poll.register (fd, select.POLLIN)
+        while True :
+            for fd, event in poll.poll () :
+                try :
+                    request, client = self.sockets [fd].accept ()
+                except socket.error :
+                    continue
+                self.process_request (request, client)
+    # end def serve_forever
+
+    def server_close (self) :
+        for s in self.sockets.itervalues () :
+            s.close ()
+    # end def server_close
+
+# end class Replay_Server
+
+def simulated_ips (n, base = '127.1.0.1') :
+    """ n loopback addresses starting with base """
+    b, = struct.unpack ('!L', socket.inet_aton (base))
+    return [socket.inet_ntoa (struct.pack ('!L', b + i)) for i in xrange (n)]
+# end def simulated_ips
+
+def write_topology (f, ips) :
+    """ Write OLSR topology of a star around the first of ips """
+    f.write ("Table: Topology\n")
+    f.write ("Dest. IP\tLast hop IP\tLQ\tNLQ\tCost\n")
+    for ip in ips [1:] :
+        for a, b in (ip, ips [0]), (ips [0], ip) :
+            f.write ("%s\t%s\t1.000\t1.000\t1.000\n" % (a, b))
+    f.write ("\n")
+# end def write_topology
+
+class Benchmark (autosuper) :
+    """ Spider a simulated mesh of n nodes served by a Replay_Server
+        (running in its own process) and measure throughput, CPU time
+        and memory of the spider. Further keyword arguments are passed
+        to the Spider.
+    """
+
+    def __init__ \
+        ( self
+        , nodes
+        , n        = 100
+        , latency  = 0
+        , jitter   = 0
+        , failures = 0
+        , dead     = 0
+        , seed     = 23
+        , ** kw
+        ) :
+        self.ips    = simulated_ips (n)
+        rnd         = random.Random (seed)
+        self.dead   = rnd.sample (self.ips, int (dead * n))
+        self.server = Replay_Server \
+            (nodes, self.ips, 0, latency, jitter, failures, self.dead)
+        self.kw     = kw
+    # end def __init__
+
+    def run (self) :
+        from spider.spiderpool import Spider
+        fd, topo = tempfile.mkstemp (suffix = '.txt')
+        f = os.fdopen (fd, 'w')
+        write_topology (f, self.ips)
+        f.close ()
+        server = Process (target = self.server.serve_forever)
+        server.start ()
+        self.server.server_close ()
+        ip_port = dict ((ip, self.server.port) for ip in self.ips)
+        try :
+            start   = time ()
+            sp      = Spider (topo, ip_port = ip_port, ** self.kw)
+            self.stats = []
+            sp.process (lambda ip, r, stats : self.stats.append (stats))
+            sp.close ()
+            self.elapsed = time () - start
+            self.usage   = \
+                [ resource.getrusage (who)
+                  for who in resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN
+                ]
+            self.results = sp.result_dict
+        finally :
+            server.terminate ()
+            server.join ()
+            os.unlink (topo)
+        return self
+    # end def run
+
+    def report (self) :
+        counts = {}
+        for r in self.results.itervalues () :
+            k = r.type if isinstance (r, Guess) else r [0]
+            counts [k] = counts.get (k, 0) + 1
+        cpu    = sum (u.ru_utime + u.ru_stime for u in self.usage)
+        stats  = [s for s in self.stats if s]
+        r = \
+            [ "Nodes:     %d (%d dead)" % (len (self.ips), len (self.dead))
+            , "Time:      %.2f s" % self.elapsed
+            , "Nodes/s:   %.1f" % (len (self.results) / self.elapsed)
+            , "CPU:       %.2f s" % cpu
+            , "Max. RSS:  %d kB" % max (u.ru_maxrss for u in self.usage)
+            , "Requests:  %d" % sum (s.get ('requests', 0) for s in stats)
+            , "Bytes:     %d" % sum (s.get ('bytes', 0) for s in stats)
+            , "Retries:   %d" % sum (s.get ('retries', 0) for s in stats)
+            ]
+        for k in sorted (counts) :
+            r.append ("%-10s %d" % (k + ':', counts [k]))
+        return '\n'.join (r)
+    # end def report
+
+# end class Benchmark
+
+def main () :
+    import sys
+    from optparse import OptionParser
+
+    cmd = OptionParser \
+        (usage = "%prog [options] corpus [ip[:port] ...]\n"
+                 "Record pages of the given nodes into the corpus "
+                 "directory or\nbenchmark the spider with a simulated "
+                 "mesh of recorded nodes"
+        )
+    cmd.add_option \
+        ( "-b", "--host-rate"
+        , dest    = "host_rate"
+        , help    = "Requests per second to a host, default: %default "
+                    "(no limit)"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-d", "--dead"
+        , dest    = "dead"
+        , help    = "Fraction of nodes that never answer, "
+                    "default: %default"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-D", "--page-delay"
+        , dest    = "page_delay"
+        , help    = "Delay in seconds before each backend page (the "
+                    "spider waits one second)"
+        , type    = "float"
+        )
+    cmd.add_option \
+        ( "-f", "--failures"
+        , dest    = "failures"
+        , help    = "Fraction of requests that fail, default: %default"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-j", "--jitter"
+        , dest    = "jitter"
+        , help    = "Random additional latency up to the given seconds, "
+                    "default: %default"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-k", "--connect-timeout"
+        , dest    = "connect_timeout"
+        , help    = "Timeout in seconds for connecting to a node, "
+                    "default: the request timeout"
+        , type    = "float"
+        )
+    cmd.add_option \
+        ( "-l", "--latency"
+        , dest    = "latency"
+        , help    = "Latency of each request in seconds, default: %default"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-n", "--nodes"
+        , dest    = "nodes"
+        , help    = "Number of simulated nodes, default: %default"
+        , type    = "int"
+        , default = 100
+        )
+    cmd.add_option \
+        ( "-p", "--processes"
+        , dest    = "processes"
+        , help    = "Use given number of processes, default: %default"
+        , type    = "int"
+        , default = 20
+        )
+    cmd.add_option \
+        ( "-r", "--request-timeout"
+        , dest    = "rq_timeout"
+        , help    = "Timeout in seconds for a single page request, "
+                    "default: %default"
+        , type    = "int"
+        , default = 10
+        )
+    cmd.add_option \
+        ( "-t", "--timeout"
+        , dest    = "timeout"
+        , help    = "Timeout in seconds for all requests to a node, "
+                    "default: %default"
+        , type    = "int"
+        , default = 180
+        )
+    cmd.add_option \
+        ( "-T", "--threads"
+        , dest    = "threads"
+        , help    = "Use given number of threads instead of processes, "
+                    "default: %default (use processes)"
+        , type    = "int"
+        , default = 0
+        )
+    (opt, args) = cmd.parse_args ()
+    if not args :
+        cmd.print_help ()
+        sys.exit (23)
+    corpus = args [0]
+    if len (args) > 1 :
+        if not os.path.isdir (corpus) :
+            os.makedirs (corpus)
+        for ip in args [1:] :
+            port = 0
+            if ':' in ip :
+                ip, port = ip.split (':', 1)
+            print "%-15s: %s" % (ip, record (corpus, ip, port))
+        return
+    nodes = read_corpus (corpus)
+    if not nodes :
+        print >> sys.stderr, "No recorded nodes in %s" % corpus
+        sys.exit (23)
+    if opt.page_delay is not None :
+        Page.delay = opt.page_delay
+    b = Benchmark \
+        ( nodes
+        , opt.nodes
+        , latency    = opt.latency
+        , jitter     = opt.jitter
+        , failures   = opt.failures
+        , dead       = opt.dead
+        , processes  = opt.processes
+        , threads    = opt.threads
+        , timeout    = opt.timeout
+        , rq_timeout = opt.rq_timeout
+        , host_rate  = opt.host_rate
+        , connect_timeout = opt.connect_timeout
+        )
+    print b.run ().report ()
+# end def main
+
+if __name__ == '__main__' :
+    import spider.replay
+    spider.replay.main ()
@@ -17,11 +17,14 @@
 # along with this module. If not, see <http://www.gnu.org/licenses/>.
 # #*** </License> ***********************************************************#
 
-from   rsclib.HTML_Parse  import tag, Page_Tree
+from   rsclib.HTML_Parse  import tag
 from   rsclib.autosuper   import autosuper
-from   spider.common      import Interface, Inet4, unroutable
+from   itertools          import izip
+from   spider.common      import Interface, Inet4
+from   spider.common      import unroutable, unroutable_flags
+from   spider.session     import Page
 
-class Routes (Page_Tree) :
+class Routes (Page) :
     retries      = 2
     timeout      = 10
     url          = '/cgi-bin/index.cgi?post_routes=1'
@@ -59,7 +62,7 @@ class Routes (Page_Tree) :
 
 # end class Routes
 
-class Details (Page_Tree) :
+class Details (Page) :
     retries      = 2
     timeout      = 10
     url          = '/cgi-bin/index.cgi?post_olsr=1'
@@ -109,27 +112,43 @@ class Details (Page_Tree) :
 
 class Router_OS (autosuper) :
 
-    url = '/cgi-bin/index.cgi?post_routes=1'
+    url          = '/cgi-bin/index.cgi?post_routes=1'
+    wired_metric = [1.0, 1.0, 1.0]
 
-    def __init__ (self, site, request, url = url) :
+    def __init__ \
+        (self, site, request, url = url, timeout = None, session = None) :
         self.site    = site
         self.request = request
+        self.timeout = timeout
         rtparm = 1
         if url.endswith ('cgi') :
             rtparm = 2
         if 'interfaces' in self.request or 'ips' in self.request :
-            rt = Routes  (site = site, url = url + '?post_routes=%s' % rtparm)
-            dt = Details (site = site, url = url + '?post_olsr=1')
+            rt = Routes \
+                ( site    = site
+                , url     = url + '?post_routes=%s' % rtparm
+                , timeout = timeout
+                , session = session
+                )
+            dt = Details \
+                ( site    = site
+                , url     = url + '?post_olsr=1'
+                , timeout = timeout
+                , session = session
+                )
             self.version = rt.version
             interfaces   = {}
             ips          = {}
             base         = 0
-            for count, (ip, ifname) in enumerate (rt.ip_dev.iteritems ()) :
-                i4 = Inet4 (ip, None, None, iface = ifname)
-                # ignore interfaces with unroutable IPs
-                if unroutable (i4.ip) :
-                    #print "Unroutable: %s" % i4
+            # Check all IPs of a table at once, we ignore interfaces
+            # with unroutable IPs
+            rt_items     = rt.ip_dev.items ()
+            rt_flags     = unroutable_flags (ip for ip, d in rt_items)
+            for count, ((ip, ifname), skip) in enumerate \
+                (izip (rt_items, rt_flags)) :
+                if skip :
                     continue
+                i4 = Inet4 (ip, None, None, iface = ifname)
                 ips [i4] = 1
                 iface = Interface (count, ifname, None)
                 iface.is_wlan = False
@@ -137,12 +156,15 @@ class Router_OS (autosuper) :
                 iface.append_inet4 (i4)
                 base = count
             base += 1
-            for count, (ip, ifname) in enumerate (dt.ip_dev.iteritems ()) :
-                i4 = Inet4 (ip, None, None, iface = ifname)
-                is_wlan = sum (x == 1.0 for x in dt.metric [ip]) != 3
-                #print "ip", ip, dt.metric [ip]
-                if unroutable (i4.ip) :
+            dt_items     = dt.ip_dev.items ()
+            dt_flags     = unroutable_flags (ip for ip, d in dt_items)
+            for count, ((ip, ifname), skip) in enumerate \
+                (izip (dt_items, dt_flags)) :
+                if skip :
                     continue
+                i4 = Inet4 (ip, None, None, iface = ifname)
+                # Links with LQ, NLQ and Cost of 1.0 are wired
+                is_wlan = dt.metric [ip] != self.wired_metric
                 if i4 in ips :
                     if ifname not in interfaces :
                         iface = Interface (base + count, ifname, None)
@@ -162,10 +184,11 @@ class Router_OS (autosuper) :
                 interfaces [ifname] = iface
                 iface.append_inet4 (i4)
 
-            # check own ip
+            # check own ip, unroutable IPs are skipped above (e.g., a
+            # node replayed on a loopback address, see spider.replay)
             n  = 'unknown'
             i4 = Inet4 (self.request ['ip'], None, None, iface = n)
-            assert i4 in ips
+            assert i4 in ips or unroutable (i4.ip)
 
             self.request ['ips']        = ips
             self.request ['interfaces'] = interfaces
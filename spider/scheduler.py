@@ -0,0 +1,131 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   datetime           import datetime, timedelta
+from   rsclib.autosuper   import autosuper
+from   spider.parser      import merge_result
+
+class Node_History (autosuper) :
+    """ Summary of the spider history of one IP, computed incrementally
+        from the records of a result store (oldest first).
+    """
+
+    # Errors indicating that nobody answered at that IP
+    dead_errors = ('Timeout_Error', 'Retries_Exceeded')
+
+    def __init__ (self, ip) :
+        self.ip       = ip
+        self.failures = 0    # consecutive failures of the last records
+        self.stable   = 0    # consecutive unchanged successful results
+        self.last     = None # time of last record
+        self.guess    = None # last successful result
+    # end def __init__
+
+    def add (self, time, result) :
+        self.last = time
+        if isinstance (result, tuple) :
+            if result [0] in self.dead_errors :
+                self.failures += 1
+            else :
+                self.failures  = 0
+                self.stable    = 0
+        else :
+            if self.guess is not None and result == self.guess :
+                self.stable += 1
+            else :
+                self.stable  = 0
+            self.failures = 0
+            self.guess    = result
+    # end def add
+
+# end class Node_History
+
+class Scheduler (autosuper) :
+    """ Decide which IPs to spider in which order with which timeout
+        using the history of previous results from a result store.
+
+        - IPs never seen before are spidered first with the full
+          timeout.
+        - IPs with a successful (or unparseable) last result are due
+          after interval, the interval doubles for each run in which
+          the result didn't change (up to max_interval).
+        - IPs that didn't answer are retried with exponential backoff
+          starting at retry (up to max_interval) and only get the short
+          probe_timeout, they are spidered last.
+    """
+
+    def __init__ \
+        ( self
+        , store
+        , timeout       = 180
+        , probe_timeout = 30
+        , interval      = timedelta (hours = 6)
+        , retry         = timedelta (hours = 1)
+        , max_interval  = timedelta (days  = 7)
+        ) :
+        self.timeout       = timeout
+        self.probe_timeout = probe_timeout
+        self.interval      = interval
+        self.retry         = retry
+        self.max_interval  = max_interval
+        self.by_ip         = {}
+        self.results       = {}
+        for ip, time, result in store :
+            if ip not in self.by_ip :
+                self.by_ip [ip] = Node_History (ip)
+            self.by_ip [ip].add (time, result)
+            merge_result (self.results, ip, result)
+    # end def __init__
+
+    def next_due (self, h) :
+        if h.failures :
+            n, interval = h.failures - 1, self.retry
+        else :
+            n, interval = h.stable, self.interval
+        # avoid overflow of timedelta for long histories
+        for i in xrange (n) :
+            if interval >= self.max_interval :
+                break
+            interval *= 2
+        return h.last + min (interval, self.max_interval)
+    # end def next_due
+
+    def schedule (self, ips, now = None) :
+        """ Return list of (ip, timeout) of the given IPs that are due,
+            in the order in which they should be spidered.
+        """
+        now = now or datetime.utcnow ()
+        due = []
+        for ip in ips :
+            ip = str (ip)
+            h  = self.by_ip.get (ip)
+            if h is None :
+                due.append (((0, 0), ip, self.timeout))
+                continue
+            nd = self.next_due (h)
+            if nd > now :
+                continue
+            if h.failures :
+                due.append (((2, h.failures), ip, self.probe_timeout))
+            else :
+                # most overdue first
+                due.append (((1, nd), ip, self.timeout))
+        due.sort ()
+        return [(ip, timeout) for k, ip, timeout in due]
+    # end def schedule
+
+# end class Scheduler
@@ -0,0 +1,448 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import cookielib
+import httplib
+import socket
+import urllib2
+
+from   base64                          import b64encode
+from   time                            import sleep, time
+from   gzip                            import GzipFile
+from   StringIO                        import StringIO
+from   urlparse                        import urlparse, urljoin
+from   HTMLParser                      import HTMLParseError
+from   xml.etree.ElementTree           import ElementTree
+from   elementtidy.TidyHTMLTreeBuilder import TidyHTMLTreeBuilder
+from   rsclib.autosuper                import autosuper
+from   rsclib.ETree                    import ETree
+from   rsclib.HTML_Parse               import Page_Tree, Retry
+from   rsclib.HTML_Parse               import Retries_Exceeded
+from   rsclib.HTML_Parse               import default_translate
+from   rsclib.timeout                  import Timeout_Error
+from   rsclib.Version                  import VERSION
+
+def request_path (r) :
+    """ Path (with query) to request for parsed url r """
+    path = r.path or '/'
+    if r.query :
+        path = '?'.join ((path, r.query))
+    return path
+# end def request_path
+
+class Deadline (autosuper) :
+    """ Deadlines for spidering a node without relying on signals, so
+        that many nodes can be spidered in one process (e.g. in
+        threads). All requests to the node together must finish within
+        total seconds from now. Each connect is limited to connect
+        seconds and each read from the socket (e.g. of a block of the
+        body) to read seconds, if these are None the timeout of the
+        request is used. No socket operation may exceed the total
+        deadline, when it has passed Timeout_Error is raised.
+    """
+
+    def __init__ (self, total = None, connect = None, read = None) :
+        self.end     = None
+        self.total   = total
+        self.connect = connect
+        self.read    = read
+        if total is not None :
+            self.end = time () + total
+    # end def __init__
+
+    def check (self) :
+        """ Raise Timeout_Error if the total deadline has passed """
+        if self.remaining () == 0 :
+            raise Timeout_Error \
+                ("Deadline of %s seconds exceeded" % self.total)
+    # end def check
+
+    def remaining (self) :
+        """ Seconds until the total deadline, None if there is none """
+        if self.end is None :
+            return None
+        return max (self.end - time (), 0)
+    # end def remaining
+
+    def timeout (self, kind, timeout = None) :
+        """ Socket timeout for the next operation of the given kind
+            ('connect' or 'read'), timeout is the default if no timeout
+            for kind is given. The result never exceeds the time
+            remaining until the total deadline.
+        """
+        self.check ()
+        t = getattr (self, kind)
+        if t is None :
+            t = timeout
+        r = self.remaining ()
+        if t is None or r is not None and r < t :
+            return r
+        return t
+    # end def timeout
+
+# end class Deadline
+
+class Deadline_Socket (autosuper) :
+    """ Wrap a connected socket: before each send or receive the
+        socket timeout is set from the deadline, timeout is the default
+        for reads (see Deadline.timeout).
+    """
+
+    def __init__ (self, sock, deadline, timeout = None) :
+        self.sock     = sock
+        self.deadline = deadline
+        self.timeout  = timeout
+    # end def __init__
+
+    def close (self) :
+        # Like socket.close: only drop our reference, the socket stays
+        # open for a file object made from it (httplib closes the
+        # connection but not the response for "Connection: close")
+        self.sock = None
+    # end def close
+
+    def makefile (self, mode = 'r', bufsize = -1) :
+        # The file object receives via recv of its own wrapper
+        return socket._fileobject \
+            (Deadline_Socket (self.sock, self.deadline, self.timeout)
+            , mode, bufsize
+            )
+    # end def makefile
+
+    def recv (self, * args) :
+        self.sock.settimeout (self.deadline.timeout ('read', self.timeout))
+        return self.sock.recv (* args)
+    # end def recv
+
+    def sendall (self, * args) :
+        self.sock.settimeout (self.deadline.timeout ('read', self.timeout))
+        return self.sock.sendall (* args)
+    # end def sendall
+
+    def __getattr__ (self, name) :
+        return getattr (self.sock, name)
+    # end def __getattr__
+
+# end class Deadline_Socket
+
+class Response_Info (autosuper) :
+    """ Make the headers of a httplib response available like those of
+        an urllib2 response (as needed by cookielib).
+    """
+
+    def __init__ (self, msg) :
+        self.msg = msg
+    # end def __init__
+
+    def info (self) :
+        return self.msg
+    # end def info
+
+# end class Response_Info
+
+class Session (autosuper) :
+    """ HTTP session for all pages fetched from one node.
+        We keep one persistent HTTP/1.1 connection and reuse it for all
+        requests to the same host, this avoids a TCP handshake per page
+        over slow multi-hop links. Optionally we ask for gzip transfer
+        encoding. Non-http URLs (e.g. file:// for testing) are fetched
+        with urllib2.
+        To go easy on weak devices, requests are at least min_interval
+        seconds apart.
+        Connects and reads are limited by the deadline (see Deadline),
+        each receive from the socket gets a fresh timeout so that a node
+        sending very slowly is cut off at the deadline.
+        Requests are sent with the same headers as those of rsclib's
+        Page_Tree (including its User-Agent), cookies set by the node
+        are kept in cookies (a cookielib CookieJar) and if username and
+        password are given, basic authentication is used when the node
+        asks for it.
+        Counters and timings (in seconds) of all requests are summed up
+        in stats: requests, bytes (as transferred), connects, connect
+        (time to connect), fetch (time of request and response without
+        connect) and, counted by the pages, retries and parse times.
+    """
+
+    accept_gzip   = True
+    max_redirects = 5
+    min_interval  = 0
+    redirects     = (301, 302, 303, 307)
+    user_agent    = 'rsclib/HTML_Parse %s' % VERSION
+
+    def __init__ \
+        ( self
+        , timeout      = None
+        , accept_gzip  = None
+        , min_interval = None
+        , stats        = None
+        , deadline     = None
+        , cookies      = None
+        , username     = None
+        , password     = None
+        ) :
+        self.timeout  = timeout
+        self.conn     = None
+        self.netloc   = None
+        self.last     = None
+        self.stats    = stats if stats is not None else {}
+        self.deadline = deadline or Deadline ()
+        self.cookies  = cookies
+        self.username = username
+        self.password = password
+        self.auth     = None
+        if cookies is None :
+            self.cookies = cookielib.LWPCookieJar ()
+        if accept_gzip is not None :
+            self.accept_gzip = accept_gzip
+        if min_interval is not None :
+            self.min_interval = min_interval
+    # end def __init__
+
+    def close (self) :
+        if self.conn is not None :
+            self.conn.close ()
+        self.conn   = None
+        self.netloc = None
+    # end def close
+
+    def count (self, key, value = 1) :
+        self.stats [key] = self.stats.get (key, 0) + value
+    # end def count
+
+    def connection (self, scheme, netloc) :
+        """ Return connection and a flag if it is freshly opened """
+        if self.conn is not None and self.netloc == (scheme, netloc) :
+            return self.conn, False
+        self.close ()
+        cls = httplib.HTTPConnection
+        if scheme == 'https' :
+            cls = httplib.HTTPSConnection
+        self.conn   = cls (netloc)
+        self.netloc = (scheme, netloc)
+        return self.conn, True
+    # end def connection
+
+    def fetch (self, url, timeout = None) :
+        """ Return final url (after redirects), headers and body """
+        if timeout is None :
+            timeout = self.timeout
+        if not url.startswith ('http://') and not url.startswith ('https://') :
+            f    = urllib2.urlopen \
+                (url, timeout = self.deadline.timeout ('read', timeout))
+            body = f.read ()
+            self.count ('requests')
+            self.count ('bytes', len (body))
+            return f.geturl (), f.info (), body
+        for n in xrange (self.max_redirects + 1) :
+            status, reason, headers, body = self.request (url, timeout)
+            location = headers.getheader ('location')
+            if status in self.redirects and location :
+                url = urljoin (url, location)
+                continue
+            challenge = headers.getheader ('www-authenticate') or ''
+            if  (   status == 401 and self.username and self.auth is None
+                and challenge.lower ().startswith ('basic')
+                ) :
+                self.auth = 'Basic ' + b64encode \
+                    ('%s:%s' % (self.username, self.password))
+                continue
+            if status >= 400 :
+                raise urllib2.HTTPError (url, status, reason, headers, None)
+            return url, headers, body
+        raise urllib2.URLError ("Too many redirects: %s" % url)
+    # end def fetch
+
+    def headers (self, rq) :
+        """ Headers for urllib2.Request rq """
+        h = dict (Page_Tree.headers)
+        h.setdefault ('User-Agent', self.user_agent)
+        if self.accept_gzip :
+            h ['Accept-Encoding'] = 'gzip'
+        if self.auth :
+            h ['Authorization'] = self.auth
+        self.cookies.add_cookie_header (rq)
+        h.update (rq.unredirected_hdrs)
+        return h
+    # end def headers
+
+    def request (self, url, timeout) :
+        r    = urlparse (url)
+        path = request_path (r)
+        rq   = urllib2.Request (url)
+        self.wait ()
+        while True :
+            conn, fresh = self.connection (r.scheme, r.netloc)
+            start       = time ()
+            connect     = 0
+            try :
+                if conn.sock is None :
+                    self.count ('connects')
+                    conn.timeout = self.deadline.timeout ('connect', timeout)
+                    try :
+                        conn.connect ()
+                    finally :
+                        connect = time () - start
+                    conn.sock = Deadline_Socket (conn.sock, self.deadline)
+                conn.sock.timeout = timeout
+                conn.request ('GET', path, headers = self.headers (rq))
+                resp = conn.getresponse ()
+                body = resp.read ()
+            except (httplib.HTTPException, socket.error) :
+                self.close ()
+                self.deadline.check ()
+                # The node may have closed a kept-alive connection
+                if fresh :
+                    raise
+                continue
+            finally :
+                self.count ('connect', connect)
+                self.count ('fetch',   time () - start - connect)
+            break
+        self.count ('requests')
+        self.count ('bytes', len (body))
+        self.cookies.extract_cookies (Response_Info (resp.msg), rq)
+        if resp.will_close :
+            self.close ()
+        if resp.getheader ('content-encoding') == 'gzip' :
+            body = GzipFile (fileobj = StringIO (body)).read ()
+        return resp.status, resp.reason, resp.msg, body
+    # end def request
+
+    def sleep (self, seconds) :
+        """ Sleep the given seconds but not beyond the deadline """
+        r = self.deadline.remaining ()
+        if r is not None and r < seconds :
+            seconds = r
+        sleep (seconds)
+    # end def sleep
+
+    def wait (self) :
+        """ Sleep until min_interval has passed since the last request """
+        if self.min_interval and self.last is not None :
+            delay = self.last + self.min_interval - time ()
+            if delay > 0 :
+                self.sleep (delay)
+        self.last = time ()
+    # end def wait
+
+# end class Session
+
+class Page (Page_Tree) :
+    """ Page_Tree fetching its page via a Session, the Session sets up
+        the request like Page_Tree (headers, cookies, authentication).
+        Pages of one node should share a Session (passed as session),
+        if none is given the page uses its own. A timeout of None keeps
+        the timeout defined by the class.
+        A page that defines an extractor (see spider.extract) is not
+        parsed into a tree: the extractor pulls the parts needed by
+        parse out of the page text in a single pass and is available
+        as extract. If the extractor can't parse the page (tidy
+        tolerates more broken markup) or use_tree is set, the same parts
+        are extracted from the tree.
+        Retries and the time for parsing the page are counted in the
+        stats of the session, the parse time under the name of the
+        phase of spidering the page belongs to.
+    """
+
+    timeout   = None
+    extractor = None
+    use_tree  = False
+    phase     = 'backend'
+    failures  = (urllib2.URLError, httplib.HTTPException, socket.error)
+
+    def __init__ \
+        ( self
+        , site         = None
+        , url          = None
+        , session      = None
+        , timeout      = None
+        , charset      = 'latin1'
+        , html_charset = None
+        ) :
+        if site :
+            self.site = site
+        if url :
+            self.url  = url
+        if self.url is not None :
+            self.url = '/'.join ((self.site, self.url))
+        else :
+            self.url = self.site
+        self.charset = charset
+        self.verbose = 0
+        self.retry   = 0
+        if timeout is not None :
+            self.timeout = timeout
+        if html_charset :
+            self.html_charset = html_charset
+        self.session = session or Session ()
+        if self.delay >= 1 :
+            self.session.sleep (self.delay)
+        try :
+            self.fetch ()
+        finally :
+            if session is None :
+                self.session.close ()
+    # end def __init__
+
+    def fetch (self) :
+        while self.retry < self.retries :
+            try :
+                self.pageurl, self.pageinfo, text = self.session.fetch \
+                    (self.url, self.timeout)
+            except self.failures :
+                self.session.deadline.check ()
+                self.retry += 1
+                self.session.count ('retries')
+                continue
+            start = time ()
+            try :
+                if self.extractor is None :
+                    self.tree    = self.build_tree (text)
+                else :
+                    self.extract = self.run_extractor (text)
+                self.parse ()
+            except Retry :
+                self.retry += 1
+                self.session.count ('retries')
+                continue
+            finally :
+                self.session.count (self.phase, time () - start)
+            break
+        if self.retry >= self.retries :
+            raise Retries_Exceeded, (self.retries, self.url)
+    # end def fetch
+
+    def run_extractor (self, text) :
+        if not self.use_tree :
+            try :
+                return self.extractor ().run \
+                    ( default_translate (text).decode
+                        (self.html_charset, 'replace')
+                    )
+            except HTMLParseError :
+                pass
+        self.tree = self.build_tree (text)
+        return self.extractor ().run_tree (self.tree.getroot ())
+    # end def run_extractor
+
+    def build_tree (self, text) :
+        builder = TidyHTMLTreeBuilder (encoding = self.html_charset)
+        builder.feed (default_translate (text))
+        return ETree (ElementTree (builder.close ()), charset = self.charset)
+    # end def build_tree
+
+# end class Page
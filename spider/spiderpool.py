@@ -17,107 +17,142 @@
 
 import os
 
-from multiprocessing   import Pool, Manager
+from multiprocessing   import Pool
+from multiprocessing.pool import ThreadPool
 from rsclib.autosuper  import autosuper
 from rsclib.execute    import Log
-from rsclib.timeout    import Timeout, Timeout_Error
+from rsclib.timeout    import Timeout_Error
 from rsclib.HTML_Parse import Retries_Exceeded
 from rsclib.IP_Address import IP4_Address
 from olsr.parser       import get_olsr_container
 from spider.parser     import Guess, site_template
-from itertools         import islice
+from spider.session    import Deadline
+from spider.store      import Result_Store
+from spider.scheduler  import Scheduler
+from spider.probe      import Probe
+from spider.cache      import Backend_Cache
+from datetime          import timedelta
+from time              import time
 from logging           import INFO
 from gzip              import GzipFile
 
 def get_node_info \
-    (result_dict, ip, timeout = 180, ip_port = {}, debug = False) :
+    ( ip
+    , timeout         = 180
+    , ip_port         = {}
+    , debug           = False
+    , rq_timeout      = None
+    , connect_timeout = None
+    , fingerprint     = None
+    , min_interval    = None
+    , submitted       = None
+    ) :
+    """ Return ip, result and a dict of counters and timings (see
+        Session), queue is the time between submitted and the start
+        of the worker, total the time the worker needed.
+    """
+    start = time ()
+    stats = {}
+    if submitted is not None :
+        stats ['queue'] = start - submitted
     w = Worker \
-        (result_dict, ip, timeout = timeout, ip_port = ip_port, debug = debug)
+        ( ip
+        , timeout         = timeout
+        , ip_port         = ip_port
+        , debug           = debug
+        , rq_timeout      = rq_timeout
+        , connect_timeout = connect_timeout
+        , fingerprint     = fingerprint
+        , min_interval    = min_interval
+        , stats           = stats
+        )
     try :
-        return w.get_node_info ()
+        result = w.get_node_info ()
     except Exception, err :
-        self.log.error ("Error in IP %s:" % ip)
-        w.log.log_exception ()
+        w.log.error ("Error in IP %s:" % ip)
+        w.log_exception ()
+        result = ("ERROR", err)
+    stats ['total'] = time () - start
+    return ip, result, stats
 # end def get_node_info
 
-class Worker (Log, Timeout) :
+def _get_node_info (args) :
+    """ Pool.imap_unordered passes a single argument """
+    return get_node_info (* args)
+# end def _get_node_info
+
+class Worker (Log) :
+    """ Spider a single IP.
+        The timeout for the IP is not enforced with an alarm signal
+        (which would allow only one node per process) but by a Deadline
+        passed down to every request: no connect or read of a page
+        may last beyond the timeout. So workers can run in processes
+        or threads alike.
+    """
 
     def __init__ \
         ( self
-        , result_dict
         , ip
-        , timeout = 180
-        , ip_port = {}
-        , debug = False
+        , timeout         = 180
+        , ip_port         = {}
+        , debug           = False
+        , rq_timeout      = None
+        , connect_timeout = None
+        , fingerprint     = None
+        , min_interval    = None
+        , stats           = None
         , **kw
         ) :
         self.__super.__init__ (** kw)
-        self.ip          = ip
-        self.result_dict = result_dict
-        self.timeout     = timeout
-        self.ip_port     = ip_port
+        self.ip           = ip
+        self.timeout      = timeout
+        self.ip_port      = ip_port
+        self.rq_timeout   = rq_timeout
+        self.fingerprint  = fingerprint
+        self.min_interval = min_interval
+        self.stats        = stats
+        self.deadline     = Deadline (timeout, connect = connect_timeout)
         if not debug :
             self.log.setLevel (INFO)
         self.log.debug ("Started for IP: %s" % self.ip)
     # end def __init__
 
     def get_node_info (self) :
+        """ Return the Guess for our IP or an error tuple """
         try :
-            if self.ip in self.result_dict :
-                return
-            self.arm_alarm (timeout = self.timeout)
-            try :
-                url  = ''
-                site = site_template % self.__dict__
-                self.log.debug ("%s: before guess" % self.ip)
-                port = None
-                if self.ip in self.ip_port :
-                    port = self.ip_port [self.ip]
-                g    = Guess (site = site, ip = self.ip, url = '', port = port)
-                self.log.debug ("%s: after  guess" % self.ip)
-            except ValueError, err :
-                self.disable_alarm ()
-                self.log.error ("Error in IP %s:" % self.ip)
-                self.log_exception ()
-                self.result_dict [self.ip] = ('ValueError', err)
-                return
-            except Timeout_Error, err :
-                self.disable_alarm ()
-                self.log.debug ("Timeout")
-                self.result_dict [self.ip] = ('Timeout_Error', err)
-                return
-            except Retries_Exceeded, err :
-                self.disable_alarm ()
-                self.log.debug ("Retries exceeded")
-                self.result_dict [self.ip] = ('Retries_Exceeded', err)
-                return
-            except Exception, err :
-                self.disable_alarm ()
-                self.log.error ("Error in IP %s:" % self.ip)
-                self.log_exception ()
-                self.result_dict [self.ip] = ('Exception', err)
-                return
-            self.disable_alarm ()
-            result = []
-#            for iface_ip in g.ips.iterkeys () :
-#                iface = iface_ip.iface
-#                r = [iface.name]
-#                if iface.is_wlan :
-#                    r.extend \
-#                        (( True
-#                        ,  iface.wlan_info.ssid
-#                        ,  iface.wlan_info.mode
-#                        ,  iface.wlan_info.channel
-#                        ,  iface.wlan_info.bssid
-#                        ))
-#                else :
-#                    r.append (False)
-#                result.append (r)
-            self.result_dict [self.ip] = g
+            url  = ''
+            site = site_template % self.__dict__
+            self.log.debug ("%s: before guess" % self.ip)
+            port = None
+            if self.ip in self.ip_port :
+                port = self.ip_port [self.ip]
+            g    = Guess \
+                ( site         = site
+                , ip           = self.ip
+                , url          = ''
+                , port         = port
+                , timeout      = self.rq_timeout
+                , fingerprint  = self.fingerprint
+                , min_interval = self.min_interval
+                , stats        = self.stats
+                , deadline     = self.deadline
+                )
+            self.log.debug ("%s: after  guess" % self.ip)
+        except ValueError, err :
+            self.log.error ("Error in IP %s:" % self.ip)
+            self.log_exception ()
+            return ('ValueError', err)
+        except Timeout_Error, err :
+            self.log.debug ("Timeout")
+            return ('Timeout_Error', err)
+        except Retries_Exceeded, err :
+            self.log.debug ("Retries exceeded")
+            return ('Retries_Exceeded', err)
         except Exception, err :
             self.log.error ("Error in IP %s:" % self.ip)
             self.log_exception ()
-            self.result_dict [self.ip] = ("ERROR", err)
+            return ('Exception', err)
+        return g
     # end def get_node_info
 
 # end class Worker
@@ -126,53 +161,205 @@ class Spider (Log) :
 
     def __init__ \
         ( self
-        , olsr_file
-        , processes =    20
-        , N         =     0
-        , timeout   =   180
-        , ip_port   =    {}
-        , debug     = False
+        , olsr_file  =  None
+        , processes  =    20
+        , N          =     0
+        , timeout    =   180
+        , ip_port    =    {}
+        , debug      = False
+        , threads    =     0
+        , rq_timeout =  None
+        , skip       =    ()
+        , scheduler  =  None
+        , liveness   =     0
+        , cache      =  None
+        , host_rate  =     0
+        , connect_timeout = None
         , ** kw
         ) :
+        """ The olsr_file is a file or URL of OLSR information or an
+            already parsed OLSR container (see olsr.parser), if None the
+            nodes are given later with select.
+            If threads is non-zero, nodes are spidered by the given
+            number of threads in this process instead of a pool of
+            processes. This allows many more parallel requests.
+            The timeout (per IP) limits all requests to the IP, each
+            page request is limited by rq_timeout and each connect by
+            connect_timeout (if given, otherwise by rq_timeout).
+            IPs in skip are not spidered, e.g., because a recent result
+            exists. An optional scheduler decides which of the remaining
+            IPs are spidered in which order and with which timeout.
+            If liveness is non-zero, all IPs are first checked with a
+            TCP connect to their web port, IPs that don't answer within
+            liveness seconds get a Timeout_Error without spidering.
+            An optional backend cache provides the backend detected in
+            an earlier run and is updated with the new results.
+            IPs that are aliases of the same host (according to the
+            OLSR MID table) are spidered only once, the result is
+            reported for all aliases (but cached only for the IP
+            spidered, the fingerprint contains its site). If host_rate is non-zero, at most
+            host_rate requests per second are sent to a host.
+        """
         self.__super.__init__ (**kw)
-        olsr = get_olsr_container (olsr_file)
+        if not debug :
+            self.log.setLevel (INFO)
+        if threads :
+            self.pool    = ThreadPool (processes = threads)
+        else :
+            self.pool    = Pool (processes = processes)
+        self.timeout     = timeout
+        self.rq_timeout  = rq_timeout
+        self.connect_timeout = connect_timeout
+        self.ip_port     = ip_port
+        self.debug       = debug
+        self.liveness    = liveness
+        self.cache       = cache
+        self.min_interval = None
+        if host_rate :
+            self.min_interval = 1.0 / host_rate
+        self.nodes       = []
+        self.aliases     = {}
+        self.skipped     = []
+        self.result_dict = {}
+        if olsr_file is not None :
+            self.select (olsr_file, skip, scheduler, N)
+        self.log.debug ("Starting ...")
+    # end def __init__
+
+    def close (self) :
+        """ Stop the worker pool, the spider can't be used afterwards """
+        self.pool.close ()
+        self.pool.join  ()
+    # end def close
+
+    def select (self, olsr_file, skip = (), scheduler = None, N = 0) :
+        """ Select the nodes of olsr_file (file, URL or parsed OLSR
+            container) for the next run, skip, scheduler and N are as
+            for __init__. The results of the previous run are
+            discarded. This allows reusing the spider (and its pool of
+            workers) for several runs.
+        """
+        olsr = olsr_file
+        if isinstance (olsr_file, basestring) :
+            olsr = get_olsr_container (olsr_file)
         self.olsr_nodes = {}
         assert len (olsr.topo.forward)
         for t in olsr.topo.forward.iterkeys () :
             self.olsr_nodes [t] = True
         for t in olsr.topo.reverse.iterkeys () :
             self.olsr_nodes [t] = True
+        self.main_ip = {}
+        for t, aliases in olsr.mid.by_ip.iteritems () :
+            for a in aliases :
+                self.main_ip [str (a)] = str (t)
+        self.aliases = {}
+        self.skipped = []
+        for t in skip :
+            if self.olsr_nodes.pop (IP4_Address (t), None) :
+                self.skipped.append (t)
+        self.nodes = [(str (t), self.timeout) for t in self.olsr_nodes]
+        if scheduler :
+            self.nodes = scheduler.schedule (self.olsr_nodes)
+            due        = dict (self.nodes)
+            self.skipped.extend \
+                (str (t) for t in self.olsr_nodes if str (t) not in due)
+        self.nodes = self.collapse (self.nodes)
         # limit to N elements
         if N :
-            self.olsr_nodes = dict \
-                ((k, v) for k, v in islice (self.olsr_nodes.iteritems (), N))
-        self.pool        = Pool (processes = processes)
-        self.mgr         = Manager ()
-        self.result_dict = self.mgr.dict ()
-        self.timeout     = timeout
-        self.ip_port     = ip_port
-        self.debug       = debug
-        olsr_nodes       = None
-        if not debug :
-            self.log.setLevel (INFO)
-        self.log.debug ("Starting ...")
-    # end def __init__
+            self.nodes = self.nodes [:N]
+        self.result_dict = {}
+    # end def select
 
-    def process (self) :
-        for node in self.olsr_nodes :
-            self.pool.apply_async \
-                ( get_node_info
-                , ( self.result_dict
-                  , str (node)
-                  , self.timeout
-                  , self.ip_port
-                  , self.debug
-                  )
+    def collapse (self, nodes) :
+        """ Return nodes (ip, timeout) with only one IP per host (the
+            main IP if it is in nodes), in the order of the first IP of
+            each host. A host gets the longest timeout of its IPs. The
+            IPs of each host are in aliases.
+        """
+        hosts  = {}
+        order  = []
+        for ip, timeout in nodes :
+            main = self.main_ip.get (ip, ip)
+            if main not in hosts :
+                hosts [main] = ([], [])
+                order.append (main)
+            hosts [main][0].append (ip)
+            hosts [main][1].append (timeout)
+        result = []
+        for main in order :
+            ips, timeouts = hosts [main]
+            if main in ips :
+                ips.remove (main)
+                ips.insert (0, main)
+            self.aliases [ips [0]] = ips
+            result.append ((ips [0], max (timeouts)))
+        self.log.debug \
+            ("Spidering %s IPs as %s hosts" % (len (nodes), len (result)))
+        return result
+    # end def collapse
+
+    def results (self) :
+        """ Iterate over (ip, result, stats) tuples in the order in
+            which the workers finish. The result is a Guess or an error
+            tuple, stats are the counters and timings of the worker
+            (see get_node_info). The result of a host is reported for
+            all its aliases, the stats only for the IP spidered.
+        """
+        nodes = self.nodes
+        if self.liveness :
+            probe = Probe \
+                ( (ip for ip, timeout in nodes)
+                , self.ip_port
+                , timeout = self.liveness
+                ).run ()
+            self.log.debug \
+                ( "Probe: %s alive, %s refused, %s dead"
+                % (len (probe.alive), len (probe.refused), len (probe.dead))
                 )
-        self.pool.close ()
-        self.pool.join  ()
-        # broken dict proxy interface, make local dict with full interface
-        self.result_dict = dict (self.result_dict)
+            for ip, timeout in nodes :
+                if ip in probe.dead :
+                    err = Timeout_Error \
+                        ("No connect within %s seconds" % self.liveness)
+                    for alias in self.aliases [ip] :
+                        yield alias, ('Timeout_Error', err), None
+            nodes = [(ip, t) for ip, t in nodes if ip not in probe.dead]
+        args = \
+            ( ( ip
+              , timeout
+              , self.ip_port
+              , self.debug
+              , self.request_timeout (timeout)
+              , self.connect_timeout
+              , self.cache and self.cache.get (ip)
+              , self.min_interval
+              , time ()
+              )
+              for ip, timeout in nodes
+            )
+        results = self.pool.imap_unordered (_get_node_info, args)
+        for ip, result, stats in results :
+            if self.cache :
+                self.cache.update (ip, result)
+            for alias in self.aliases [ip] :
+                yield alias, result, (None, stats) [alias == ip]
+    # end def results
+
+    def request_timeout (self, timeout) :
+        """ The request timeout must not exceed the (per-IP) timeout """
+        if self.rq_timeout is None or timeout < self.rq_timeout :
+            return timeout
+        return self.rq_timeout
+    # end def request_timeout
+
+    def process (self, callback = None) :
+        """ Collect all results in result_dict, the optional callback is
+            called with ip, result and stats as soon as a node is
+            finished.
+        """
+        for ip, result, stats in self.results () :
+            self.result_dict [ip] = result
+            if callback :
+                callback (ip, result, stats)
     # end def process
 
 # end def Spider
@@ -183,6 +370,27 @@ if __name__ == '__main__' :
     from optparse import OptionParser
 
     cmd = OptionParser ()
+    cmd.add_option \
+        ( "-b", "--host-rate"
+        , dest    = "host_rate"
+        , help    = "Send at most the given number of requests per second "
+                    "to a host, default: %default (no limit)"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-c", "--backend-cache"
+        , dest    = "backend_cache"
+        , help    = "File caching the backend detected for each IP"
+        )
+    cmd.add_option \
+        ( "-C", "--cache-ttl"
+        , dest    = "cache_ttl"
+        , help    = "Detect backend again if cache entry is older than "
+                    "the given hours, default: %default"
+        , type    = "float"
+        , default = 168
+        )
     cmd.add_option \
         ( "-D", "--debug"
         , dest    = "debug"
@@ -196,6 +404,14 @@ if __name__ == '__main__' :
         , help    = "Destination file of pickle dump, default: %default"
         , default = "Funkfeuer-spider-pickle.dump"
         )
+    cmd.add_option \
+        ( "-f", "--fresh"
+        , dest    = "fresh"
+        , help    = "With --resume skip IPs with a successful result "
+                    "not older than the given hours, default: %default"
+        , type    = "float"
+        , default = 24
+        )
     cmd.add_option \
         ( "-i", "--ip-port"
         , dest    = "ip_port"
@@ -203,6 +419,22 @@ if __name__ == '__main__' :
         , help    = "IP-Addres:Port combination with non-standard port"
         , default = []
         )
+    cmd.add_option \
+        ( "-k", "--connect-timeout"
+        , dest    = "connect_timeout"
+        , help    = "Timeout in seconds for connecting to a node, "
+                    "default: the request timeout"
+        , type    = "float"
+        )
+    cmd.add_option \
+        ( "-L", "--liveness-timeout"
+        , dest    = "liveness"
+        , help    = "Check with a TCP connect which IPs answer within the "
+                    "given seconds before spidering, default: %default "
+                    "(no check)"
+        , type    = "float"
+        , default = 0
+        )
     cmd.add_option \
         ( "-n", "--limit-devices"
         , dest    = "limit_devices"
@@ -210,6 +442,14 @@ if __name__ == '__main__' :
         , type    = "int"
         , default = 0
         )
+    cmd.add_option \
+        ( "-P", "--probe-timeout"
+        , dest    = "probe_timeout"
+        , help    = "With --schedule use this timeout in seconds for IPs "
+                    "that didn't answer recently, default: %default"
+        , type    = "int"
+        , default = 30
+        )
     cmd.add_option \
         ( "-p", "--processes"
         , dest    = "processes"
@@ -224,10 +464,46 @@ if __name__ == '__main__' :
                     "default: %default"
         , default = "olsr/txtinfo.txt"
         )
+    cmd.add_option \
+        ( "-R", "--resume"
+        , dest    = "resume"
+        , help    = "Resume from result store, see --fresh"
+        , action  = "store_true"
+        , default = False
+        )
+    cmd.add_option \
+        ( "-r", "--request-timeout"
+        , dest    = "rq_timeout"
+        , help    = "Timeout in seconds for a single page request, "
+                    "default: %default"
+        , type    = "int"
+        , default = 10
+        )
+    cmd.add_option \
+        ( "-S", "--schedule"
+        , dest    = "schedule"
+        , help    = "Schedule IPs using the history in the result store"
+        , action  = "store_true"
+        , default = False
+        )
+    cmd.add_option \
+        ( "-s", "--store"
+        , dest    = "store"
+        , help    = "Append each result to the given result store"
+        )
+    cmd.add_option \
+        ( "-T", "--threads"
+        , dest    = "threads"
+        , help    = "Use given number of threads in a single process "
+                    "instead of processes, default: %default (use processes)"
+        , type    = "int"
+        , default = 0
+        )
     cmd.add_option \
         ( "-t", "--timeout"
         , dest    = "timeout"
-        , help    = "Timout in seconds for subprocesses, default: %default"
+        , help    = "Timeout in seconds for all requests to an IP, "
+                    "default: %default"
         , type    = "int"
         , default = 180
         )
@@ -238,9 +514,28 @@ if __name__ == '__main__' :
         , action  = "count"
         )
     (opt, args) = cmd.parse_args ()
-    if len (args) :
+    if len (args) or ((opt.resume or opt.schedule) and not opt.store) :
         cmd.print_help ()
         sys.exit (23)
+    store     = None
+    callback  = None
+    scheduler = None
+    fresh     = {}
+    previous  = {}
+    cache     = None
+    if opt.backend_cache :
+        cache = Backend_Cache \
+            (opt.backend_cache, timedelta (hours = opt.cache_ttl))
+    if opt.store :
+        store    = Result_Store (opt.store)
+        callback = store.append
+        if opt.resume :
+            fresh = store.fresh (timedelta (hours = opt.fresh))
+            previous.update (fresh)
+        if opt.schedule :
+            scheduler = Scheduler \
+                (store, opt.timeout, probe_timeout = opt.probe_timeout)
+            previous.update (scheduler.results)
     sp = Spider \
         ( opt.olsr_file
         , opt.processes
@@ -248,9 +543,21 @@ if __name__ == '__main__' :
         , opt.timeout
         , dict (x.split (':', 1) for x in opt.ip_port)
         , opt.debug
+        , threads    = opt.threads
+        , rq_timeout = opt.rq_timeout
+        , skip       = fresh
+        , scheduler  = scheduler
+        , liveness   = opt.liveness
+        , cache      = cache
+        , host_rate  = opt.host_rate
+        , connect_timeout = opt.connect_timeout
         )
     try :
-        sp.process ()
+        sp.process (callback)
+        # complete the dump with recent results we did not spider again
+        for ip in sp.skipped :
+            if ip in previous :
+                sp.result_dict [ip] = previous [ip]
         if opt.dump.endswith ('.gz') :
             f = GzipFile (opt.dump, "wb", 9)
         else :
@@ -265,3 +572,8 @@ if __name__ == '__main__' :
                 print k, v
     except Exception, err :
         sp.log_exception ()
+    sp.close ()
+    if store :
+        store.close ()
+    if cache :
+        cache.save ()
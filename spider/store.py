@@ -0,0 +1,98 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+import os
+import pickle
+
+from   datetime           import datetime
+from   rsclib.autosuper   import autosuper
+
+class Result_Store (autosuper) :
+    """ Append-only on-disk store of spider results.
+        Each record is a separately pickled tuple (ip, time, result)
+        where result is a Guess or an error tuple, optionally followed
+        by a dict of timings and counters of spidering the node.
+        Records are appended (and flushed) as soon as a node is
+        finished, so a crashed or killed spider run loses at most the
+        record being written. A truncated last record is ignored when
+        reading.
+    """
+
+    protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__ (self, filename) :
+        self.filename = filename
+        self.f        = None
+    # end def __init__
+
+    def append (self, ip, result, stats = None) :
+        if self.f is None :
+            self.f = open (self.filename, 'ab')
+        record = (ip, datetime.utcnow (), result)
+        if stats is not None :
+            record += (stats,)
+        pickle.dump (record, self.f, self.protocol)
+        self.f.flush ()
+    # end def append
+
+    def close (self) :
+        if self.f is not None :
+            self.f.close ()
+            self.f = None
+    # end def close
+
+    def fresh (self, max_age) :
+        """ Return dict of the latest successful result by IP for all
+            IPs with a successful result not older than max_age (a
+            timedelta).
+        """
+        limit  = datetime.utcnow () - max_age
+        result = {}
+        for ip, time, r in self :
+            if time >= limit and not isinstance (r, tuple) :
+                result [ip] = r
+        return result
+    # end def fresh
+
+    def __iter__ (self) :
+        """ Yield (ip, time, result) for all records """
+        for r in self.records () :
+            yield r [:3]
+    # end def __iter__
+
+    def records (self) :
+        """ Yield (ip, time, result, stats) for all records, stats is
+            None for records without timings.
+        """
+        if not os.path.exists (self.filename) :
+            return
+        f = open (self.filename, 'rb')
+        try :
+            while True :
+                try :
+                    r = pickle.load (f)
+                    yield (r + (None,)) [:4]
+                except EOFError :
+                    break
+                except (pickle.UnpicklingError, ValueError, IndexError) :
+                    # truncated last record of a killed run
+                    break
+        finally :
+            f.close ()
+    # end def records
+
+# end class Result_Store
@@ -0,0 +1,301 @@
+# #*** <License> ************************************************************#
+# This module is part of the repository CNDB.
+#
+# This module is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This module is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this module. If not, see <http://www.gnu.org/licenses/>.
+# #*** </License> ***********************************************************#
+
+from   time               import sleep, time
+from   logging            import INFO
+from   rsclib.execute     import Log
+from   olsr.parser        import get_olsr_container, OLSR_State
+from   spider.spiderpool  import Spider
+
+def olsr_ips (olsr) :
+    """ Set of all IPs (as strings) in the topology of olsr """
+    t = olsr.topo
+    return set (str (ip) for d in (t.forward, t.reverse) for ip in d)
+# end def olsr_ips
+
+def delta_ips (td, hd) :
+    """ IPs (as strings) of nodes affected by the topology delta td and
+        the HNA delta hd: both ends of links added or removed (this
+        includes nodes new in the topology) or that went up or down
+        (cost changed from or to infinite) and gateways of added,
+        removed or changed HNA entries.
+        Changes of link quality alone don't affect a node.
+    """
+    result = set ()
+    links  = td.added + td.removed
+    links.extend \
+        ( n for o, n in td.changed
+          if (o.cost == float ('inf')) != (n.cost == float ('inf'))
+        )
+    for e in links :
+        result.update ((str (e.dst_ip), str (e.last_hop)))
+    result.update (str (h.gw) for h in hd.added + hd.removed)
+    result.update (str (n.gw) for o, n in hd.changed)
+    result.update (str (o.gw) for o, n in hd.changed)
+    return result
+# end def delta_ips
+
+class Watcher (Log) :
+    """ Poll the OLSR information every interval seconds and spider
+        only the nodes affected by changes of the topology (see
+        delta_ips). The topology is kept in memory in an OLSR_State
+        (state), subscribers of the state are notified of the delta of
+        each poll. The first poll only remembers the topology unless
+        initial is True (then all nodes are spidered).
+        The callback is called with ip, result and stats for each node
+        spidered (like Spider.process). An optional backend cache (see
+        Spider) is saved after each poll. Further keyword arguments are
+        passed to the Spider, the spider (and its pool of workers) is
+        created once and reused for each poll.
+    """
+
+    def __init__ \
+        ( self
+        , olsr_file
+        , interval = 60
+        , callback = None
+        , initial  = False
+        , debug    = False
+        , cache    = None
+        , ** kw
+        ) :
+        self.__super.__init__ ()
+        if not debug :
+            self.log.setLevel (INFO)
+        self.olsr_file = olsr_file
+        self.interval  = interval
+        self.callback  = callback
+        self.initial   = initial
+        self.debug     = debug
+        self.cache     = cache
+        self.state     = OLSR_State ()
+        self.polls     = 0
+        self.spider    = Spider (debug = debug, cache = cache, ** kw)
+    # end def __init__
+
+    def close (self) :
+        self.spider.close ()
+    # end def close
+
+    def poll (self) :
+        """ Read OLSR information and spider affected nodes, return the
+            number of nodes spidered.
+        """
+        try :
+            olsr = get_olsr_container (self.olsr_file)
+        except Exception, err :
+            self.log.error ("Reading %s failed: %s" % (self.olsr_file, err))
+            return 0
+        if not olsr.topo.forward :
+            self.log.error ("Empty topology from %s" % self.olsr_file)
+            return 0
+        d = self.state.update (olsr)
+        self.polls += 1
+        if self.polls == 1 :
+            if not self.initial :
+                self.log.info \
+                    ("Topology with %s nodes" % len (olsr_ips (self.state)))
+                return 0
+            ips = olsr_ips (self.state)
+        else :
+            ips = delta_ips (d.topo, d.hna) & olsr_ips (self.state)
+            self.log.info \
+                ( "Links: %s added, %s removed, %s changed; "
+                  "HNA: %s added, %s removed, %s changed; %s nodes to spider"
+                % ( len (d.topo.added), len (d.topo.removed)
+                  , len (d.topo.changed)
+                  , len (d.hna.added),  len (d.hna.removed)
+                  , len (d.hna.changed)
+                  , len (ips)
+                  )
+                )
+        if not ips :
+            return 0
+        skip = [ip for ip in olsr_ips (self.state) if ip not in ips]
+        sp   = self.spider
+        sp.select (self.state, skip = skip)
+        sp.process (self.callback)
+        if self.cache :
+            self.cache.save ()
+        return len (sp.result_dict)
+    # end def poll
+
+    def run (self, count = 0) :
+        """ Poll forever or count times """
+        n = 0
+        while not count or n < count :
+            start = time ()
+            self.poll ()
+            n += 1
+            if count and n >= count :
+                break
+            delay = start + self.interval - time ()
+            if delay > 0 :
+                sleep (delay)
+    # end def run
+
+# end class Watcher
+
+if __name__ == '__main__' :
+    import sys
+    from optparse          import OptionParser
+    from datetime          import timedelta
+    from spider.cache      import Backend_Cache
+    from spider.store      import Result_Store
+
+    cmd = OptionParser \
+        (usage = "%prog [options]\n"
+                 "Poll OLSR information and spider nodes affected by "
+                 "changes of the topology"
+        )
+    cmd.add_option \
+        ( "-b", "--host-rate"
+        , dest    = "host_rate"
+        , help    = "Send at most the given number of requests per second "
+                    "to a host, default: %default (no limit)"
+        , type    = "float"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-c", "--backend-cache"
+        , dest    = "backend_cache"
+        , help    = "File caching the backend detected for each IP"
+        )
+    cmd.add_option \
+        ( "-C", "--cache-ttl"
+        , dest    = "cache_ttl"
+        , help    = "Detect backend again if cache entry is older than "
+                    "the given hours, default: %default"
+        , type    = "float"
+        , default = 168
+        )
+    cmd.add_option \
+        ( "-D", "--debug"
+        , dest    = "debug"
+        , help    = "Turn on debug logging"
+        , action  = "store_true"
+        , default = False
+        )
+    cmd.add_option \
+        ( "-I", "--initial"
+        , dest    = "initial"
+        , help    = "Spider all nodes of the first topology"
+        , action  = "store_true"
+        , default = False
+        )
+    cmd.add_option \
+        ( "-i", "--ip-port"
+        , dest    = "ip_port"
+        , action  = "append"
+        , help    = "IP-Addres:Port combination with non-standard port"
+        , default = []
+        )
+    cmd.add_option \
+        ( "-k", "--connect-timeout"
+        , dest    = "connect_timeout"
+        , help    = "Timeout in seconds for connecting to a node, "
+                    "default: the request timeout"
+        , type    = "float"
+        )
+    cmd.add_option \
+        ( "-n", "--count"
+        , dest    = "count"
+        , help    = "Stop after the given number of polls, "
+                    "default: %default (run forever)"
+        , type    = "int"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-o", "--olsr-file"
+        , dest    = "olsr_file"
+        , help    = "File or Backfire-URL containing OLSR information, "
+                    "default: %default"
+        , default = "olsr/txtinfo.txt"
+        )
+    cmd.add_option \
+        ( "-P", "--poll-interval"
+        , dest    = "interval"
+        , help    = "Poll OLSR information every given seconds, "
+                    "default: %default"
+        , type    = "float"
+        , default = 60
+        )
+    cmd.add_option \
+        ( "-p", "--processes"
+        , dest    = "processes"
+        , help    = "Use given number of processes, default: %default"
+        , type    = "int"
+        , default = 20
+        )
+    cmd.add_option \
+        ( "-r", "--request-timeout"
+        , dest    = "rq_timeout"
+        , help    = "Timeout in seconds for a single page request, "
+                    "default: %default"
+        , type    = "int"
+        , default = 10
+        )
+    cmd.add_option \
+        ( "-s", "--store"
+        , dest    = "store"
+        , help    = "Append each result to the given result store"
+        )
+    cmd.add_option \
+        ( "-T", "--threads"
+        , dest    = "threads"
+        , help    = "Use given number of threads in a single process "
+                    "instead of processes, default: %default (use processes)"
+        , type    = "int"
+        , default = 0
+        )
+    cmd.add_option \
+        ( "-t", "--timeout"
+        , dest    = "timeout"
+        , help    = "Timeout in seconds for all requests to an IP, "
+                    "default: %default"
+        , type    = "int"
+        , default = 180
+        )
+    (opt, args) = cmd.parse_args ()
+    if len (args) or not opt.store :
+        cmd.print_help ()
+        sys.exit (23)
+    cache = None
+    if opt.backend_cache :
+        cache = Backend_Cache \
+            (opt.backend_cache, timedelta (hours = opt.cache_ttl))
+    store = Result_Store (opt.store)
+    w = Watcher \
+        ( opt.olsr_file
+        , opt.interval
+        , store.append
+        , initial         = opt.initial
+        , debug           = opt.debug
+        , processes       = opt.processes
+        , timeout         = opt.timeout
+        , ip_port         = dict (x.split (':', 1) for x in opt.ip_port)
+        , threads         = opt.threads
+        , rq_timeout      = opt.rq_timeout
+        , connect_timeout = opt.connect_timeout
+        , cache           = cache
+        , host_rate       = opt.host_rate
+        )
+    try :
+        w.run (opt.count)
+    finally :
+        w.close ()
+        store.close ()